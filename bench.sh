@@ -0,0 +1,4 @@
+#!/bin/bash
+
+# Run a benchmark against a synthetic corpus, e.g. ./bench.sh search --pages 10000
+python3 src/bench.py "$@"
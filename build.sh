@@ -2,4 +2,6 @@
 
 # Build the site for production with GitHub Pages base path
 # Replace "static_site_generator" with your actual GitHub repo name
-python3 src/main.py "/static_site_generator/"
\ No newline at end of file
+# Uses the build daemon (./daemon.sh) when it is running, otherwise builds
+# in process
+python3 src/build_client.py "/static_site_generator/"
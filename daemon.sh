@@ -0,0 +1,5 @@
+#!/bin/bash
+
+# Keep the generator warm so ./build.sh only pays for what changed.
+# Stop it with ./daemon.sh --stop
+python3 src/daemon.py "$@"
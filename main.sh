@@ -1,7 +1,6 @@
 #!/bin/bash
 
-# Run the main Python script to generate the site (for local development)
-python3 src/main.py
-
-# Start the web server in the docs directory
-cd docs && python3 -m http.server 8888
\ No newline at end of file
+# Serve the site for local development. Pages are rendered in memory on
+# request and re-rendered when their markdown, the template or an included
+# file changes.
+python3 src/devserver.py --port 8888
@@ -0,0 +1,133 @@
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".tar", ".zip")
+# Timestamp of every entry, unless SOURCE_DATE_EPOCH is set: the earliest
+# date a zip file can hold (1980-01-01 UTC)
+DEFAULT_MTIME = 315532800
+FILE_MODE = 0o644
+GZIP_LEVEL = 6
+
+
+def archive_suffix(path):
+    """
+    Return the suffix of ARCHIVE_SUFFIXES that path ends with.
+
+    Raises:
+        ValueError: If path is not a supported archive name
+    """
+    for suffix in ARCHIVE_SUFFIXES:
+        if path.endswith(suffix):
+            return suffix
+    raise ValueError(f"Unsupported archive type (use {', '.join(ARCHIVE_SUFFIXES)}): {path}")
+
+
+def archive_mtime():
+    """
+    The timestamp for entries: $SOURCE_DATE_EPOCH, or DEFAULT_MTIME.
+
+    Raises:
+        ValueError: If SOURCE_DATE_EPOCH is set but not a whole number of seconds
+    """
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return DEFAULT_MTIME
+    try:
+        return max(int(epoch), DEFAULT_MTIME)
+    except ValueError:
+        raise ValueError(
+            f"SOURCE_DATE_EPOCH must be a whole number of seconds: {epoch!r}"
+        ) from None
+
+
+class TarArchive:
+    """
+    Writes a tar file, gzip-compressed unless path ends in ".tar". Entries
+    have a fixed timestamp, mode, and no owner, so the same files added in
+    the same order always produce the same bytes.
+    """
+
+    def __init__(self, path, mtime=None):
+        self.mtime = archive_mtime() if mtime is None else mtime
+        self._file = open(path, "wb")
+        self._gzip = None
+        fileobj = self._file
+        if not path.endswith(".tar"):
+            # Without a file name or the current time in the gzip header
+            self._gzip = gzip.GzipFile(
+                filename="", mode="wb", fileobj=self._file, mtime=self.mtime,
+                compresslevel=GZIP_LEVEL,
+            )
+            fileobj = self._gzip
+        self._tar = tarfile.open(fileobj=fileobj, mode="w", format=tarfile.PAX_FORMAT)
+
+    def _info(self, name, size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = self.mtime
+        info.mode = FILE_MODE
+        return info
+
+    def add_bytes(self, name, data):
+        self._tar.addfile(self._info(name, len(data)), io.BytesIO(data))
+
+    def add_file(self, name, path):
+        with open(path, "rb") as f:
+            self._tar.addfile(self._info(name, os.fstat(f.fileno()).st_size), f)
+
+    def close(self):
+        self._tar.close()
+        if self._gzip is not None:
+            self._gzip.close()
+        self._file.close()
+
+
+class ZipArchive:
+    """Writes a deflated zip file with fixed timestamps and modes."""
+
+    def __init__(self, path, mtime=None):
+        self.mtime = archive_mtime() if mtime is None else mtime
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def _info(self, name, size):
+        info = zipfile.ZipInfo(name, date_time=time.gmtime(self.mtime)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        # Unix permissions, whatever platform builds the archive
+        info.create_system = 3
+        info.external_attr = (0o100000 | FILE_MODE) << 16
+        info.file_size = size
+        return info
+
+    def add_bytes(self, name, data):
+        self._zip.writestr(self._info(name, len(data)), data)
+
+    def add_file(self, name, path):
+        with open(path, "rb") as src:
+            size = os.fstat(src.fileno()).st_size
+            with self._zip.open(self._info(name, size), "w") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+    def close(self):
+        self._zip.close()
+
+
+def open_archive(path, mtime=None):
+    """
+    Open an archive for writing, its type chosen by the suffix of path.
+
+    Args:
+        path: Where to write; see ARCHIVE_SUFFIXES
+        mtime: Timestamp for every entry (default: archive_mtime())
+
+    Returns:
+        A TarArchive or ZipArchive with add_bytes(name, data),
+        add_file(name, path) and close()
+    """
+    if archive_suffix(path) == ".zip":
+        return ZipArchive(path, mtime)
+    return TarArchive(path, mtime)
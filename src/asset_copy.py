@@ -0,0 +1,158 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastcopy import DEFAULT_WORKERS, copy_file, copy_files
+
+# Files at least this large are hashed through a memory map instead of
+# buffered reads
+MMAP_THRESHOLD = 4 * 1024 * 1024
+READ_CHUNK = 1024 * 1024
+
+
+class CopyStats:
+    """
+    Summary of a static asset copy.
+    - files: number of files written to the destination
+    - unique: number of distinct file contents
+    - bytes_total: size of all destination files
+    - bytes_copied: bytes physically copied (the rest are hardlinks)
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.unique = 0
+        self.bytes_total = 0
+        self.bytes_copied = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_total - self.bytes_copied
+
+    def __repr__(self):
+        return (
+            f"CopyStats(files={self.files}, unique={self.unique}, "
+            f"bytes_total={self.bytes_total}, bytes_copied={self.bytes_copied})"
+        )
+
+
+def hash_file(path):
+    """
+    Return the SHA-256 hex digest of a file's content. Large files are
+    memory-mapped so hashing does not copy them through Python buffers.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_files(paths, workers=None):
+    """
+    Hash many files concurrently. hashlib releases the GIL while hashing,
+    so threads give real parallelism here.
+
+    Returns:
+        A list of hex digests in the same order as paths
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(hash_file, paths))
+
+
+def list_files(src, dst):
+    """
+    Walk src and pair every file with its path under dst.
+
+    Returns:
+        A tuple (dirs, files) where dirs lists the directories to create
+        under dst (parents first) and files lists (src_path, dst_path)
+        pairs, both in a stable order
+    """
+    dirs = []
+    files = []
+    for root, dir_names, file_names in os.walk(src):
+        dir_names.sort()
+        rel_root = os.path.relpath(root, src)
+        dst_root = dst if rel_root == "." else os.path.join(dst, rel_root)
+        for name in dir_names:
+            dirs.append(os.path.join(dst_root, name))
+        for name in sorted(file_names):
+            files.append((os.path.join(root, name), os.path.join(dst_root, name)))
+    return dirs, files
+
+
+def link_or_copy(src, dst):
+    """
+    Hardlink dst to src, falling back to a byte copy when links are not
+    possible (different filesystems, or a filesystem without hardlinks).
+
+    Returns:
+        True if a link was made, False if the file was copied
+    """
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        copy_file(src, dst)
+        return False
+
+
+def dedupe_copy(src, dst, workers=None):
+    """
+    Copy the contents of src into the existing directory dst, writing each
+    distinct file content only once. Later files with the same content are
+    hardlinked to the first copy in dst.
+
+    Files are never linked back to src: later build stages rewrite output
+    files in place, and that must not reach into the source tree.
+
+    Args:
+        src: Source directory path
+        dst: Destination directory path (must exist)
+        workers: Number of hashing threads (default: ThreadPoolExecutor's)
+
+    Returns:
+        A CopyStats
+    """
+    dirs, files = list_files(src, dst)
+    for dir_path in dirs:
+        os.mkdir(dir_path)
+
+    digests = hash_files([src_path for src_path, _ in files], workers)
+
+    stats = CopyStats()
+    first_copy = {}
+    for (src_path, dst_path), digest in zip(files, digests):
+        size = os.path.getsize(src_path)
+        stats.files += 1
+        stats.bytes_total += size
+        if digest in first_copy:
+            if not link_or_copy(first_copy[digest], dst_path):
+                stats.bytes_copied += size
+            continue
+        copy_file(src_path, dst_path)
+        first_copy[digest] = dst_path
+        stats.unique += 1
+        stats.bytes_copied += size
+    return stats
+
+
+def copy_tree(src, dst, workers=DEFAULT_WORKERS, log=None):
+    """
+    Copy the contents of src into the existing directory dst, using kernel
+    copies and up to `workers` concurrent copies (see fastcopy.copy_files).
+
+    Returns:
+        A fastcopy.CopyReport
+    """
+    dirs, files = list_files(src, dst)
+    for dir_path in dirs:
+        os.mkdir(dir_path)
+    return copy_files(files, workers, log)
@@ -0,0 +1,317 @@
+import argparse
+import os
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from asset_copy import copy_tree, list_files
+from builder import Site
+from inline_markdown import markdown_to_html_node
+from main import fill_template
+from search_index import build_search_index
+from stress import PATHOLOGICAL_INPUTS, STAGES, measure, peak_memory
+from templates import TemplateLoader
+from wireformat import decode_tree, encode_tree
+
+WORDS = (
+    "hobbit elf dwarf wizard ring shire mordor gondor rohan ent orc balrog "
+    "palantir silmaril valar maiar numenor rivendell lothlorien isengard "
+    "mithril anduril sting glamdring narsil fellowship council quest journey "
+    "mountain river forest tower road battle song lore legend"
+).split()
+
+
+def generate_corpus(content_dir, pages, seed=0):
+    """
+    Write a synthetic site of `pages` markdown files into content_dir,
+    spread over nested directories like a real blog.
+    """
+    rng = random.Random(seed)
+    for i in range(pages):
+        page_dir = os.path.join(content_dir, f"section{i % 50}", f"page{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        paragraphs = []
+        for _ in range(5):
+            words = [rng.choice(WORDS) for _ in range(60)]
+            words[3] = f"**{words[3]}**"
+            words[10] = f"[{words[10]}](/section{rng.randrange(50)})"
+            paragraphs.append(" ".join(words))
+        items = "\n".join(f"- {rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(8))
+        markdown = f"# Page {i} {rng.choice(WORDS)}\n\n" + "\n\n".join(paragraphs) + "\n\n" + items + "\n"
+        with open(os.path.join(page_dir, "index.md"), "w", encoding="utf-8") as f:
+            f.write(markdown)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_search(pages):
+    """Full vs. incremental search index builds."""
+    tmp = tempfile.mkdtemp()
+    try:
+        content_dir = os.path.join(tmp, "content")
+        out_dir = os.path.join(tmp, "search")
+        state_path = os.path.join(tmp, "cache", "search.json")
+        generate_corpus(content_dir, pages)
+
+        elapsed, (indexed, total) = _timed(build_search_index, content_dir, out_dir, state_path)
+        print(f"full build:        {elapsed:8.3f}s  ({indexed}/{total} pages indexed)")
+
+        elapsed, (indexed, total) = _timed(build_search_index, content_dir, out_dir, state_path)
+        print(f"no-op rebuild:     {elapsed:8.3f}s  ({indexed}/{total} pages indexed)")
+
+        with open(os.path.join(content_dir, "section0", "page0", "index.md"), "a", encoding="utf-8") as f:
+            f.write("\nbrandnewterm\n")
+        elapsed, (indexed, total) = _timed(build_search_index, content_dir, out_dir, state_path)
+        print(f"one page changed:  {elapsed:8.3f}s  ({indexed}/{total} pages indexed)")
+
+        shard_sizes = [
+            os.path.getsize(os.path.join(out_dir, name))
+            for name in os.listdir(out_dir) if name.startswith("shard-")
+        ]
+        print(f"shards: {len(shard_sizes)}, largest {max(shard_sizes)} bytes, "
+              f"total {sum(shard_sizes)} bytes, "
+              f"manifest {os.path.getsize(os.path.join(out_dir, 'index.json'))} bytes")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def generate_large_pages(pages, items=2000, seed=0):
+    """
+    Return `pages` markdown documents dominated by long lists of links,
+    the worst case for the HTMLNode object tree.
+    """
+    rng = random.Random(seed)
+    documents = []
+    for i in range(pages):
+        lines = [
+            f"- [{rng.choice(WORDS)} {j}](/section{j % 50}/page{j}) is **{rng.choice(WORDS)}**"
+            for j in range(items)
+        ]
+        documents.append(f"# Page {i}\n\n" + "\n".join(lines) + "\n")
+    return documents
+
+
+def bench_wireformat(pages):
+    """Wire format vs. pickle: encoded size and encode/decode time."""
+    trees = [markdown_to_html_node(doc) for doc in generate_large_pages(max(1, pages // 100))]
+    print(f"{len(trees)} node trees")
+    for name, encode, decode in (
+        ("pickle", lambda tree: pickle.dumps(tree, pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("wireformat", encode_tree, decode_tree),
+    ):
+        start = time.perf_counter()
+        encoded = [encode(tree) for tree in trees]
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for data in encoded:
+            decode(data)
+        decode_time = time.perf_counter() - start
+        size = sum(len(data) for data in encoded)
+        print(f"{name:11} size {size / len(trees) / 1024:8.1f} KiB/page  "
+              f"encode {encode_time:7.3f}s  decode {decode_time:7.3f}s")
+
+
+def _run_script(script, args, env=None):
+    """Run a script from src/ in a fresh interpreter and return the seconds it took."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(src_dir, script), *args],
+        check=True, stdout=subprocess.DEVNULL, env=env,
+    )
+    return time.perf_counter() - start
+
+
+def bench_daemon(pages, runs=3):
+    """Cold `python3 src/main.py` vs. the thin client talking to a warm daemon."""
+    tmp = tempfile.mkdtemp()
+    daemon = None
+    try:
+        generate_corpus(os.path.join(tmp, "content"), pages)
+        os.makedirs(os.path.join(tmp, "static"))
+        with open(os.path.join(tmp, "static", "index.css"), "w", encoding="utf-8") as f:
+            f.write("body { margin: 0 }")
+        with open(os.path.join(tmp, "template.html"), "w", encoding="utf-8") as f:
+            f.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+        args = ["--project-dir", tmp]
+        changed = os.path.join(tmp, "content", "section0", "page0", "index.md")
+
+        def touch():
+            with open(changed, "a", encoding="utf-8") as f:
+                f.write("\nmore\n")
+
+        cold = [_run_script("main.py", args) for _ in range(runs)]
+        touch()
+        cold_changed = _run_script("main.py", args)
+        print(f"cold main.py:          {min(cold):8.3f}s  (best of {runs})")
+        print(f"cold, one page edited: {cold_changed:8.3f}s")
+
+        socket_path = os.path.join(tmp, "daemon.sock")
+        env = dict(os.environ, SSG_DAEMON_SOCKET=socket_path)
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        daemon = subprocess.Popen(
+            [sys.executable, os.path.join(src_dir, "daemon.py"), "--socket", socket_path],
+            stdout=subprocess.DEVNULL,
+        )
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        first = _run_script("build_client.py", args, env)
+        warm = [_run_script("build_client.py", args, env) for _ in range(runs)]
+        touch()
+        warm_changed = _run_script("build_client.py", args, env)
+        print(f"daemon, first build:   {first:8.3f}s")
+        print(f"daemon, warm:          {min(warm):8.3f}s  (best of {runs})")
+        print(f"warm, one page edited: {warm_changed:8.3f}s")
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+        shutil.rmtree(tmp)
+
+
+def bench_templates(pages):
+    """String replacement vs. the compiled template for template.html."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    loader = TemplateLoader(os.path.dirname(src_dir))
+    template = loader.get("template.html")
+    with open(os.path.join(loader.root, "template.html"), "r", encoding="utf-8") as f:
+        source = f.read()
+    documents = [markdown_to_html_node(doc).to_html() for doc in generate_large_pages(1, items=200)]
+    content = documents[0]
+    print(f"{pages} fills of a {len(content) / 1024:.0f} KiB page")
+    for name, filler in (("str.replace", source), ("compiled", template)):
+        start = time.perf_counter()
+        for _ in range(pages):
+            fill_template(filler, "Page title", content)
+        print(f"{name:12} {time.perf_counter() - start:7.3f}s")
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        loader.get("template.html")
+    print(f"cache lookup {time.perf_counter() - start:7.3f}s  ({loader.compiles} compile)")
+
+
+def bench_copy(pages):
+    """shutil.copy one file at a time vs. the fastcopy engine."""
+    tmp = tempfile.mkdtemp()
+    try:
+        src = os.path.join(tmp, "static")
+        # A few large media files and many small ones
+        large = max(1, pages // 2500)
+        for i in range(large):
+            path = os.path.join(src, "video", f"clip{i}.mp4")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                for _ in range(64):
+                    f.write(os.urandom(1024 * 1024))
+        for i in range(pages // 10):
+            path = os.path.join(src, "images", f"dir{i % 20}", f"img{i}.png")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(os.urandom(20 * 1024))
+        _, files = list_files(src, "")
+        total = sum(os.path.getsize(path) for path, _ in files)
+        print(f"{len(files)} files, {total / 1e6:.0f} MB ({large} x 64 MB)")
+
+        def shutil_tree(dst):
+            dirs, files = list_files(src, dst)
+            for dir_path in dirs:
+                os.mkdir(dir_path)
+            for src_path, dst_path in files:
+                shutil.copy(src_path, dst_path)
+
+        for name, copy in (
+            ("shutil.copy", shutil_tree),
+            ("fastcopy x1", lambda dst: copy_tree(src, dst, workers=1)),
+            ("fastcopy", lambda dst: copy_tree(src, dst)),
+        ):
+            dst = os.path.join(tmp, name)
+            os.mkdir(dst)
+            elapsed, result = _timed(copy, dst)
+            detail = f"  {result.summary()}" if result is not None else ""
+            print(f"{name:12} {elapsed:7.3f}s  {total / 1e6 / elapsed:8.1f} MB/s{detail}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def bench_mirrors(pages):
+    """Three builds, one per basepath, vs. one build with two mirrors."""
+    tmp = tempfile.mkdtemp()
+    try:
+        generate_corpus(os.path.join(tmp, "content"), pages)
+        os.makedirs(os.path.join(tmp, "static"))
+        with open(os.path.join(tmp, "static", "index.css"), "w", encoding="utf-8") as f:
+            f.write("body { margin: 0 }")
+        with open(os.path.join(tmp, "template.html"), "w", encoding="utf-8") as f:
+            f.write('<html><title>{{ Title }}</title><link href="/index.css">{{ Content }}</html>')
+        targets = [("/", "preview"), ("/repo/", "docs"), ("/staging/", "staging")]
+
+        def build(basepath, output, mirrors=()):
+            site = Site(
+                os.path.join(tmp, "content"), os.path.join(tmp, "static"),
+                os.path.join(tmp, "template.html"), os.path.join(tmp, output), basepath,
+                mirrors=[(mirror_basepath, os.path.join(tmp, mirror_dir))
+                         for mirror_basepath, mirror_dir in mirrors],
+            )
+            site.build()
+
+        separate = sum(_timed(build, basepath, output)[0] for basepath, output in targets)
+        single, _ = _timed(build, *targets[0])
+        mirrored, _ = _timed(build, *targets[0], targets[1:])
+        print(f"one basepath:          {single:8.3f}s")
+        print(f"three separate builds: {separate:8.3f}s")
+        print(f"one build, 2 mirrors:  {mirrored:8.3f}s")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def bench_stress(pages):
+    """
+    Render every pathological input at sizes `pages`, 4x and 16x and show
+    how each stage scales, then a single 50 MB line.
+    """
+    sizes = [pages, pages * 4, pages * 16]
+    for name, make in sorted(PATHOLOGICAL_INPUTS.items()):
+        timings = [measure(make(n), repeat=1) for n in sizes]
+        peak = peak_memory(make(sizes[-1]))
+        for stage in STAGES:
+            seconds = [timing[stage] for timing in timings]
+            ratio = seconds[-1] / seconds[0] if seconds[0] else 0.0
+            print(f"{name:20} {stage:22} " + " ".join(f"{s:8.3f}s" for s in seconds)
+                  + f"  x{ratio:6.1f}")
+        print(f"{name:20} {'peak memory':22} {peak / 1e6:8.1f} MB at size {sizes[-1]}")
+
+    line = PATHOLOGICAL_INPUTS["long_line"](10_000_000)
+    elapsed, _ = _timed(measure, line, 1)
+    print(f"single {len(line) / 1e6:.0f} MB line: {elapsed:.3f}s")
+
+
+BENCHMARKS = {
+    "copy": bench_copy,
+    "daemon": bench_daemon,
+    "mirrors": bench_mirrors,
+    "search": bench_search,
+    "stress": bench_stress,
+    "templates": bench_templates,
+    "wireformat": bench_wireformat,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run generator benchmarks.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--pages", type=int, default=10000, help="size of the synthetic corpus")
+    args = parser.parse_args(sys.argv[1:])
+    BENCHMARKS[args.benchmark](args.pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import json
+import os
+import socket
+import sys
+
+SOCKET_ENV = "SSG_DAEMON_SOCKET"
+
+
+def default_socket_path():
+    """
+    Return the daemon socket path: $SSG_DAEMON_SOCKET if set, otherwise
+    .cache/daemon.sock under the project root.
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(script_dir), ".cache", "daemon.sock")
+
+
+def send_request(socket_path, request, out=None):
+    """
+    Send one request to the daemon and relay its output lines to out.
+
+    Args:
+        socket_path: Path of the daemon's Unix socket
+        request: JSON-serializable request dict
+        out: Writable text stream for the daemon's output (default stdout)
+
+    Returns:
+        The final response dict sent by the daemon, or None if no daemon
+        is listening on socket_path
+    """
+    out = out or sys.stdout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                message = json.loads(line)
+                if "log" in message:
+                    out.write(message["log"] + "\n")
+                    continue
+                return message
+    finally:
+        sock.close()
+    raise ConnectionError("Build daemon closed the connection without a result")
+
+
+def build(argv, socket_path=None, out=None):
+    """
+    Build through the daemon if one is running.
+
+    Returns:
+        The exit status of the build, or None if it has to run in process
+        (no daemon, or the daemon is running outdated code)
+    """
+    request = {"command": "build", "argv": list(argv), "cwd": os.getcwd()}
+    response = send_request(socket_path or default_socket_path(), request, out)
+    if response is None or response.get("restart"):
+        return None
+    return response["status"]
+
+
+def main():
+    """
+    Build through the daemon, falling back to an in-process build. The
+    generator is only imported for the fallback, so talking to a daemon
+    costs little more than interpreter startup.
+    """
+    status = build(sys.argv[1:])
+    if status is None:
+        import main as generator
+        generator.main()
+        return
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
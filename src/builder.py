@@ -0,0 +1,1123 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from archive import archive_mtime, archive_suffix, open_archive
+from asset_copy import copy_tree, dedupe_copy, list_files
+from buildlog import as_build_log
+from changes import OutputManifest
+from fastcopy import copy_files
+from fingerprint import MANIFEST_NAME, AssetManifest, copy_fingerprinted
+from frontmatter import read_front_matter, split_front_matter
+from highlight import cache as highlight_cache
+from includes import IncludeLoader, PageIncludes
+from inline_markdown import extract_title
+from listing import DEFAULT_PAGE_SIZE, SORT_KEYS, ListingEntry, build_listing, is_member
+from main import COPY_MODES, apply_basepath, render_page, scan_title, stream_page
+from minify import Minifier
+from publish import link_tree, publish, staging_dir
+from search_index import PageTerms, SearchIndex
+from selection import copy_selected, iter_selected_files
+from templates import TemplateError, TemplateLoader, layout_template_name
+from wikilinks import PageLinks, WikiIndex
+
+
+class BuildResult:
+    """
+    Outcome of one Site.build() call.
+    - pages_written: output paths of pages written in this build
+    - pages_skipped: output paths of pages that were already up to date
+    - pages_removed: output paths deleted because their source is gone
+    - assets_copied: output paths of static files copied in this build
+    - errors: (source path, message) pairs for pages that failed to build
+    - warnings: (source path, message) pairs for pages rendered in this
+      build, e.g. for wiki links that are unresolved or ambiguous
+    - timings: seconds spent per stage ("static", "pages", "listings",
+      "search", "changes", "publish", "archive", "total")
+    - published: for an atomic Site, whether the build was published, and
+      for an archive Site, whether the archive was written; None otherwise
+    - changes: for a Site tracking changes, the changes.ChangeSet of
+      output_dir since the previous build; None otherwise
+
+    Generated listing pages are reported with the other pages.
+    """
+
+    def __init__(self):
+        self.pages_written = []
+        self.pages_skipped = []
+        self.pages_removed = []
+        self.assets_copied = []
+        self.errors = []
+        self.warnings = []
+        self.timings = {}
+        self.published = None
+        self.changes = None
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return (
+            f"BuildResult(written={len(self.pages_written)}, "
+            f"skipped={len(self.pages_skipped)}, removed={len(self.pages_removed)}, "
+            f"assets={len(self.assets_copied)}, errors={len(self.errors)}, "
+            f"total={self.timings.get('total', 0.0):.3f}s)"
+        )
+
+
+class _Timer:
+    """Context manager adding the elapsed time to result.timings[stage]."""
+
+    def __init__(self, result, stage):
+        self.result = result
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.result.timings[self.stage] = self.result.timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+class Site:
+    """
+    Builds a site from a content directory of markdown, a static directory
+    and an HTML template into an output directory.
+
+    A Site is meant to be kept around: the template, rendered pages, the
+    state of the static directory and the search index are cached in
+    memory, so each build() after the first only re-renders pages whose
+    markdown changed, only copies changed static files and only writes
+    outputs whose content changed. Nothing is printed unless a `log`
+    callable is given.
+
+    The first build() of a Site starts from an empty output directory, like
+    the command line build always has.
+
+    Args:
+        content_dir: Markdown sources
+        static_dir: Files copied as they are
+        template_path: The default page template; layouts and templates it
+            extends or includes are looked up in its directory
+        output_dir: Where the site is built
+        basepath: The base URL path the site is served from
+        cache_dir: Where build state is kept between processes, or None
+        copy_mode: How static files are copied, one of main.COPY_MODES
+        minify: Minify HTML and CSS outputs
+        search_index: Write a search index to <output_dir>/search
+        stream_threshold: Size in bytes from which a page is streamed from
+            its file block by block instead of rendered in memory
+        listings: Content-relative directories that get paginated listing
+            pages of the pages below them
+        listing_page_size: Entries per listing page
+        listing_sort: Order of listing entries, one of listing.SORT_KEYS
+        atomic: Build into a staging directory and swap it in on success
+        mirrors: Extra (basepath, output_dir) targets built in the same pass
+        archive: Write the site to this .tar.gz, .tgz, .tar or .zip file
+            instead of output_dir
+        track_changes: Prune orphaned outputs and report changed outputs in
+            BuildResult.changes
+        include_dir: Directory of markdown files pages can include
+        log: Callable or buildlog.BuildLog receiving progress messages
+    """
+
+    def __init__(self, content_dir, static_dir, template_path, output_dir, basepath="/",
+                 cache_dir=None, copy_mode="copy", minify=False, search_index=False,
+                 stream_threshold=None, listings=(), listing_page_size=DEFAULT_PAGE_SIZE,
+                 listing_sort="date", atomic=False, mirrors=(), archive=None,
+                 track_changes=False, include_dir=None, log=None):
+        if copy_mode not in COPY_MODES:
+            raise ValueError(f"Invalid copy mode: {copy_mode}")
+        if listing_sort not in SORT_KEYS:
+            raise ValueError(f"Invalid listing sort: {listing_sort}")
+        if listing_page_size < 1:
+            raise ValueError("Listing page size must be at least 1")
+        if atomic and mirrors:
+            raise ValueError("Atomic publishing does not support mirrors")
+        if archive is not None:
+            archive_suffix(archive)
+            archive_mtime()
+            if atomic or mirrors or track_changes:
+                raise ValueError(
+                    "Archive output does not support atomic publishing, mirrors or change tracking"
+                )
+            if copy_mode != "copy":
+                raise ValueError(f"Archive output does not support copy mode {copy_mode}")
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        # Where the site is served from, and where it is built
+        self.live_dir = output_dir
+        self.atomic = atomic
+        self.output_dir = staging_dir(output_dir) if atomic else output_dir
+        self.basepath = basepath
+        self.mirrors = [(mirror_basepath, mirror_dir) for mirror_basepath, mirror_dir in mirrors]
+        self.archive = archive
+        self.track_changes = track_changes
+        self.cache_dir = cache_dir
+        self.copy_mode = copy_mode
+        self.search_index = search_index
+        self.stream_threshold = stream_threshold
+        self.listings = [directory.strip("/") for directory in listings]
+        self.listing_page_size = listing_page_size
+        self.listing_sort = listing_sort
+        self.log = log
+
+        self.minifier = None
+        if minify:
+            self.minifier = Minifier(self._cache_path("minify.json"))
+        self.asset_manifest = None
+
+        self._manifest_key = None
+        self.templates = TemplateLoader(os.path.dirname(os.path.abspath(template_path)))
+        self.include_dir = include_dir
+        self.includes = IncludeLoader(include_dir) if include_dir else None
+        self._template_name = os.path.basename(template_path)
+        # Source rel path -> (source signature, HTML for basepath "/",
+        # Template used)
+        self._pages = {}
+        # Source rel path -> (title, date) recorded when it was rendered
+        self._metadata = {}
+        # Listing directory -> (entries, output paths) of its last render
+        self._listings = {}
+        # Output path -> sha1 of the content written there (and to its
+        # mirrors), before the basepath was applied
+        self._outputs = {}
+        # Static rel path -> signature, as of the last copy
+        self._static_snapshot = None
+        # Inodes of output_dir and its mirrors as of the last copy
+        self._static_dirs = None
+        self._search = None
+        self._loaded_caches = False
+        # Inode of the live directory as last published by this Site
+        self._published = None
+        # The archive being written, and the size of each page added to it
+        self._archive = None
+        self._archived_sizes = {}
+        # Files of output_dir as of the last build that tracked changes
+        self._output_manifest = None
+        # Source rel path -> (source signature, title) of every page, for
+        # the wiki link index
+        self._titles = {}
+        # The wiki link index of the current build, once needed
+        self._wiki = None
+        # Source rel path -> PageLinks of its last render, if it has any
+        self._page_links = {}
+        # Source rel path -> Fragments its last render included, if any
+        self._page_includes = {}
+        # Source rel path -> keys of the highlighted snippets of its last
+        # render, kept in the highlight cache while the render is reused
+        self._page_snippets = {}
+
+    @classmethod
+    def from_project(cls, project_root, **kwargs):
+        """
+        Create a Site for the standard layout: content/, static/,
+        includes/, template.html and docs/ under project_root, with build
+        state in project_root/.cache.
+        """
+        kwargs.setdefault("cache_dir", os.path.join(project_root, ".cache"))
+        kwargs.setdefault("include_dir", os.path.join(project_root, "includes"))
+        return cls(
+            os.path.join(project_root, "content"),
+            os.path.join(project_root, "static"),
+            os.path.join(project_root, "template.html"),
+            os.path.join(project_root, "docs"),
+            **kwargs,
+        )
+
+    @property
+    def log(self):
+        """
+        The buildlog.BuildLog the site reports to. A plain callable assigned
+        to it receives every message.
+        """
+        return self._log
+
+    @log.setter
+    def log(self, log):
+        self._log = as_build_log(log)
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, name) if self.cache_dir else None
+
+    def build(self, only=None, only_static=None):
+        """
+        Build the site.
+
+        Args:
+            only: Optional list of glob patterns; when given (or when
+                only_static is), only matching pages are rendered and the
+                rest of the output directory is left untouched
+            only_static: Optional list of glob patterns selecting the static
+                files to copy in a selective build
+
+        Returns:
+            A BuildResult
+        """
+        result = BuildResult()
+        selective = bool(only or only_static)
+        if selective and self.archive is not None:
+            raise ValueError("Archive output does not support selective builds")
+        start = time.perf_counter()
+        self.log.event("build_started", selective=selective)
+
+        if not self._loaded_caches:
+            if self.cache_dir:
+                highlight_cache.load(self._cache_path("highlight.json"))
+                if self.atomic:
+                    self._load_publish_state()
+            self._loaded_caches = True
+        highlight_cache.begin_build()
+        if self.atomic:
+            self._prepare_staging(selective)
+        if self.minifier is not None:
+            self.minifier.begin_build()
+        if self.archive is not None:
+            self._open_archive()
+
+        with _Timer(result, "static"):
+            if self._archive is not None:
+                self._archive_static(result)
+            elif selective:
+                self._copy_selected_static(result, only_static or [])
+            else:
+                self._sync_static(result)
+
+        with _Timer(result, "pages"):
+            self._build_pages(result, (only or []) if selective else None)
+
+        if self.listings and not selective:
+            with _Timer(result, "listings"):
+                self._build_listings(result)
+
+        if self.search_index and not selective:
+            with _Timer(result, "search"):
+                self._write_search_index()
+
+        # Caches keep only what a build used, so a partial build must not
+        # prune them
+        if self.cache_dir and not selective:
+            highlight_cache.save(self._cache_path("highlight.json"))
+        if self.minifier is not None and not selective:
+            self.minifier.save()
+
+        if self.track_changes and not selective:
+            with _Timer(result, "changes"):
+                self._track_changes(result)
+
+        if self.atomic:
+            with _Timer(result, "publish"):
+                self._publish(result)
+        if self._archive is not None:
+            with _Timer(result, "archive"):
+                self._close_archive(result)
+
+        result.timings["total"] = time.perf_counter() - start
+        self.log.event(
+            "build_finished", ok=result.ok, pages_written=len(result.pages_written),
+            pages_skipped=len(result.pages_skipped), pages_removed=len(result.pages_removed),
+            assets_copied=len(result.assets_copied), errors=len(result.errors),
+            timings={stage: round(seconds, 6) for stage, seconds in result.timings.items()},
+        )
+        self.log.flush()
+        return result
+
+    # Staged publishing
+
+    def _live_inode(self):
+        try:
+            return os.stat(self.live_dir).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _forget_outputs(self):
+        """Drop everything known about the output directory's content."""
+        self._static_snapshot = None
+        self._outputs = {}
+        self._pages = {}
+        self._metadata = {}
+        self._listings = {}
+        self._page_links = {}
+        self._page_includes = {}
+        self._page_snippets = {}
+        self.asset_manifest = None
+        self._manifest_key = None
+
+    def _prepare_staging(self, selective):
+        """
+        Start an atomic build in <output_dir>.staging. It is swapped in when
+        the build succeeds, keeping the previous build in
+        <output_dir>.previous (see publish.py), so a failed build leaves the
+        live directory untouched. Staging starts as a hardlinked copy of the
+        live directory, so unchanged files cost nothing, and every write
+        replaces files instead of rewriting them in place. The state needed
+        to trust the live directory is saved in the cache directory, so a
+        new process can stage incrementally too.
+        """
+        staging = self.output_dir
+        if os.path.exists(staging):
+            # Left over from a failed build
+            shutil.rmtree(staging)
+        trusted = self._published is not None and self._published == self._live_inode()
+        if not trusted:
+            # The live directory was changed behind our back
+            self._forget_outputs()
+        if os.path.isdir(self.live_dir) and (trusted or selective):
+            link_tree(self.live_dir, staging)
+
+    def _publish(self, result):
+        if not result.ok:
+            # What we know describes the staging directory, not the live one
+            self._published = None
+            result.published = False
+            self.log.info(f"Build failed, not publishing; staged output left in {self.output_dir}")
+            return
+        publish(self.output_dir, self.live_dir)
+        self._published = self._live_inode()
+        result.published = True
+        self.log.info(f"Published {self.live_dir}")
+        for paths in (result.pages_written, result.pages_skipped, result.pages_removed,
+                      result.assets_copied):
+            paths[:] = [self._live_path(path) for path in paths]
+        if self.cache_dir:
+            self._save_publish_state()
+
+    def _live_path(self, path):
+        rel_path = os.path.relpath(path, self.output_dir)
+        return os.path.join(self.live_dir, rel_path)
+
+    def _publish_options(self):
+        # Options that change static output without changing any source
+        return {
+            "copy_mode": self.copy_mode,
+            "minify": self.minifier is not None,
+            "basepath": self.basepath,
+        }
+
+    def _save_publish_state(self):
+        staging = self.output_dir
+        state = {
+            "live": self._published,
+            "options": self._publish_options(),
+            "static": self._static_snapshot,
+            "outputs": {
+                os.path.relpath(path, staging): digest for path, digest in self._outputs.items()
+            },
+            "pages": sorted(self._pages),
+            "listings": {
+                directory: [os.path.relpath(path, staging) for path in paths]
+                for directory, (_, paths) in self._listings.items()
+            },
+        }
+        path = self._cache_path("publish.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def _load_publish_state(self):
+        """
+        Restore what the last published build of this site wrote, if the
+        live directory is still the one it published.
+        """
+        try:
+            with open(self._cache_path("publish.json"), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("live") != self._live_inode() or state.get("options") != self._publish_options():
+            return
+        staging = self.output_dir
+        if state["static"] is not None:
+            self._static_snapshot = {rel: tuple(sig) for rel, sig in state["static"].items()}
+        self._outputs = {
+            os.path.join(staging, rel): digest for rel, digest in state["outputs"].items()
+        }
+        # Unknown signatures: every page is rendered once, but only written
+        # if its HTML differs from the published one
+        self._pages = {rel_path: (None, None, None) for rel_path in state["pages"]}
+        self._listings = {
+            directory: (None, [os.path.join(staging, rel) for rel in paths])
+            for directory, paths in state["listings"].items()
+        }
+        if self.copy_mode == "fingerprint":
+            self.asset_manifest = AssetManifest.load(os.path.join(self.live_dir, MANIFEST_NAME))
+            self._manifest_key = dict(self.asset_manifest.mapping)
+        self._published = state["live"]
+
+    # Change tracking
+
+    def _static_outputs(self):
+        """Output-relative paths of the static files."""
+        if self.copy_mode == "fingerprint" and self.asset_manifest is not None:
+            return [hashed_url.lstrip("/") for hashed_url in self.asset_manifest.mapping.values()]
+        return list(self._static_snapshot or ())
+
+    def _prune_orphans(self, result):
+        """
+        Remove HTML files of output_dir that this build did not produce,
+        e.g. left behind by pages that were renamed, and empty directories.
+        """
+        expected = {self.output_path(rel_path) for rel_path in self._pages}
+        for _, paths in self._listings.values():
+            expected.update(paths)
+        expected.update(
+            os.path.join(self.output_dir, *rel_path.split("/"))
+            for rel_path in self._static_outputs() if rel_path.endswith(".html")
+        )
+        for root, dirs, files in os.walk(self.output_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.endswith(".html") and path not in expected:
+                    self.log(f"Removing orphaned page {path}")
+                    self._remove_output(path)
+                    self._outputs.pop(path, None)
+                    result.pages_removed.append(path)
+        for output_dir in [self.output_dir] + [mirror_dir for _, mirror_dir in self.mirrors]:
+            for root, dirs, files in os.walk(output_dir, topdown=False):
+                if root != output_dir and not os.listdir(root):
+                    self.log(f"Removing empty directory {root}")
+                    os.rmdir(root)
+
+    def _track_changes(self, result):
+        """
+        Prune orphans from output_dir and its mirrors, then hash what
+        changed in output_dir since the previous build (see
+        changes.OutputManifest) into result.changes, e.g. for a CDN purge.
+        The hashes are kept in the cache directory, so the first build of a
+        new process is compared with the last one of the previous process:
+        files it rewrote with the same content do not count as changed. A
+        failed atomic build changes nothing and reports nothing.
+        """
+        if self.atomic and not result.ok:
+            # Nothing is published
+            return
+        self._prune_orphans(result)
+        state_path = self._cache_path("outputs.json")
+        if self._output_manifest is None:
+            self._output_manifest = OutputManifest.load(state_path) if state_path else OutputManifest()
+        manifest = OutputManifest.scan(self.output_dir, self._output_manifest)
+        result.changes = manifest.diff(self._output_manifest)
+        self._output_manifest = manifest
+        if state_path:
+            manifest.save(state_path)
+
+    # Archive output
+
+    def _archive_tmp_path(self):
+        # Same suffix, so open_archive picks the same type
+        directory, name = os.path.split(self.archive)
+        return os.path.join(directory, ".tmp-" + name)
+
+    def _open_archive(self):
+        """
+        Start writing the archive. Nothing is written to output_dir: static
+        files and pages are added as they are copied and rendered, in a
+        fixed order and with fixed timestamps (see archive.py), so the same
+        sources always give the same bytes. Every build writes the whole
+        archive, replacing the old one only if the build succeeds; rendered
+        pages are still cached between builds. BuildResult paths are where
+        the files would be in output_dir.
+        """
+        tmp_path = self._archive_tmp_path()
+        directory = os.path.dirname(tmp_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Replaces one left over from a failed build
+        self._archive = open_archive(tmp_path)
+        self._archived_sizes = {}
+
+    def _close_archive(self, result):
+        archive, self._archive = self._archive, None
+        archive.close()
+        tmp_path = self._archive_tmp_path()
+        if not result.ok:
+            os.remove(tmp_path)
+            result.published = False
+            self.log.info(f"Build failed, not writing {self.archive}")
+            return
+        os.replace(tmp_path, self.archive)
+        result.published = True
+        self.log.info(f"Wrote {self.archive}")
+
+    def _archive_name(self, path):
+        return os.path.relpath(path, self.output_dir).replace(os.sep, "/")
+
+    def _archive_static(self, result):
+        snapshot = self._scan_static()
+        for rel_path in sorted(snapshot):
+            src_path = os.path.join(self.static_dir, *rel_path.split("/"))
+            self.log(f"Archiving file: {src_path}")
+            if self.minifier is not None and rel_path.endswith(".css"):
+                with open(src_path, "r", encoding="utf-8") as f:
+                    css = self.minifier.minify("css", f.read(), src_path)
+                self._archive.add_bytes(rel_path, css.encode("utf-8"))
+            else:
+                self._archive.add_file(rel_path, src_path)
+            result.assets_copied.append(os.path.join(self.output_dir, *rel_path.split("/")))
+        self.log.info(f"Archived {len(snapshot)} static files")
+
+    def _archive_streamed_page(self, src_path, template, dest_path, links, includes,
+                               search_terms):
+        # stream_page needs a file: render next to the archive, then add it
+        fd, tmp_path = tempfile.mkstemp(suffix=".html", dir=os.path.dirname(self.archive) or None)
+        os.close(fd)
+        try:
+            stream_page(src_path, template, tmp_path, self.basepath, self.asset_manifest, links,
+                        includes, search_terms)
+            self._archive.add_file(self._archive_name(dest_path), tmp_path)
+            self._archived_sizes[dest_path] = os.path.getsize(tmp_path)
+        finally:
+            os.remove(tmp_path)
+
+    def _output_size(self, path):
+        if self._archive is not None:
+            return self._archived_sizes[path]
+        return os.path.getsize(path)
+
+    # Static files
+
+    def _scan_static(self):
+        snapshot = {}
+        for src_path, _ in list_files(self.static_dir, self.output_dir)[1]:
+            st = os.stat(src_path)
+            rel_path = os.path.relpath(src_path, self.static_dir).replace(os.sep, "/")
+            snapshot[rel_path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def _reset_output(self):
+        for output_dir in [self.output_dir] + [mirror_dir for _, mirror_dir in self.mirrors]:
+            if os.path.exists(output_dir):
+                self.log(f"Removing existing directory: {output_dir}")
+                shutil.rmtree(output_dir)
+            os.makedirs(output_dir)
+        self._outputs = {}
+
+    # Output targets
+
+    def _targets(self, path):
+        """
+        Yield (path, basepath) for an output path and its mirror paths.
+
+        Pages are rendered once, with basepath "/", and the basepath of each
+        target is applied just before writing; static files are copied to
+        mirrors from output_dir once it is up to date. Only streamed pages
+        are rendered once per target. BuildResult paths refer to output_dir.
+        """
+        yield path, self.basepath
+        if self.mirrors:
+            rel_path = os.path.relpath(path, self.output_dir)
+            for basepath, mirror_dir in self.mirrors:
+                yield os.path.join(mirror_dir, rel_path), basepath
+
+    def _remove_output(self, path):
+        """
+        Remove an output file and its mirrors.
+
+        Returns:
+            True if the file existed in output_dir
+        """
+        if self._archive is not None:
+            # Nothing is written to output_dir
+            return False
+        existed = False
+        for target_path, _ in self._targets(path):
+            if os.path.exists(target_path):
+                os.remove(target_path)
+                existed = existed or target_path == path
+        return existed
+
+    def _mirror_files(self, paths):
+        """Copy files of output_dir to the same place in every mirror."""
+        copies = []
+        for path in paths:
+            for target_path, _ in list(self._targets(path))[1:]:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                copies.append((path, target_path))
+        if copies:
+            copy_files(copies, log=self.log)
+
+    def _output_dir_inodes(self):
+        inodes = []
+        for output_dir in [self.output_dir] + [mirror_dir for _, mirror_dir in self.mirrors]:
+            try:
+                inodes.append(os.stat(output_dir).st_ino)
+            except FileNotFoundError:
+                inodes.append(None)
+        return inodes
+
+    def _sync_static(self, result):
+        snapshot = self._scan_static()
+        previous = self._static_snapshot
+        if not self.atomic and self._static_dirs != self._output_dir_inodes():
+            # An output directory was removed or replaced since the last
+            # copy (staging is checked against the live directory instead)
+            previous = None
+        if previous is not None and snapshot == previous:
+            if self.minifier is not None:
+                self._keep_minified_css(snapshot)
+            return
+
+        reset = previous is None or self.copy_mode != "copy"
+        if reset:
+            # First build, or a mode where file names or links depend on
+            # the whole tree: start over
+            self._reset_output()
+            if self.copy_mode == "dedupe":
+                stats = dedupe_copy(self.static_dir, self.output_dir)
+                self.log.info(f"Copied {stats.files} files, saved {stats.bytes_saved} bytes with hardlinks")
+            elif self.copy_mode == "fingerprint":
+                self.asset_manifest, _ = copy_fingerprinted(
+                    self.static_dir, self.output_dir, self._cache_path("assets.json")
+                )
+            copied = sorted(snapshot) if self.copy_mode == "copy" else []
+        else:
+            copied = [rel for rel, sig in sorted(snapshot.items()) if previous.get(rel) != sig]
+            for rel_path in previous:
+                if rel_path not in snapshot:
+                    self._remove_output(os.path.join(self.output_dir, *rel_path.split("/")))
+
+        copies = []
+        for rel_path in copied:
+            src_path = os.path.join(self.static_dir, *rel_path.split("/"))
+            dst_path = os.path.join(self.output_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            copies.append((src_path, dst_path))
+        if copies:
+            report = copy_files(copies, log=self.log)
+            self.log.info(report.summary())
+            self.log.event("static_copied", files=report.files, bytes=report.bytes,
+                           duration=round(report.seconds, 6))
+
+        if self.copy_mode == "copy":
+            result.assets_copied.extend(
+                os.path.join(self.output_dir, *rel.split("/")) for rel in copied
+            )
+        else:
+            result.assets_copied.extend(
+                os.path.join(self.output_dir, *rel.split("/")) for rel in sorted(snapshot)
+            )
+        if self.minifier is not None:
+            if self.copy_mode == "copy":
+                css_paths = [path for path in result.assets_copied if path.endswith(".css")]
+                for path in css_paths:
+                    self.minifier.minify_file("css", path)
+                fresh = set(copied)
+                self._keep_minified_css(rel for rel in snapshot if rel not in fresh)
+            else:
+                self.minifier.minify_tree("css", self.output_dir, ".css")
+        if self.mirrors:
+            if reset:
+                # output_dir holds nothing but the static files yet
+                for _, mirror_dir in self.mirrors:
+                    copy_tree(self.output_dir, mirror_dir, log=self.log)
+            else:
+                self._mirror_files(
+                    os.path.join(self.output_dir, *rel.split("/")) for rel in copied
+                )
+        self._static_snapshot = snapshot
+        self._static_dirs = self._output_dir_inodes()
+
+    def _keep_minified_css(self, rel_paths):
+        """Keep the minify cache entries of stylesheets left in the output as they are."""
+        paths = []
+        for rel_path in rel_paths:
+            if rel_path.endswith(".css"):
+                url = "/" + rel_path
+                if self.asset_manifest is not None:
+                    url = self.asset_manifest.mapping.get(url, url)
+                paths.append(os.path.join(self.output_dir, *url[1:].split("/")))
+        self.minifier.keep(paths)
+
+    def _copy_selected_static(self, result, patterns):
+        os.makedirs(self.output_dir, exist_ok=True)
+        copied = copy_selected(self.static_dir, self.output_dir, patterns)
+        for path in copied:
+            self.log(f"Copying file: {path}")
+            if self.minifier is not None and path.endswith(".css"):
+                self.minifier.minify_file("css", path)
+        result.assets_copied.extend(copied)
+        self._mirror_files(copied)
+        if self.copy_mode == "fingerprint" and self.asset_manifest is None:
+            # Keep rewriting references to assets fingerprinted by the
+            # last full build
+            self.asset_manifest = AssetManifest.load(os.path.join(self.output_dir, MANIFEST_NAME))
+
+    # Pages
+
+    def _refresh_templates(self):
+        """
+        Recompile templates whose files changed. Pages rendered with a
+        template that was dropped are re-rendered on their next build.
+        """
+        if self.templates.refresh():
+            self._invalidate_listings()
+        if self.includes is not None:
+            self.includes.refresh()
+
+    def _template_for(self, metadata):
+        """
+        Return the compiled template for a page: for "layout: post" in its
+        front matter, layouts/post.html next to the default template, else
+        the default.
+        """
+        layout = metadata.get("layout")
+        return self.templates.get(layout_template_name(layout) if layout else self._template_name)
+
+    def _iter_sources(self, patterns):
+        if patterns is not None:
+            for src_path, rel_path in iter_selected_files(self.content_dir, patterns):
+                if rel_path.endswith(".md"):
+                    yield src_path, rel_path
+            return
+        for root, dirs, files in os.walk(self.content_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".md"):
+                    src_path = os.path.join(root, name)
+                    rel_path = os.path.relpath(src_path, self.content_dir).replace(os.sep, "/")
+                    yield src_path, rel_path
+
+    def output_path(self, rel_path):
+        """Return the output path of the page for a content-relative .md path."""
+        return os.path.join(self.output_dir, *rel_path[:-len(".md")].split("/")) + ".html"
+
+    # Wiki links
+
+    def _wiki_index(self):
+        """
+        Return the wiki link index of the current build, building it if
+        needed.
+
+        Pages link to each other with [[target]] or [[target|label]] (see
+        wikilinks.py). The index is built from a scan of each page's title
+        only, once per build and only if a page being rendered has a wiki
+        link; titles are cached by source signature. A cached page is
+        re-rendered when one of its targets resolves differently, e.g.
+        because that page changed its title or was removed.
+        """
+        if self._wiki is not None:
+            return self._wiki
+        index = WikiIndex()
+        titles = {}
+        for src_path, rel_path in self._iter_sources(None):
+            st = os.stat(src_path)
+            signature = (st.st_size, st.st_mtime_ns)
+            cached = self._titles.get(rel_path)
+            if cached is None or cached[0] != signature:
+                try:
+                    cached = (signature, scan_title(src_path))
+                except Exception:
+                    # Still linkable by path
+                    cached = (signature, None)
+            titles[rel_path] = cached
+            index.add(rel_path, cached[1])
+        self._titles = titles
+        self._wiki = index
+        return index
+
+    def _links_unchanged(self, rel_path):
+        links = self._page_links.get(rel_path)
+        return links is None or links.unchanged(self._wiki_index())
+
+    def _page_links_for(self, markdown=None):
+        """A PageLinks for a page about to be rendered, or None if it has no wiki link."""
+        if markdown is not None and "[[" not in markdown:
+            return None
+        return PageLinks(self._wiki_index())
+
+    def _record_links(self, result, src_path, rel_path, links):
+        if links is None or not links.targets:
+            self._page_links.pop(rel_path, None)
+            return
+        self._page_links[rel_path] = links
+        for message in links.warnings:
+            result.warnings.append((src_path, message))
+
+    # Includes
+
+    def _page_includes_for(self, markdown=None):
+        """
+        A PageIncludes for a page about to be rendered, or None if it cannot
+        include.
+
+        A page includes a file of include_dir with a block of its own:
+        {% include "partials/license.md" %} (see includes.py). Each file is
+        rendered once and shared by every page including it; every build
+        checks once whether its files changed, and re-renders only the pages
+        that used a fragment that changed.
+        """
+        if self.includes is None or (markdown is not None and "{%" not in markdown):
+            return None
+        return PageIncludes(self.includes)
+
+    def _includes_unchanged(self, rel_path):
+        fragments = self._page_includes.get(rel_path, ())
+        return all(self.includes.is_cached(fragment) for fragment in fragments)
+
+    def _record_includes(self, rel_path, includes):
+        if includes is None or not includes.used:
+            self._page_includes.pop(rel_path, None)
+        else:
+            self._page_includes[rel_path] = includes.used
+
+    def _build_pages(self, result, patterns):
+        self._refresh_templates()
+        # Pages may have been added, removed or retitled since the last build
+        self._wiki = None
+        manifest_key = dict(self.asset_manifest.mapping) if self.asset_manifest else None
+        if manifest_key != self._manifest_key:
+            self._pages = {}
+            self._invalidate_listings()
+            self._manifest_key = manifest_key
+
+        log = self.log
+        events = log.events is not None
+        sources = list(self._iter_sources(patterns))
+        seen = set()
+        for number, (src_path, rel_path) in enumerate(sources, start=1):
+            seen.add(rel_path)
+            dest_path = self.output_path(rel_path)
+            if events:
+                log.event("page_started", path=rel_path)
+                page_start = time.perf_counter()
+                written = len(result.pages_written)
+            try:
+                self._build_page(result, src_path, rel_path, dest_path)
+            except Exception as e:
+                self._metadata.pop(rel_path, None)
+                result.errors.append((src_path, str(e)))
+                log(f"Error building {src_path}: {e}")
+                log.event("page_failed", path=rel_path, error=str(e))
+            else:
+                if events:
+                    log.event(
+                        "page_finished", path=rel_path,
+                        status="written" if len(result.pages_written) > written else "unchanged",
+                        bytes=self._output_size(dest_path),
+                        duration=round(time.perf_counter() - page_start, 6),
+                    )
+            log.progress("Pages", number, len(sources))
+
+        if patterns is None:
+            for rel_path in list(self._pages):
+                if rel_path not in seen:
+                    del self._pages[rel_path]
+                    self._metadata.pop(rel_path, None)
+                    self._page_links.pop(rel_path, None)
+                    self._page_includes.pop(rel_path, None)
+                    self._page_snippets.pop(rel_path, None)
+                    dest_path = self.output_path(rel_path)
+                    self._outputs.pop(dest_path, None)
+                    if self._remove_output(dest_path):
+                        result.pages_removed.append(dest_path)
+            if self._search is not None:
+                self._search.retain(seen)
+
+    def _build_page(self, result, src_path, rel_path, dest_path):
+        st = os.stat(src_path)
+        signature = (st.st_size, st.st_mtime_ns)
+        archiving = self._archive is not None
+        if not archiving:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        if self.stream_threshold is not None and st.st_size >= self.stream_threshold:
+            # Too big to cache in memory; only re-stream when it changed
+            cached = self._pages.get(rel_path)
+            if (not archiving and cached is not None and cached[0] == signature
+                    and self.templates.is_cached(cached[2]) and os.path.exists(dest_path)
+                    and self._links_unchanged(rel_path) and self._includes_unchanged(rel_path)):
+                highlight_cache.keep(self._page_snippets.get(rel_path, ()))
+                result.pages_skipped.append(dest_path)
+                return
+            with open(src_path, "r", encoding="utf-8") as f:
+                metadata, _ = read_front_matter(f)
+            template = self._template_for(metadata)
+            # Too big to check for wiki links before rendering
+            links = self._page_links_for()
+            includes = self._page_includes_for()
+            # Indexed as it streams, rather than read whole afterwards
+            search_terms = PageTerms() if self.search_index else None
+            highlight_cache.begin_page()
+            try:
+                if archiving:
+                    self.log(f"Streaming page from {src_path} to {self.archive}")
+                    self._archive_streamed_page(src_path, template, dest_path, links, includes,
+                                                search_terms)
+                else:
+                    for i, (target_path, basepath) in enumerate(self._targets(dest_path)):
+                        self.log(f"Streaming page from {src_path} to {target_path}")
+                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                        if os.path.exists(target_path):
+                            os.remove(target_path)
+                        # Mirrors hold the same blocks: collect the terms once
+                        stream_page(src_path, template, target_path, basepath,
+                                    self.asset_manifest, links, includes,
+                                    search_terms if i == 0 else None)
+            finally:
+                self._page_snippets[rel_path] = highlight_cache.end_page()
+            self._record_links(result, src_path, rel_path, links)
+            self._record_includes(rel_path, includes)
+            self._metadata[rel_path] = (scan_title(src_path), metadata.get("date"))
+            self._pages[rel_path] = (signature, None, template)
+            if search_terms is not None:
+                self._search_state().add_page(rel_path, search_terms)
+            self._outputs.pop(dest_path, None)
+            result.pages_written.append(dest_path)
+            return
+
+        cached = self._pages.get(rel_path)
+        if (cached is not None and cached[0] == signature and cached[1] is not None
+                and self.templates.is_cached(cached[2]) and self._links_unchanged(rel_path)
+                and self._includes_unchanged(rel_path)):
+            html = cached[1]
+            highlight_cache.keep(self._page_snippets.get(rel_path, ()))
+            if self.minifier is not None:
+                self.minifier.keep([dest_path])
+        else:
+            with open(src_path, "r", encoding="utf-8") as f:
+                markdown = f.read()
+            metadata, _ = split_front_matter(markdown)
+            template = self._template_for(metadata)
+            links = self._page_links_for(markdown)
+            includes = self._page_includes_for(markdown)
+            highlight_cache.begin_page()
+            try:
+                html = render_page(markdown, template, "/", self.asset_manifest, links, includes)
+            finally:
+                self._page_snippets[rel_path] = highlight_cache.end_page()
+            self._record_links(result, src_path, rel_path, links)
+            self._record_includes(rel_path, includes)
+            if self.minifier is not None:
+                html = self.minifier.minify("html", html, dest_path)
+            # Every rendered page embeds its template
+            self._pages[rel_path] = (signature, html, template)
+            self._metadata[rel_path] = (extract_title(markdown), metadata.get("date"))
+            if self.search_index:
+                self._search_state().update_page(rel_path, markdown)
+
+        self._write_output(result, dest_path, html)
+
+    def _write_output(self, result, dest_path, html):
+        """
+        Write a page, rendered with basepath "/", to dest_path and its
+        mirrors with their basepaths applied, unless the same content was
+        already written there.
+        """
+        if self._archive is not None:
+            self.log(f"Archiving page {dest_path}")
+            data = apply_basepath(html, self.basepath).encode("utf-8")
+            self._archive.add_bytes(self._archive_name(dest_path), data)
+            self._archived_sizes[dest_path] = len(data)
+            result.pages_written.append(dest_path)
+            return
+        digest = hashlib.sha1(html.encode("utf-8")).hexdigest()
+        if self._outputs.get(dest_path) == digest and all(
+            os.path.exists(path) for path, _ in self._targets(dest_path)
+        ):
+            result.pages_skipped.append(dest_path)
+            return
+        for target_path, basepath in self._targets(dest_path):
+            self.log(f"Writing page {target_path}")
+            if target_path != dest_path:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # Replace rather than rewrite: in a staged build the file may be
+            # a hardlink into the live site
+            if os.path.exists(target_path):
+                os.remove(target_path)
+            with open(target_path, "w", encoding="utf-8") as f:
+                f.write(apply_basepath(html, basepath))
+        self._outputs[dest_path] = digest
+        result.pages_written.append(dest_path)
+
+    # Listings
+
+    def _invalidate_listings(self):
+        """Force every listing to be re-rendered, keeping track of its outputs."""
+        self._listings = {
+            directory: (None, paths) for directory, (_, paths) in self._listings.items()
+        }
+
+    def _build_listings(self, result):
+        """
+        Render the listing pages of each directory in `listings`, at
+        <dir>/index.html, <dir>/page/2/index.html and so on, from the titles
+        and front matter dates recorded while rendering. A listing is only
+        re-rendered when a member page is added, removed, or changes its
+        title or date.
+        """
+        try:
+            template = self.templates.get(self._template_name)
+        except TemplateError as e:
+            result.errors.append((self.template_path, str(e)))
+            return
+        for directory in self.listings:
+            entries = [
+                ListingEntry(rel_path, title, date)
+                for rel_path, (title, date) in sorted(self._metadata.items())
+                if is_member(rel_path, directory)
+            ]
+            previous = self._listings.get(directory)
+            if self._archive is None and previous is not None and previous[0] == entries and all(
+                os.path.exists(path) for path in previous[1]
+            ):
+                result.pages_skipped.extend(previous[1])
+                if self.minifier is not None:
+                    self.minifier.keep(previous[1])
+                continue
+
+            paths = []
+            for rel_path, markdown in build_listing(
+                directory, entries, self.listing_page_size, self.listing_sort
+            ):
+                dest_path = self.output_path(rel_path)
+                if rel_path in self._pages:
+                    result.errors.append(
+                        (os.path.join(self.content_dir, *rel_path.split("/")),
+                         f"Page conflicts with the listing of {directory}/")
+                    )
+                    continue
+                html = render_page(markdown, template, "/", self.asset_manifest)
+                if self.minifier is not None:
+                    html = self.minifier.minify("html", html, dest_path)
+                if self._archive is None:
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                self._write_output(result, dest_path, html)
+                paths.append(dest_path)
+
+            if previous is not None:
+                for dest_path in previous[1]:
+                    if dest_path not in paths and self._remove_output(dest_path):
+                        self._outputs.pop(dest_path, None)
+                        result.pages_removed.append(dest_path)
+            self._listings[directory] = (entries, paths)
+
+    # Search index
+
+    def _search_state(self):
+        if self._search is None:
+            state_path = self._cache_path("search.json")
+            self._search = SearchIndex.load(state_path) if state_path else SearchIndex()
+        return self._search
+
+    def _write_search_index(self):
+        # Every page was indexed when it was rendered or streamed
+        index = self._search_state()
+        if self._archive is not None:
+            for name, content in sorted(index.files(self.basepath).items()):
+                self._archive.add_bytes("search/" + name, content.encode("utf-8"))
+        else:
+            index.write(os.path.join(self.output_dir, "search"), self.basepath)
+        for basepath, mirror_dir in self.mirrors:
+            index.write(os.path.join(mirror_dir, "search"), basepath)
+        state_path = self._cache_path("search.json")
+        if state_path:
+            index.save(state_path)
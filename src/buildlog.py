@@ -0,0 +1,138 @@
+import json
+import sys
+import time
+
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+
+# Buffered output is written out once it reaches this many characters
+BUFFER_SIZE = 64 * 1024
+# Minimum seconds between two updates of the progress line
+PROGRESS_INTERVAL = 0.2
+
+
+def _write_stdout(text):
+    sys.stdout.write(text + "\n")
+    sys.stdout.flush()
+
+
+class BuildLog:
+    """
+    Build output at a verbosity level:
+    - QUIET: errors only
+    - NORMAL: errors and a few summary lines per build
+    - VERBOSE: also a line per file copied, page written, directory removed
+
+    Calling the log logs a verbose detail message, so a BuildLog can be
+    passed wherever a log callable is expected. Output is buffered and
+    handed to write() a block of lines at a time; errors flush the buffer
+    so they are seen in order and immediately.
+
+    With events, a JSON object per line is written to that file for tools to
+    consume, e.g. {"event": "page_finished", "time": 0.0123, "path":
+    "blog/index.md", "status": "written", "bytes": 1234, "duration":
+    0.0004}. "time" is seconds since the log was created.
+
+    Args:
+        level: QUIET, NORMAL or VERBOSE
+        write: Callable receiving a block of lines joined with newlines
+            (default: standard output)
+        events: Optional writable text stream for the JSON-lines events
+        buffer_size: Characters to buffer before writing; 0 writes every
+            message as it is logged
+        interactive: Whether to show a progress line; by default, when
+            writing to a terminal
+    """
+
+    def __init__(self, level=NORMAL, write=None, events=None, buffer_size=BUFFER_SIZE,
+                 interactive=None):
+        self.level = level
+        self.events = events
+        self.buffer_size = buffer_size
+        if interactive is None:
+            interactive = write is None and sys.stdout.isatty()
+        self.interactive = interactive
+        self._write = write or _write_stdout
+        self._buffer = []
+        self._buffered = 0
+        self._start = time.perf_counter()
+        self._last_progress = 0.0
+        self._progress_shown = False
+
+    def __call__(self, message):
+        if self.level >= VERBOSE:
+            self._emit(message)
+
+    def info(self, message):
+        if self.level >= NORMAL:
+            self._emit(message)
+
+    def error(self, message):
+        self._emit(message)
+        self.flush()
+
+    def _emit(self, message):
+        if self._progress_shown:
+            # Make the next line overwrite the progress line
+            message = "\r\033[K" + message
+            self._progress_shown = False
+        self._buffer.append(message)
+        self._buffered += len(message)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write("\n".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        if self.events is not None:
+            self.events.flush()
+
+    def event(self, kind, **fields):
+        """Record an event in the JSON-lines stream, if there is one."""
+        if self.events is None:
+            return
+        record = {"event": kind, "time": round(time.perf_counter() - self._start, 6)}
+        record.update(fields)
+        self.events.write(json.dumps(record) + "\n")
+
+    def progress(self, stage, done, total):
+        """
+        Update the progress line of an interactive log, at most every
+        PROGRESS_INTERVAL seconds and always for the last item.
+        """
+        if not self.interactive or self.level < NORMAL:
+            return
+        now = time.perf_counter()
+        if done < total and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self.flush()
+        sys.stdout.write(f"\r\033[K{stage}: {done}/{total}")
+        sys.stdout.flush()
+        self._progress_shown = True
+
+    def close(self):
+        """Flush, and close the event stream."""
+        self.flush()
+        if self._progress_shown:
+            sys.stdout.write("\r\033[K")
+            sys.stdout.flush()
+            self._progress_shown = False
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+
+def as_build_log(log):
+    """
+    Return log if it is a BuildLog, otherwise a verbose, unbuffered
+    BuildLog passing every message to the callable log (or dropping them
+    if log is None).
+    """
+    if isinstance(log, BuildLog):
+        return log
+    return BuildLog(VERBOSE, write=log or (lambda message: None), buffer_size=0,
+                    interactive=False)
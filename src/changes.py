@@ -0,0 +1,117 @@
+import json
+import os
+
+from asset_copy import hash_files
+
+
+class ChangeSet:
+    """
+    Output files that differ from the previous build, as sorted paths
+    relative to the output directory ("blog/index.html").
+    """
+
+    def __init__(self, added=(), changed=(), removed=()):
+        self.added = sorted(added)
+        self.changed = sorted(changed)
+        self.removed = sorted(removed)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return (
+            f"ChangeSet(added={len(self.added)}, changed={len(self.changed)}, "
+            f"removed={len(self.removed)})"
+        )
+
+    def urls(self, basepath="/"):
+        """
+        Return the URL paths to invalidate: every added, changed and removed
+        file under basepath, plus the directory URL ("/blog/") of each
+        index.html, since it is served there too.
+        """
+        urls = set()
+        for rel_path in self.added + self.changed + self.removed:
+            urls.add(basepath + rel_path)
+            if rel_path == "index.html" or rel_path.endswith("/index.html"):
+                urls.add(basepath + rel_path[:-len("index.html")])
+        return sorted(urls)
+
+    def write(self, path, basepath="/"):
+        """
+        Write the changes to path as JSON: "added", "changed" and "removed"
+        relative paths and the "urls" to invalidate.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "basepath": basepath,
+                "added": self.added,
+                "changed": self.changed,
+                "removed": self.removed,
+                "urls": self.urls(basepath),
+            }, f, indent=2)
+
+
+class OutputManifest:
+    """
+    The files of an output directory: relative path -> [size, mtime_ns,
+    sha1]. Comparing the hashes of two manifests tells which outputs a build
+    really changed, even when it rewrote files with the same content.
+    """
+
+    def __init__(self, files=None):
+        self.files = files or {}
+
+    @classmethod
+    def scan(cls, directory, previous=None):
+        """
+        Record every file under directory. Files whose size and mtime match
+        their entry in the previous manifest keep its hash; the rest are
+        hashed.
+        """
+        known = previous.files if previous is not None else {}
+        files = {}
+        stale = []
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                rel_path = os.path.relpath(path, directory).replace(os.sep, "/")
+                signature = [st.st_size, st.st_mtime_ns]
+                cached = known.get(rel_path)
+                if cached is not None and cached[:2] == signature:
+                    files[rel_path] = cached
+                else:
+                    files[rel_path] = signature
+                    stale.append((rel_path, path))
+        for (rel_path, _), digest in zip(stale, hash_files([path for _, path in stale])):
+            files[rel_path] = files[rel_path] + [digest]
+        return cls(files)
+
+    def diff(self, previous):
+        """Return the ChangeSet from the previous manifest to this one."""
+        old = previous.files
+        return ChangeSet(
+            added=[rel for rel in self.files if rel not in old],
+            changed=[rel for rel, entry in self.files.items()
+                     if rel in old and old[rel][2] != entry[2]],
+            removed=[rel for rel in old if rel not in self.files],
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest written by save(), or return an empty one."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.files, f)
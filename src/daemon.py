@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+from build_client import default_socket_path, send_request
+from main import create_log, create_site, default_project_root, parse_args, run_build
+
+
+def _source_snapshot(paths):
+    snapshot = {}
+    for path in paths:
+        try:
+            snapshot[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            snapshot[path] = None
+    return snapshot
+
+
+def _generator_sources():
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    return sorted(
+        os.path.join(src_dir, name) for name in os.listdir(src_dir)
+        if name.endswith(".py")
+    )
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one request: a JSON line {"command": ..., ...}. Output of a
+    build is streamed back as {"log": line} messages, followed by one final
+    message with the result.
+    """
+
+    def handle(self):
+        self.disconnected = False
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            self.respond({"status": 2, "error": "Invalid request"})
+            return
+        command = request.get("command")
+
+        if command == "ping":
+            self.respond({"status": 0, "builds": self.server.builds})
+        elif command == "stop":
+            self.respond({"status": 0})
+            self.server.stop()
+        elif command == "build":
+            if self.server.is_stale():
+                # The generator changed on disk; the client builds in
+                # process with the new code and we step aside
+                self.respond({"restart": True})
+                self.server.stop()
+                return
+            status = self.server.build(request.get("argv", []), request.get("cwd", "."), self.log)
+            self.respond({"status": status})
+        else:
+            self.respond({"status": 2, "error": f"Unknown command: {command}"})
+
+    def log(self, message):
+        self.respond({"log": message})
+
+    def respond(self, message):
+        if self.disconnected:
+            return
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError:
+            # Keep building for the next request even if nobody listens
+            self.disconnected = True
+
+
+class BuildDaemon(socketserver.UnixStreamServer):
+    """
+    Keeps the generator warm between builds: a builder.Site is kept per
+    project and set of build options, so its template, rendered pages,
+    static file snapshot and search index survive from one request to the
+    next. Requests are handled one at a time.
+
+    If any of watch_paths (by default the generator's own modules) changes
+    on disk, build requests are refused with a restart message and the
+    daemon shuts down, so clients never build with outdated code.
+    """
+
+    def __init__(self, socket_path, watch_paths=None):
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                # Left behind by a daemon that did not shut down cleanly
+                os.remove(socket_path)
+            else:
+                raise RuntimeError(f"A build daemon is already listening on {socket_path}")
+            finally:
+                probe.close()
+        socket_dir = os.path.dirname(socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+        super().__init__(socket_path, BuildRequestHandler)
+        self.socket_path = socket_path
+        self.builds = 0
+        self.sites = {}
+        self._watch_paths = list(watch_paths if watch_paths is not None else _generator_sources())
+        self._watch_snapshot = _source_snapshot(self._watch_paths)
+
+    def is_stale(self):
+        return _source_snapshot(self._watch_paths) != self._watch_snapshot
+
+    def stop(self):
+        """Stop serve_forever(); safe to call from a request handler."""
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.socket_path)
+
+    def build(self, argv, cwd, log):
+        """
+        Run one build as `python3 src/main.py *argv` would from cwd.
+
+        Returns:
+            The exit status of the build
+        """
+        stderr = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(stderr):
+                args = parse_args(argv)
+        except SystemExit as e:
+            for line in stderr.getvalue().splitlines():
+                log(line)
+            return e.code
+
+        project_root = os.path.join(cwd, args.project_dir or default_project_root())
+        project_root = os.path.abspath(project_root)
+        if args.cache_dir:
+            args.cache_dir = os.path.abspath(os.path.join(cwd, args.cache_dir))
+        if args.memprofile:
+            args.memprofile = os.path.abspath(os.path.join(cwd, args.memprofile))
+        args.mirror = [
+            (mirror_basepath, os.path.abspath(os.path.join(cwd, mirror_dir)))
+            for mirror_basepath, mirror_dir in args.mirror
+        ]
+        if args.log_events:
+            args.log_events = os.path.abspath(os.path.join(cwd, args.log_events))
+        if args.archive:
+            args.archive = os.path.abspath(os.path.join(cwd, args.archive))
+        if args.changes:
+            args.changes = os.path.abspath(os.path.join(cwd, args.changes))
+        key = (project_root, args.basepath, args.cache_dir, args.copy_mode,
+               args.minify, args.search_index, args.stream_threshold,
+               tuple(args.listing), args.listing_page_size, args.listing_sort,
+               args.atomic, tuple(args.mirror), args.archive, bool(args.changes))
+
+        self.builds += 1
+        # Output goes back to the client a block of lines at a time
+        build_log = create_log(args, write=log)
+        site = self.sites.get(key)
+        if site is None:
+            site = create_site(args, project_root, build_log)
+            self.sites[key] = site
+        site.log = build_log
+        try:
+            return run_build(site, args, build_log)
+        except Exception as e:
+            # The site may be half-built; start it over on the next request
+            del self.sites[key]
+            build_log.error(f"Error: {e}")
+            return 1
+        finally:
+            build_log.close()
+
+
+def main():
+    """
+    Run the build daemon in the foreground, or stop a running one.
+    """
+    parser = argparse.ArgumentParser(description="Keep the generator warm for fast rebuilds.")
+    parser.add_argument("--socket", default=None,
+                        help="Unix socket path (default: $SSG_DAEMON_SOCKET or .cache/daemon.sock)")
+    parser.add_argument("--stop", action="store_true", help="stop the running daemon")
+    args = parser.parse_args(sys.argv[1:])
+    socket_path = args.socket or default_socket_path()
+
+    if args.stop:
+        if send_request(socket_path, {"command": "stop"}) is None:
+            print(f"No build daemon listening on {socket_path}")
+            sys.exit(1)
+        print("Build daemon stopped")
+        return
+
+    server = BuildDaemon(socket_path)
+    print(f"Build daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import hashlib
+import mimetypes
+import os
+import posixpath
+import sys
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from frontmatter import split_front_matter
+from includes import IncludeLoader, PageIncludes
+from main import render_page, scan_title
+from templates import TemplateLoader, layout_template_name
+from wikilinks import PageLinks, WikiIndex
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class RenderedPage:
+    """
+    An HTML page rendered in memory, together with the modification times
+    of the files it was rendered from and the targets its wiki links
+    resolved to, so staleness can be detected.
+
+    - sources: path -> mtime_ns of its markdown, template and include files
+    """
+
+    def __init__(self, body, sources, mtime, template=None, links=None):
+        self.body = body
+        self.sources = sources
+        self.mtime = mtime
+        self.template = template
+        self.links = links
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def is_current(self):
+        """Return True if none of the files it was rendered from changed."""
+        for path, mtime in self.sources.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+
+class PageCache:
+    """
+    Renders pages from markdown on first request and keeps the results in a
+    least-recently-used cache. Every lookup compares the modification time
+    of the markdown file, the template files and the included files with
+    the ones the cached page was rendered from, so edits show up on the
+    next reload. Pages with
+    wiki links are also re-rendered when a link target is added, removed or
+    retitled.
+    """
+
+    def __init__(self, content_dir, template_path, basepath="/", max_size=DEFAULT_CACHE_SIZE,
+                 include_dir=None):
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.basepath = basepath
+        self.max_size = max_size
+        self.renders = 0
+        self.templates = TemplateLoader(os.path.dirname(os.path.abspath(template_path)))
+        self.includes = IncludeLoader(include_dir) if include_dir else None
+        self._pages = OrderedDict()
+        # Rel path -> ((size, mtime_ns), title) of every page, for the wiki index
+        self._titles = {}
+        self._lock = threading.Lock()
+
+    def source_for(self, url_path):
+        """
+        Map a URL path to the markdown file it is generated from.
+
+        "/", "/blog/tom", "/blog/tom/" and "/blog/tom/index.html" all map to
+        the directory's index.md; "/about.html" maps to about.md.
+
+        Returns:
+            The markdown file path, or None if there is none
+        """
+        rel_path = posixpath.normpath(url_path).lstrip("/")
+        if rel_path.startswith(".."):
+            return None
+        if rel_path in ("", "."):
+            candidates = ["index.md"]
+        elif rel_path.endswith(".html"):
+            candidates = [rel_path[:-len(".html")] + ".md"]
+        else:
+            candidates = [posixpath.join(rel_path, "index.md"), rel_path + ".md"]
+        for candidate in candidates:
+            path = os.path.join(self.content_dir, *candidate.split("/"))
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _wiki_index(self):
+        """
+        Return a WikiIndex of the pages currently in content_dir. Titles
+        are only scanned again from files whose size or mtime changed. Call
+        with the lock held.
+        """
+        index = WikiIndex()
+        titles = {}
+        for root, dirs, files in os.walk(self.content_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(".md"):
+                    continue
+                src_path = os.path.join(root, name)
+                rel_path = os.path.relpath(src_path, self.content_dir).replace(os.sep, "/")
+                st = os.stat(src_path)
+                signature = (st.st_size, st.st_mtime_ns)
+                cached = self._titles.get(rel_path)
+                if cached is None or cached[0] != signature:
+                    try:
+                        cached = (signature, scan_title(src_path))
+                    except Exception:
+                        # Still linkable by path
+                        cached = (signature, None)
+                titles[rel_path] = cached
+                index.add(rel_path, cached[1])
+        self._titles = titles
+        return index
+
+    def get(self, md_path):
+        """
+        Return the RenderedPage for a markdown file, rendering it if it is
+        not cached or its sources changed since it was rendered.
+        """
+        with self._lock:
+            page = self._pages.get(md_path)
+            if (page is not None and page.is_current()
+                    and (page.links is None or page.links.unchanged(self._wiki_index()))):
+                self._pages.move_to_end(md_path)
+                return page
+
+        md_mtime = os.stat(md_path).st_mtime_ns
+
+        # Render outside the lock so slow pages don't block other requests
+        with open(md_path, "r", encoding="utf-8") as f:
+            markdown_content = f.read()
+        metadata, _ = split_front_matter(markdown_content)
+        layout = metadata.get("layout")
+        with self._lock:
+            template = self.templates.get(
+                layout_template_name(layout) if layout else os.path.basename(self.template_path)
+            )
+            links = PageLinks(self._wiki_index()) if "[[" in markdown_content else None
+            includes = None
+            if self.includes is not None and "{%" in markdown_content:
+                self.includes.refresh()
+                # The loader has a lock of its own for the render below
+                includes = PageIncludes(self.includes)
+        body = render_page(markdown_content, template, self.basepath,
+                           links=links, includes=includes).encode("utf-8")
+        sources = {md_path: md_mtime}
+        sources.update(template.dependencies)
+        for fragment in (includes.used if includes is not None else ()):
+            sources.update(fragment.dependencies)
+        page = RenderedPage(body, sources, max(sources.values()) / 1e9, template, links)
+
+        with self._lock:
+            self.renders += 1
+            self._pages[md_path] = page
+            self._pages.move_to_end(md_path)
+            while len(self._pages) > self.max_size:
+                self._pages.popitem(last=False)
+        return page
+
+
+class DevRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves rendered pages from the server's PageCache and files from its
+    static directory, answering conditional requests with 304.
+    """
+
+    server_version = "StaticSiteDevServer/1.0"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        url_path = unquote(urlsplit(self.path).path)
+
+        md_path = self.server.pages.source_for(url_path)
+        if md_path is not None:
+            try:
+                page = self.server.pages.get(md_path)
+            except Exception as e:
+                self._send_error(500, f"Failed to render {md_path}: {e}")
+                return
+            self._send(page.body, "text/html; charset=utf-8", page.etag, page.mtime, send_body)
+            return
+
+        static_path = self._static_path(url_path)
+        if static_path is None:
+            self._send_error(404, f"Not found: {url_path}")
+            return
+        st = os.stat(static_path)
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        if self._not_modified(etag, st.st_mtime):
+            self._send_not_modified(etag, st.st_mtime)
+            return
+        with open(static_path, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(static_path)[0] or "application/octet-stream"
+        self._send(body, content_type, etag, st.st_mtime, send_body)
+
+    def _static_path(self, url_path):
+        rel_path = posixpath.normpath(url_path).lstrip("/")
+        if rel_path in ("", ".") or rel_path.startswith(".."):
+            return None
+        path = os.path.join(self.server.static_dir, *rel_path.split("/"))
+        return path if os.path.isfile(path) else None
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_not_modified(self, etag, mtime):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.end_headers()
+
+    def _send(self, body, content_type, etag, mtime, send_body):
+        if self._not_modified(etag, mtime):
+            self._send_not_modified(etag, mtime)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        # Always revalidate so edits show up, but let the 304 path make
+        # reloads cheap
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_error(self, code, message):
+        body = message.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+class DevServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server rendering content_dir on demand. Nothing is
+    rendered at startup.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, content_dir, static_dir, template_path, basepath="/",
+                 cache_size=DEFAULT_CACHE_SIZE, include_dir=None):
+        super().__init__(address, DevRequestHandler)
+        self.static_dir = static_dir
+        self.pages = PageCache(content_dir, template_path, basepath, cache_size, include_dir)
+
+
+def main():
+    """
+    Serve the site from memory for local development.
+    """
+    parser = argparse.ArgumentParser(description="Serve the site, rendering pages on request.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="number of rendered pages kept in memory")
+    args = parser.parse_args(sys.argv[1:])
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(script_dir)
+
+    server = DevServer(
+        (args.host, args.port),
+        os.path.join(project_root, "content"),
+        os.path.join(project_root, "static"),
+        os.path.join(project_root, "template.html"),
+        cache_size=args.cache_size,
+        include_dir=os.path.join(project_root, "includes"),
+    )
+    print(f"Serving on http://{args.host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
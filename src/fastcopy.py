@@ -0,0 +1,203 @@
+import errno
+import os
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Linux ioctl that makes dst share src's extents (btrfs, XFS, overlayfs...)
+FICLONE = 0x40049409
+
+DEFAULT_WORKERS = 4
+# Files at least this large are dropped from the page cache after copying
+FADVISE_THRESHOLD = 8 * 1024 * 1024
+USERSPACE_CHUNK = 1024 * 1024
+# Upper bound for one copy_file_range/sendfile call
+KERNEL_CHUNK = 1 << 30
+
+# errnos meaning "this copy method does not work for these files", as
+# opposed to a real I/O error
+_UNSUPPORTED = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY,
+}
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class CopyReport:
+    """
+    Summary of a copy_files call.
+    - files: number of files copied
+    - bytes: total size of the files copied
+    - seconds: wall-clock time spent
+    - methods: Counter of how files were copied ("reflink",
+      "copy_file_range", "sendfile", "userspace")
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.methods = Counter()
+
+    @property
+    def throughput(self):
+        """Bytes per second, or 0.0 if nothing was timed."""
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        methods = ", ".join(f"{count} {name}" for name, count in sorted(self.methods.items()))
+        return (
+            f"Copied {self.files} files, {self.bytes / 1e6:.1f} MB in {self.seconds:.3f}s "
+            f"({self.throughput / 1e6:.1f} MB/s)" + (f" via {methods}" if methods else "")
+        )
+
+    def __repr__(self):
+        return (
+            f"CopyReport(files={self.files}, bytes={self.bytes}, "
+            f"seconds={self.seconds:.3f}, methods={dict(self.methods)})"
+        )
+
+
+def _reflink(src_fd, dst_fd, size):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+
+
+def _kernel_copy(copy_chunk, src_fd, dst_fd, size):
+    """
+    Copy size bytes with a kernel copy primitive. Returns False if the
+    primitive is not supported for these files before anything was copied.
+    """
+    copied = 0
+    while copied < size:
+        try:
+            n = copy_chunk(src_fd, dst_fd, copied, min(size - copied, KERNEL_CHUNK))
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED:
+                return False
+            raise
+        if n == 0:
+            if copied == 0:
+                # Some filesystems report success without copying anything
+                return False
+            # The file shrank while copying; keep what was there
+            break
+        copied += n
+    return True
+
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def _userspace(src_file, dst_file):
+    shutil.copyfileobj(src_file, dst_file, USERSPACE_CHUNK)
+
+
+def _drop_from_page_cache(fd):
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+
+
+def copy_file(src, dst):
+    """
+    Copy the content of src to dst (created or truncated), letting the
+    kernel move the bytes when it can. In order of preference:
+    - reflink (FICLONE): dst shares src's blocks, nothing is copied
+    - os.copy_file_range: in-kernel copy, server-side on NFS/SMB
+    - os.sendfile: in-kernel copy for older kernels
+    - a userspace read/write loop
+
+    An existing dst is unlinked first rather than overwritten, so other
+    hardlinks to it keep their content. Unlike shutil.copy, permission bits
+    and timestamps are not copied. Large files are dropped from the page
+    cache afterwards so copying gigabytes of media does not evict the rest
+    of the build's working set.
+
+    Returns:
+        The name of the method that copied the file
+    """
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        src_fd = src_file.fileno()
+        dst_fd = dst_file.fileno()
+        size = os.fstat(src_fd).st_size
+        if size == 0:
+            return "userspace"
+
+        method = "userspace"
+        if _reflink(src_fd, dst_fd, size):
+            method = "reflink"
+        elif hasattr(os, "copy_file_range") and _kernel_copy(_copy_file_range, src_fd, dst_fd, size):
+            method = "copy_file_range"
+        elif hasattr(os, "sendfile") and _kernel_copy(_sendfile, src_fd, dst_fd, size):
+            method = "sendfile"
+        else:
+            _userspace(src_file, dst_file)
+
+        if size >= FADVISE_THRESHOLD and hasattr(os, "posix_fadvise"):
+            _drop_from_page_cache(src_fd)
+            dst_file.flush()
+            _drop_from_page_cache(dst_fd)
+    return method
+
+
+def copy_files(pairs, workers=DEFAULT_WORKERS, log=None):
+    """
+    Copy (src_path, dst_path) pairs with copy_file, at most `workers` at
+    a time. The copy primitives release the GIL, so large files copy in
+    parallel. Destination directories must exist.
+
+    Args:
+        pairs: Iterable of (src_path, dst_path)
+        workers: Maximum number of concurrent copies
+        log: Optional callable receiving a message per file
+
+    Returns:
+        A CopyReport
+    """
+    pairs = list(pairs)
+    report = CopyReport()
+    start = time.perf_counter()
+
+    def copy_one(pair):
+        src_path, dst_path = pair
+        method = copy_file(src_path, dst_path)
+        return os.path.getsize(dst_path), method
+
+    if log is not None:
+        for src_path, dst_path in pairs:
+            log(f"Copying file: {src_path} -> {dst_path}")
+
+    if workers <= 1 or len(pairs) <= 1:
+        results = [copy_one(pair) for pair in pairs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(copy_one, pairs))
+    for size, method in results:
+        report.files += 1
+        report.bytes += size
+        report.methods[method] += 1
+    report.seconds = time.perf_counter() - start
+    return report
+
@@ -0,0 +1,137 @@
+import json
+import os
+import posixpath
+import re
+
+from asset_copy import hash_files, list_files
+from fastcopy import copy_files
+
+DIGEST_LENGTH = 8
+MANIFEST_NAME = "asset-manifest.json"
+
+# Root-relative src/href attributes, optionally followed by a query string
+# or fragment that is kept as-is
+_REFERENCE_RE = re.compile(r'\b(src|href)="(/[^"?#]*)([^"]*)"')
+
+
+def fingerprint_name(rel_path, digest, length=DIGEST_LENGTH):
+    """
+    Insert a content hash before the file extension.
+
+    Example: ("css/index.css", "3fa2c1d4...") -> "css/index.3fa2c1d4.css"
+    """
+    head, tail = posixpath.split(rel_path)
+    stem, ext = posixpath.splitext(tail)
+    return posixpath.join(head, f"{stem}.{digest[:length]}{ext}")
+
+
+class AssetManifest:
+    """
+    Maps logical asset URLs ("/index.css") to fingerprinted ones
+    ("/index.3fa2c1d4.css").
+    """
+
+    def __init__(self, mapping=None):
+        self.mapping = mapping or {}
+
+    def rewrite(self, html):
+        """
+        Rewrite every root-relative src/href attribute in html that names a
+        known asset. Unknown paths are left untouched.
+        """
+        if not self.mapping:
+            return html
+
+        def replace(match):
+            target = self.mapping.get(match.group(2))
+            if target is None:
+                return match.group(0)
+            return f'{match.group(1)}="{target}{match.group(3)}"'
+
+        return _REFERENCE_RE.sub(replace, html)
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.mapping, f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest written by write(), or return an empty one."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+
+def _load_hash_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def copy_fingerprinted(src, dst, cache_path=None):
+    """
+    Copy the contents of src into the existing directory dst with a content
+    hash in every file name, and write the logical-to-fingerprinted mapping
+    to dst/asset-manifest.json.
+
+    When cache_path is given, digests are cached there keyed by file size
+    and mtime, so only files that changed since the last build are hashed.
+
+    Args:
+        src: Source directory path
+        dst: Destination directory path (must exist)
+        cache_path: Optional path of the digest cache
+
+    Returns:
+        A tuple (manifest, files_hashed)
+    """
+    cache = _load_hash_cache(cache_path) if cache_path else {}
+
+    dirs, files = list_files(src, dst)
+    for dir_path in dirs:
+        os.mkdir(dir_path)
+
+    rel_paths = []
+    signatures = []
+    digests = []
+    stale = []
+    for src_path, _ in files:
+        rel_path = os.path.relpath(src_path, src).replace(os.sep, "/")
+        st = os.stat(src_path)
+        signature = [st.st_size, st.st_mtime_ns]
+        cached = cache.get(rel_path)
+        rel_paths.append(rel_path)
+        signatures.append(signature)
+        if cached is not None and cached[:2] == signature:
+            digests.append(cached[2])
+        else:
+            digests.append(None)
+            stale.append(len(digests) - 1)
+
+    for i, digest in zip(stale, hash_files([files[i][0] for i in stale])):
+        digests[i] = digest
+
+    mapping = {}
+    new_cache = {}
+    copies = []
+    for (src_path, _), rel_path, signature, digest in zip(files, rel_paths, signatures, digests):
+        hashed_path = fingerprint_name(rel_path, digest)
+        copies.append((src_path, os.path.join(dst, hashed_path)))
+        mapping["/" + rel_path] = "/" + hashed_path
+        new_cache[rel_path] = signature + [digest]
+    copy_files(copies)
+
+    manifest = AssetManifest(mapping)
+    manifest.write(os.path.join(dst, MANIFEST_NAME))
+
+    if cache_path:
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(new_cache, f)
+    return manifest, len(stale)
@@ -0,0 +1,78 @@
+import itertools
+
+DELIMITER = "---"
+
+
+def _parse_line(line, metadata):
+    """Add a "key: value" line to metadata, returning False if it is not one."""
+    key, sep, value = line.partition(":")
+    key = key.strip().lower()
+    if not sep or not key:
+        return False
+    metadata[key] = value.strip()
+    return True
+
+
+def split_front_matter(markdown):
+    """
+    Split optional front matter off the start of a markdown document.
+
+    Front matter is a block of "key: value" lines between two "---" lines
+    at the very top of the file:
+
+        ---
+        date: 2024-05-01
+        ---
+        # Title
+
+    Keys are lowercased; values are kept as stripped strings. A document
+    starting with "---" whose next lines are not all "key: value" up to the
+    closing "---" (e.g. a thematic break) has no front matter.
+
+    Args:
+        markdown: The markdown source
+
+    Returns:
+        (metadata dict, markdown without the front matter). Documents
+        without front matter are returned unchanged with an empty dict.
+
+    Raises:
+        ValueError: If the front matter is not closed
+    """
+    if not markdown.startswith(DELIMITER):
+        return {}, markdown
+    lines = markdown.split("\n")
+    if lines[0].strip() != DELIMITER:
+        return {}, markdown
+    metadata = {}
+    for i, line in enumerate(lines[1:], start=1):
+        if line.strip() == DELIMITER:
+            return metadata, "\n".join(lines[i + 1:])
+        if line.strip() and not _parse_line(line, metadata):
+            return {}, markdown
+    raise ValueError("Front matter is not closed with ---")
+
+
+def read_front_matter(lines):
+    """
+    Like split_front_matter, but for an iterable of lines such as an open
+    file, consuming only the front matter (and holding only its lines).
+
+    Returns:
+        (metadata dict, iterator over the remaining lines)
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    if first.strip() != DELIMITER:
+        return {}, itertools.chain([first], lines)
+    metadata = {}
+    seen = [first]
+    for line in lines:
+        if line.strip() == DELIMITER:
+            return metadata, lines
+        seen.append(line)
+        if line.strip() and not _parse_line(line, metadata):
+            return {}, itertools.chain(seen, lines)
+    raise ValueError("Front matter is not closed with ---")
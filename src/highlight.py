@@ -0,0 +1,209 @@
+import hashlib
+import html
+import json
+import os
+import re
+
+# Each language is an ordered list of (css class, pattern). Earlier rules win
+# when several match at the same position.
+_STRING_DQ = r'"(?:\\.|[^"\\\n])*"'
+_STRING_SQ = r"'(?:\\.|[^'\\\n])*'"
+_NUMBER = r"\b(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\b"
+
+_PYTHON_KEYWORDS = (
+    "False None True and as assert async await break class continue def del "
+    "elif else except finally for from global if import in is lambda "
+    "nonlocal not or pass raise return try while with yield match case"
+)
+_PYTHON_BUILTINS = (
+    "abs all any bool bytes dict enumerate filter float getattr hasattr int "
+    "isinstance len list map max min object open print range repr reversed "
+    "set sorted str sum super tuple type zip self cls"
+)
+_SHELL_KEYWORDS = (
+    "if then else elif fi for while until do done case esac in function "
+    "return local export readonly set unset source exit"
+)
+
+
+def _words(words):
+    return r"\b(?:" + "|".join(words.split()) + r")\b"
+
+
+LANGUAGES = {
+    "python": [
+        ("com", r"#[^\n]*"),
+        ("str", r'(?<!\w)[rRbBuUfF]{0,2}(?:"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\')'),
+        ("str", r"(?<!\w)[rRbBuUfF]{0,2}(?:" + _STRING_DQ + "|" + _STRING_SQ + ")"),
+        ("dec", r"@[\w.]+"),
+        ("kw", _words(_PYTHON_KEYWORDS)),
+        ("bi", _words(_PYTHON_BUILTINS)),
+        ("fn", r"(?<=def )\w+|(?<=class )\w+"),
+        ("num", _NUMBER),
+    ],
+    "shell": [
+        ("com", r"(?:(?<=\s)|^)#[^\n]*"),
+        ("str", _STRING_DQ + "|" + _STRING_SQ),
+        ("var", r"\$(?:\{[^}\n]*\}|\w+|[@*#?$!0-9])"),
+        ("kw", _words(_SHELL_KEYWORDS)),
+        ("num", _NUMBER),
+    ],
+    "json": [
+        ("key", _STRING_DQ + r"(?=\s*:)"),
+        ("str", _STRING_DQ),
+        ("lit", r"\b(?:true|false|null)\b"),
+        ("num", r"-?" + _NUMBER),
+    ],
+    "html": [
+        ("com", r"<!--[\s\S]*?-->"),
+        ("tag", r"</?[A-Za-z][\w:-]*|/?>"),
+        ("attr", r"[A-Za-z_:][\w:.-]*(?==)"),
+        ("str", _STRING_DQ + "|" + _STRING_SQ),
+    ],
+    "css": [
+        ("com", r"/\*[\s\S]*?\*/"),
+        ("str", _STRING_DQ + "|" + _STRING_SQ),
+        ("kw", r"@[\w-]+|!important"),
+        ("prop", r"[\w-]+(?=\s*:(?![\w-]*\s*[,{]))"),
+        ("num", r"#[0-9a-fA-F]{3,8}\b|-?\d*\.?\d+(?:%|[a-zA-Z]+)?"),
+    ],
+}
+
+ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "sh": "shell",
+    "bash": "shell",
+    "zsh": "shell",
+    "console": "shell",
+    "xml": "html",
+    "htm": "html",
+}
+
+_LEXERS = {}
+
+
+def _lexer(language):
+    """Compile the rules of a language into one alternation regex."""
+    lexer = _LEXERS.get(language)
+    if lexer is None:
+        rules = LANGUAGES[language]
+        pattern = "|".join(f"(?P<t{i}>{regex})" for i, (_, regex) in enumerate(rules))
+        classes = {f"t{i}": css_class for i, (css_class, _) in enumerate(rules)}
+        lexer = (re.compile(pattern, re.MULTILINE), classes)
+        _LEXERS[language] = lexer
+    return lexer
+
+
+def normalize_language(language):
+    """
+    Map an info string language name to a supported language, or None.
+    """
+    if not language:
+        return None
+    language = language.lower()
+    language = ALIASES.get(language, language)
+    return language if language in LANGUAGES else None
+
+
+def highlight(code, language):
+    """
+    Highlight code as HTML: tokens are wrapped in <span class="tok-...">
+    and all text is HTML-escaped.
+
+    Args:
+        code: The source code
+        language: A key of LANGUAGES (see normalize_language)
+
+    Returns:
+        The highlighted HTML string
+    """
+    regex, classes = _lexer(language)
+    out = []
+    pos = 0
+    for match in regex.finditer(code):
+        start, end = match.span()
+        if start == end:
+            continue
+        if start > pos:
+            out.append(html.escape(code[pos:start], quote=False))
+        out.append(f'<span class="tok-{classes[match.lastgroup]}">')
+        out.append(html.escape(match.group(), quote=False))
+        out.append("</span>")
+        pos = end
+    out.append(html.escape(code[pos:], quote=False))
+    return "".join(out)
+
+
+class HighlightCache:
+    """
+    Highlighted snippets keyed by (language, hash of the code). Can be
+    saved to and loaded from a JSON file so unchanged snippets are not
+    highlighted again on the next build. A long-lived process calls
+    begin_build() before each build, so what it saves and keeps in memory
+    is what that build used. A page it does not render again keeps its
+    snippets by passing the keys end_page() returned when it was rendered
+    to keep().
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._used = set()
+        self._page = None
+
+    def highlight(self, code, language):
+        key = language + ":" + hashlib.sha1(code.encode("utf-8")).hexdigest()
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            result = highlight(code, language)
+            self.entries[key] = result
+        else:
+            self.hits += 1
+        self._used.add(key)
+        if self._page is not None:
+            self._page.add(key)
+        return result
+
+    def begin_build(self):
+        """Start recording the snippets used by a new build."""
+        self._used = set()
+
+    def begin_page(self):
+        """Start recording the snippets used by a page being rendered."""
+        self._page = set()
+
+    def end_page(self):
+        """Return the keys of the snippets used since begin_page()."""
+        keys, self._page = frozenset(self._page or ()), None
+        return keys
+
+    def keep(self, keys):
+        """Count snippets as used by this build without highlighting them."""
+        self._used.update(keys)
+
+    def load(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def save(self, path):
+        """
+        Write the entries used since begin_build() (or since this cache was
+        created), dropping the others from memory too.
+        """
+        # Kept keys may have been dropped by another Site's save()
+        self.entries = {key: self.entries[key] for key in self._used if key in self.entries}
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+
+
+# Shared by every page rendered in this process
+cache = HighlightCache()
@@ -0,0 +1,142 @@
+import os
+import posixpath
+import threading
+
+from frontmatter import split_front_matter
+from inline_markdown import markdown_to_html_node
+from leafnode import LeafNode
+
+
+class IncludeError(Exception):
+    pass
+
+
+class Fragment:
+    """
+    A rendered include: the HTML of an included markdown file, with its own
+    includes already inlined.
+
+    - name: the include name it was loaded as
+    - html: the rendered blocks, without a wrapping element
+    - dependencies: path -> mtime_ns of every file it was rendered from
+    """
+
+    def __init__(self, name, html, dependencies):
+        self.name = name
+        self.html = html
+        self.dependencies = dependencies
+
+    def is_current(self):
+        """Return True if none of the files it was rendered from changed."""
+        for path, mtime in self.dependencies.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def __repr__(self):
+        return f"Fragment({self.name}, {len(self.html)} characters)"
+
+
+class IncludeLoader:
+    """
+    Renders markdown files included by pages with a block of its own:
+
+        {% include "partials/license.md" %}
+
+    Names are "/"-separated paths relative to root. Each file is rendered
+    once and the fragment is shared by every page including it, until
+    refresh() finds that a file it was rendered from changed. Headings of
+    a fragment get ids unique within the fragment, and are not part of the
+    including page's table of contents. A loader can be shared by threads
+    rendering pages at the same time.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.renders = 0
+        self._cache = {}
+        # Reentrant: rendering a fragment gets the fragments it includes
+        self._lock = threading.RLock()
+
+    def path_for(self, name):
+        rel_path = posixpath.normpath(name)
+        if rel_path.startswith("../") or rel_path == ".." or posixpath.isabs(rel_path):
+            raise IncludeError(f"Include name outside the include directory: {name}")
+        return os.path.join(self.root, *rel_path.split("/"))
+
+    def get(self, name, stack=()):
+        """
+        Return the Fragment for name, rendering it if it is not cached.
+
+        Args:
+            name: The include name
+            stack: Names of the includes being rendered that include it
+
+        Raises:
+            IncludeError: If the file or a file it includes is missing, or
+                includes itself
+        """
+        if name in stack:
+            raise IncludeError("Include cycle: " + " -> ".join(list(stack) + [name]))
+        with self._lock:
+            fragment = self._cache.get(name)
+            if fragment is None:
+                fragment = self._render(name, tuple(stack) + (name,))
+                self._cache[name] = fragment
+            return fragment
+
+    def is_cached(self, fragment):
+        """Return True if fragment is what get() returns for its name."""
+        return self._cache.get(fragment.name) is fragment
+
+    def refresh(self):
+        """
+        Drop cached fragments whose files changed.
+
+        Returns:
+            The names of the fragments dropped
+        """
+        with self._lock:
+            stale = [name for name, fragment in self._cache.items() if not fragment.is_current()]
+            for name in stale:
+                del self._cache[name]
+            return stale
+
+    def _render(self, name, stack):
+        self.renders += 1
+        path = self.path_for(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8") as f:
+                source = f.read()
+        except FileNotFoundError:
+            raise IncludeError(f"Include not found: {name}") from None
+        _, markdown = split_front_matter(source)
+        includes = PageIncludes(self, stack)
+        node = markdown_to_html_node(markdown, includes=includes)
+        dependencies = {path: mtime}
+        for fragment in includes.used:
+            dependencies.update(fragment.dependencies)
+        html = "".join(child.to_html() for child in node.children)
+        return Fragment(name, html, dependencies)
+
+
+class PageIncludes:
+    """
+    Inlines the includes of one page as it is rendered, recording the
+    fragments used so the page can be re-rendered when one of them changes.
+    """
+
+    def __init__(self, loader, stack=()):
+        self.loader = loader
+        self.stack = stack
+        self.used = []
+
+    def to_html_node(self, name):
+        """Return a node holding the rendered fragment for name."""
+        fragment = self.loader.get(name, self.stack)
+        self.used.append(fragment)
+        return LeafNode(None, fragment.html)
@@ -1,10 +1,22 @@
 import re
 from enum import Enum
 
+from highlight import cache as highlight_cache
+from highlight import normalize_language
 from htmlnode import HTMLNode
 from leafnode import LeafNode
 from parentnode import ParentNode
 from textnode import TextNode, TextType, text_node_to_html_node
+from toc import TableOfContents, slugify
+
+_IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# [[target]] or [[target|label]]
+_WIKI_LINK_RE = re.compile(r"\[\[([^\[\]|]+)(?:\|([^\[\]]*))?\]\]")
+# Languages that are safe to put in a class attribute
+_LANGUAGE_RE = re.compile(r"[\w+-]+")
+# A block of its own: {% include "partials/license.md" %}
+_INCLUDE_RE = re.compile(r"""^\{%\s*include\s+(?:"([^"]+)"|'([^']+)')\s*%\}$""")
 
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -33,9 +45,7 @@ def extract_markdown_images(text):
     Extract markdown images from text.
     Returns a list of tuples (alt_text, url).
     """
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return _IMAGE_RE.findall(text)
 
 
 def extract_markdown_links(text):
@@ -43,13 +53,13 @@ def extract_markdown_links(text):
     Extract markdown links from text.
     Returns a list of tuples (anchor_text, url).
     """
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return _LINK_RE.findall(text)
 
-def split_nodes_image(old_nodes):
+def _split_nodes_pattern(old_nodes, pattern, text_type):
     """
-    Split nodes based on markdown image syntax.
+    Split text nodes around the matches of pattern, whose groups are the
+    text and URL of the new nodes. Works from match positions, so the cost
+    is linear in the length of the text however many matches it has.
     """
     new_nodes = []
     
@@ -59,82 +69,70 @@ def split_nodes_image(old_nodes):
             new_nodes.append(old_node)
             continue
         
-        # Extract all images from the text
-        images = extract_markdown_images(old_node.text)
+        text = old_node.text
+        pos = 0
+        for match in pattern.finditer(text):
+            # Add the text before the match (if not empty)
+            if match.start() > pos:
+                new_nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            pos = match.end()
         
-        # If no images, add the node as-is
-        if not images:
+        if pos == 0:
+            # No matches
             new_nodes.append(old_node)
-            continue
-        
-        # Process each image
-        remaining_text = old_node.text
-        for image_alt, image_url in images:
-            # Split the text at the image markdown
-            sections = remaining_text.split(f"![{image_alt}]({image_url})", 1)
-            
-            # Add the text before the image (if not empty)
-            if sections[0]:
-                new_nodes.append(TextNode(sections[0], TextType.TEXT))
-            
-            # Add the image node
-            new_nodes.append(TextNode(image_alt, TextType.IMAGE, image_url))
-            
-            # Update remaining text to the part after the image
-            remaining_text = sections[1] if len(sections) > 1 else ""
-        
-        # Add any remaining text after all images
-        if remaining_text:
-            new_nodes.append(TextNode(remaining_text, TextType.TEXT))
+        elif pos < len(text):
+            # Add any remaining text after the last match
+            new_nodes.append(TextNode(text[pos:], TextType.TEXT))
     
     return new_nodes
 
+def split_nodes_image(old_nodes):
+    """
+    Split nodes based on markdown image syntax.
+    """
+    return _split_nodes_pattern(old_nodes, _IMAGE_RE, TextType.IMAGE)
+
 def split_nodes_link(old_nodes):
     """
     Split nodes based on markdown link syntax.
     """
+    return _split_nodes_pattern(old_nodes, _LINK_RE, TextType.LINK)
+
+def split_nodes_wiki_link(old_nodes, links):
+    """
+    Split nodes based on [[target]] and [[target|label]] wiki link syntax.
+    links (a wikilinks.PageLinks) turns each into a link node, or into
+    plain text if the target is not found.
+    """
     new_nodes = []
     
     for old_node in old_nodes:
-        # If the node is not a text type, just add it as-is
         if old_node.text_type != TextType.TEXT:
             new_nodes.append(old_node)
             continue
         
-        # Extract all links from the text
-        links = extract_markdown_links(old_node.text)
+        text = old_node.text
+        pos = 0
+        for match in _WIKI_LINK_RE.finditer(text):
+            if match.start() > pos:
+                new_nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+            new_nodes.append(links.to_text_node(match.group(1).strip(), match.group(2)))
+            pos = match.end()
         
-        # If no links, add the node as-is
-        if not links:
+        if pos == 0:
             new_nodes.append(old_node)
-            continue
-        
-        # Process each link
-        remaining_text = old_node.text
-        for link_text, link_url in links:
-            # Split the text at the link markdown
-            sections = remaining_text.split(f"[{link_text}]({link_url})", 1)
-            
-            # Add the text before the link (if not empty)
-            if sections[0]:
-                new_nodes.append(TextNode(sections[0], TextType.TEXT))
-            
-            # Add the link node
-            new_nodes.append(TextNode(link_text, TextType.LINK, link_url))
-            
-            # Update remaining text to the part after the link
-            remaining_text = sections[1] if len(sections) > 1 else ""
-        
-        # Add any remaining text after all links
-        if remaining_text:
-            new_nodes.append(TextNode(remaining_text, TextType.TEXT))
+        elif pos < len(text):
+            new_nodes.append(TextNode(text[pos:], TextType.TEXT))
     
     return new_nodes
 
-def text_to_textnodes(text):
+def text_to_textnodes(text, links=None):
     """
     Convert raw markdown text into a list of TextNode objects.
-    Processes bold, italic, code, images, and links.
+    Processes bold, italic, code, images, and links, and wiki links if a
+    wikilinks.PageLinks is given to resolve them; without one they are
+    left as text.
     """
     # Start with a single text node containing all the text
     nodes = [TextNode(text, TextType.TEXT)]
@@ -144,6 +142,8 @@ def text_to_textnodes(text):
     nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
     nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)  # Add underscore support for italic
     nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    if links is not None:
+        nodes = split_nodes_wiki_link(nodes, links)
     nodes = split_nodes_image(nodes)
     nodes = split_nodes_link(nodes)
     
@@ -176,6 +176,40 @@ def markdown_to_blocks(markdown):
     
     return filtered_blocks
 
+def iter_markdown_blocks(lines):
+    """
+    Yield the blocks of a markdown document one at a time from an iterable
+    of lines (such as an open file), holding only the current block in
+    memory.
+    
+    Produces exactly the same blocks as markdown_to_blocks on the joined
+    text: blocks are separated by empty lines, stripped, and empty blocks
+    are skipped.
+    
+    Args:
+        lines: An iterable of lines, with or without trailing newlines
+        
+    Yields:
+        Block strings
+    """
+    current = []
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if line:
+            current.append(line)
+            continue
+        # An empty line ends the current block
+        if current:
+            block = "\n".join(current).strip()
+            current = []
+            if block:
+                yield block
+    if current:
+        block = "\n".join(current).strip()
+        if block:
+            yield block
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -241,18 +275,19 @@ def block_to_block_type(block):
 
 
 
-def text_to_children(text):
+def text_to_children(text, links=None):
     """
     Convert a string of text with inline markdown into a list of HTMLNode children.
     
     Args:
         text: A string containing text with inline markdown
+        links: Optional wikilinks.PageLinks resolving wiki links
         
     Returns:
         A list of HTMLNode objects representing the inline elements
     """
     # Convert text to TextNodes (handles bold, italic, code, images, links)
-    text_nodes = text_to_textnodes(text)
+    text_nodes = text_to_textnodes(text, links)
     
     # Convert each TextNode to an HTMLNode
     children = []
@@ -263,20 +298,26 @@ def text_to_children(text):
     return children
 
 
-def paragraph_to_html_node(block):
+def paragraph_to_html_node(block, links=None):
     """
     Convert a paragraph block to an HTMLNode.
     """
     # Join lines with spaces and convert to children
     lines = block.split("\n")
     text = " ".join(lines)
-    children = text_to_children(text)
+    children = text_to_children(text, links)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(block, toc=None, links=None):
     """
-    Convert a heading block to an HTMLNode.
+    Convert a heading block to an HTMLNode with an id slug of its text.
+    
+    Args:
+        block: A heading block string
+        toc: Optional TableOfContents the heading is added to; it makes
+            the id unique among the headings it has seen
+        links: Optional wikilinks.PageLinks resolving wiki links
     """
     # Count the number of # characters
     level = 0
@@ -288,27 +329,64 @@ def heading_to_html_node(block):
     
     # Extract the heading text (after the # and space)
     text = block[level + 1:]
-    children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    text_nodes = text_to_textnodes(text, links)
+    children = [text_node_to_html_node(text_node) for text_node in text_nodes]
+    
+    # The id comes from the text without its markup
+    plain_text = "".join(text_node.text for text_node in text_nodes)
+    slug = toc.add(level, plain_text) if toc is not None else slugify(plain_text)
+    return ParentNode(f"h{level}", children, {"id": slug})
+
+
+def split_code_block(block):
+    """
+    Split a fenced code block into its info string language and its code.
+    
+    A language is only recognized when the opening fence is followed by a
+    word on its own line, e.g. "```python\nprint(1)\n```".
+    
+    Args:
+        block: A code block string, fences included
+        
+    Returns:
+        A tuple (language, code_text); language is None when there is none
+    """
+    # Remove the ``` from start and end
+    if not (block.startswith("```") and block.endswith("```")):
+        return None, block
+    code_text = block[3:-3]
+    
+    first_line, newline, rest = code_text.partition("\n")
+    info = first_line.strip()
+    if newline and info and " " not in info and "`" not in info:
+        return info, newline + rest
+    return None, code_text
 
 
 def code_to_html_node(block):
     """
     Convert a code block to an HTMLNode.
     Code blocks should not process inline markdown.
-    """
-    # Remove the ``` from start and end
-    if block.startswith("```") and block.endswith("```"):
-        code_text = block[3:-3]
-    else:
-        code_text = block
     
-    # Create a text node without processing inline markdown
-    code_node = LeafNode("code", code_text)
+    With a language info string, the <code> element gets a
+    "language-<lang>" class, and code in a language known to the
+    highlight module is highlighted (and HTML-escaped) at build time. An
+    info string with characters other than letters, digits, "_", "+" and
+    "-" is dropped rather than put into the attribute.
+    """
+    language, code_text = split_code_block(block)
+    if language is None or not _LANGUAGE_RE.fullmatch(language):
+        # Create a text node without processing inline markdown
+        return ParentNode("pre", [LeafNode("code", code_text)])
+    
+    lexer_language = normalize_language(language)
+    if lexer_language is not None:
+        code_text = highlight_cache.highlight(code_text, lexer_language)
+    code_node = LeafNode("code", code_text, {"class": f"language-{language}"})
     return ParentNode("pre", [code_node])
 
 
-def quote_to_html_node(block):
+def quote_to_html_node(block, links=None):
     """
     Convert a quote block to an HTMLNode.
     """
@@ -325,11 +403,11 @@ def quote_to_html_node(block):
     
     # Join lines and convert to children
     text = " ".join(clean_lines)
-    children = text_to_children(text)
+    children = text_to_children(text, links)
     return ParentNode("blockquote", children)
 
 
-def unordered_list_to_html_node(block):
+def unordered_list_to_html_node(block, links=None):
     """
     Convert an unordered list block to an HTMLNode.
     """
@@ -339,13 +417,13 @@ def unordered_list_to_html_node(block):
     for line in lines:
         # Remove the "- " prefix
         text = line[2:]
-        children = text_to_children(text)
+        children = text_to_children(text, links)
         list_items.append(ParentNode("li", children))
     
     return ParentNode("ul", list_items)
 
 
-def ordered_list_to_html_node(block):
+def ordered_list_to_html_node(block, links=None):
     """
     Convert an ordered list block to an HTMLNode.
     """
@@ -357,18 +435,58 @@ def ordered_list_to_html_node(block):
         # Find the first space after the number and period
         space_index = line.index(". ") + 2
         text = line[space_index:]
-        children = text_to_children(text)
+        children = text_to_children(text, links)
         list_items.append(ParentNode("li", children))
     
     return ParentNode("ol", list_items)
 
 
-def markdown_to_html_node(markdown):
+def block_to_html_node(block, toc=None, links=None, includes=None):
+    """
+    Convert a single markdown block into an HTMLNode.
+    
+    Args:
+        block: A string containing a single markdown block
+        toc: Optional TableOfContents collecting headings
+        links: Optional wikilinks.PageLinks resolving wiki links
+        includes: Optional includes.PageIncludes inlining include blocks;
+            without one they are paragraphs
+        
+    Returns:
+        The HTMLNode for the block
+    """
+    if includes is not None and block.startswith("{%"):
+        match = _INCLUDE_RE.match(block)
+        if match:
+            return includes.to_html_node(match.group(1) or match.group(2))
+    
+    block_type = block_to_block_type(block)
+    
+    if block_type == BlockType.HEADING:
+        return heading_to_html_node(block, toc, links)
+    elif block_type == BlockType.CODE:
+        return code_to_html_node(block)
+    elif block_type == BlockType.QUOTE:
+        return quote_to_html_node(block, links)
+    elif block_type == BlockType.UNORDERED_LIST:
+        return unordered_list_to_html_node(block, links)
+    elif block_type == BlockType.ORDERED_LIST:
+        return ordered_list_to_html_node(block, links)
+    return paragraph_to_html_node(block, links)
+
+
+def markdown_to_html_node(markdown, toc=None, links=None, includes=None):
     """
     Convert a full markdown document into a single parent HTMLNode.
     
     Args:
         markdown: A string containing the full markdown document
+        toc: Optional TableOfContents that collects the document's
+            headings as they are rendered
+        links: Optional wikilinks.PageLinks resolving the document's wiki
+            links
+        includes: Optional includes.PageIncludes inlining the document's
+            include blocks
         
     Returns:
         A ParentNode HTMLNode containing all the blocks as children
@@ -376,23 +494,14 @@ def markdown_to_html_node(markdown):
     # Split markdown into blocks
     blocks = markdown_to_blocks(markdown)
     
+    # Heading ids are unique within the document
+    if toc is None:
+        toc = TableOfContents()
+    
     # Convert each block to an HTMLNode
     block_nodes = []
     for block in blocks:
-        block_type = block_to_block_type(block)
-        
-        if block_type == BlockType.PARAGRAPH:
-            block_nodes.append(paragraph_to_html_node(block))
-        elif block_type == BlockType.HEADING:
-            block_nodes.append(heading_to_html_node(block))
-        elif block_type == BlockType.CODE:
-            block_nodes.append(code_to_html_node(block))
-        elif block_type == BlockType.QUOTE:
-            block_nodes.append(quote_to_html_node(block))
-        elif block_type == BlockType.UNORDERED_LIST:
-            block_nodes.append(unordered_list_to_html_node(block))
-        elif block_type == BlockType.ORDERED_LIST:
-            block_nodes.append(ordered_list_to_html_node(block))
+        block_nodes.append(block_to_html_node(block, toc, links, includes))
     
     # Return all blocks wrapped in a div
     return ParentNode("div", block_nodes)
@@ -0,0 +1,144 @@
+import posixpath
+
+from search_index import page_url
+
+SORT_KEYS = ("date", "title")
+DEFAULT_PAGE_SIZE = 10
+
+# Inline markdown syntax, written as character references in link text so
+# a title is shown as it is instead of being parsed
+_TITLE_ESCAPES = str.maketrans({c: f"&#{ord(c)};" for c in "*_`![]()"})
+# Parentheses would end the link target early
+_URL_ESCAPES = str.maketrans({"(": "%28", ")": "%29"})
+
+
+class ListingEntry:
+    """One member page of a listing, from the metadata of its render."""
+
+    def __init__(self, rel_path, title, date=None):
+        self.rel_path = rel_path
+        self.title = title
+        self.date = date
+
+    def __eq__(self, other):
+        return (
+            self.rel_path == other.rel_path
+            and self.title == other.title
+            and self.date == other.date
+        )
+
+    def __repr__(self):
+        return f"ListingEntry({self.rel_path}, {self.title}, {self.date})"
+
+
+def is_member(rel_path, directory):
+    """
+    Return True if the page at rel_path belongs to the listing of
+    directory: every page below it except the directory's own index.md.
+    """
+    prefix = directory.strip("/") + "/"
+    return rel_path.startswith(prefix) and rel_path != prefix + "index.md"
+
+
+def sort_entries(entries, sort="date"):
+    """
+    Sort listing entries. By date, newest first, with undated pages last;
+    by title, alphabetically. Ties are broken by title, then path.
+    """
+    if sort == "title":
+        return sorted(entries, key=lambda e: (e.title.casefold(), e.rel_path))
+    if sort != "date":
+        raise ValueError(f"Invalid listing sort: {sort}")
+    undated = sorted(
+        (e for e in entries if not e.date), key=lambda e: (e.title.casefold(), e.rel_path)
+    )
+    dated = sorted(
+        (e for e in entries if e.date), key=lambda e: (e.title.casefold(), e.rel_path)
+    )
+    # Stable sort keeps the title order within a date
+    dated.sort(key=lambda e: e.date, reverse=True)
+    return dated + undated
+
+
+def paginate(entries, page_size):
+    """Split entries into pages of page_size; an empty listing has one page."""
+    if page_size < 1:
+        raise ValueError("Listing page size must be at least 1")
+    pages = [entries[i:i + page_size] for i in range(0, len(entries), page_size)]
+    return pages or [[]]
+
+
+def listing_rel_path(directory, number):
+    """
+    Return the content-relative path a listing page is rendered as:
+    "blog/index.md" for page 1, "blog/page/2/index.md" for page 2.
+    """
+    directory = directory.strip("/")
+    if number == 1:
+        return posixpath.join(directory, "index.md")
+    return posixpath.join(directory, "page", str(number), "index.md")
+
+
+def listing_title(directory):
+    """Title for a listing: the capitalized directory name."""
+    name = posixpath.basename(directory.strip("/")) or "Index"
+    return name.replace("-", " ").replace("_", " ").capitalize()
+
+
+def listing_markdown(directory, entries, number, page_count):
+    """
+    Build the markdown of one listing page: an h1, a list of links to the
+    member pages with their dates, and links to the neighbouring pages.
+
+    Args:
+        directory: The content-relative directory being listed
+        entries: The ListingEntry objects on this page
+        number: The 1-based page number
+        page_count: The total number of listing pages
+
+    Returns:
+        The markdown source, rendered like any other page
+    """
+    title = listing_title(directory)
+    if page_count > 1:
+        title += f" (page {number} of {page_count})"
+    parts = [f"# {title}"]
+    items = []
+    for entry in entries:
+        text = entry.title.translate(_TITLE_ESCAPES)
+        url = page_url(entry.rel_path).translate(_URL_ESCAPES)
+        item = f"- [{text}]({url})"
+        if entry.date:
+            item += f" {entry.date}"
+        items.append(item)
+    if items:
+        parts.append("\n".join(items))
+
+    nav = []
+    if number > 1:
+        nav.append(f"[< Previous]({page_url(listing_rel_path(directory, number - 1))})")
+    if number < page_count:
+        nav.append(f"[Next >]({page_url(listing_rel_path(directory, number + 1))})")
+    if nav:
+        parts.append(" ".join(nav))
+    return "\n\n".join(parts) + "\n"
+
+
+def build_listing(directory, entries, page_size=DEFAULT_PAGE_SIZE, sort="date"):
+    """
+    Lay out the listing of directory.
+
+    Args:
+        directory: The content-relative directory being listed
+        entries: ListingEntry objects of all member pages
+        page_size: Entries per listing page
+        sort: "date" or "title"
+
+    Returns:
+        A list of (content-relative path, markdown) pairs, one per page
+    """
+    pages = paginate(sort_entries(entries, sort), page_size)
+    return [
+        (listing_rel_path(directory, number), listing_markdown(directory, page, number, len(pages)))
+        for number, page in enumerate(pages, start=1)
+    ]
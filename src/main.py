@@ -1,55 +1,196 @@
+import argparse
 import os
 import shutil
 import sys
 
-from inline_markdown import extract_title, markdown_to_html_node
+from archive import archive_mtime, archive_suffix
+from asset_copy import copy_tree
+from buildlog import NORMAL, QUIET, VERBOSE, BuildLog, as_build_log
+from frontmatter import read_front_matter, split_front_matter
+from inline_markdown import (BlockType, block_to_block_type, block_to_html_node, extract_title,
+                             heading_to_html_node, iter_markdown_blocks, markdown_to_html_node)
+from listing import DEFAULT_PAGE_SIZE, SORT_KEYS
+from memprofile import MemoryProfiler
+from publish import rollback
+from toc import TableOfContents
 
 
-def copy_directory_contents(src, dst):
+COPY_MODES = ("copy", "dedupe", "fingerprint")
+
+
+def render_page(markdown_content, template_content, basepath="/", asset_manifest=None,
+                links=None, includes=None):
     """
-    Recursively copy all contents from src directory to dst directory.
+    Render a markdown document into a complete HTML page.
     
     Args:
-        src: Source directory path
-        dst: Destination directory path
+        markdown_content: The markdown source of the page
+        template_content: The HTML template with {{ Title }}, {{ Content }}
+            and optionally {{ Toc }}, or a compiled templates.Template
+        basepath: The base URL path for the site (e.g., "/" or "/repo-name/")
+        asset_manifest: Optional AssetManifest used to rewrite asset
+            references to their fingerprinted names
+        links: Optional wikilinks.PageLinks resolving [[wiki links]]
+        includes: Optional includes.PageIncludes inlining
+            {% include "name" %} blocks
+        
+    Returns:
+        The final HTML string
     """
-    # If destination exists, remove it completely
-    if os.path.exists(dst):
-        print(f"Removing existing directory: {dst}")
-        shutil.rmtree(dst)
+    metadata, markdown_content = split_front_matter(markdown_content)
     
-    # Create the destination directory
-    print(f"Creating directory: {dst}")
-    os.mkdir(dst)
+    # Convert markdown to HTML, collecting the table of contents on the way
+    toc = TableOfContents()
+    html_node = markdown_to_html_node(markdown_content, toc, links, includes)
+    html_content = html_node.to_html()
+    
+    # Extract the title
+    title = extract_title(markdown_content)
+    
+    final_html = fill_template(template_content, title, html_content, metadata, toc.to_html())
+    
+    return _rewrite_urls(final_html, basepath, asset_manifest)
+
+
+def fill_template(template_content, title, html_content, metadata=None, toc_html=""):
+    """
+    Fill a template with a page's title, content, table of contents and
+    front matter.
+    
+    A plain string template only has its {{ Title }}, {{ Content }} and
+    {{ Toc }} placeholders replaced. A compiled templates.Template is
+    rendered with Title, Content, Toc and every front matter key as
+    variables.
+    """
+    if isinstance(template_content, str):
+        final_html = template_content.replace("{{ Title }}", title)
+        final_html = final_html.replace("{{ Toc }}", toc_html)
+        return final_html.replace("{{ Content }}", html_content)
+    if metadata:
+        variables = dict(metadata, Title=title, Content=html_content, Toc=toc_html)
+    else:
+        variables = {"Title": title, "Content": html_content, "Toc": toc_html}
+    return template_content.render(variables)
+
+
+def _rewrite_urls(html, basepath, asset_manifest):
+    """
+    Apply fingerprinted asset names and the basepath to root-relative
+    src/href attributes.
+    """
+    # Point asset references at their fingerprinted names
+    if asset_manifest is not None:
+        html = asset_manifest.rewrite(html)
     
-    # Recursively copy contents
-    _copy_recursive(src, dst)
+    return apply_basepath(html, basepath)
 
 
-def _copy_recursive(src, dst):
+def apply_basepath(html, basepath):
+    """Prefix root-relative src/href attributes with basepath."""
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    return html.replace('src="/', f'src="{basepath}')
+
+
+# Stand in for the content and table of contents while filling the
+# template of a streamed page
+_CONTENT_MARKER = "\0content\0"
+_TOC_MARKER = "\0toc\0"
+
+
+def stream_page(from_path, template_content, dest_path, basepath="/", asset_manifest=None,
+                links=None, includes=None, search_terms=None):
+    """
+    Render the markdown file from_path into dest_path like render_page, but
+    block by block: each block is written out as soon as it is complete, so
+    peak memory is bounded by the largest single block rather than the
+    document. The destination directory must exist.
+    
+    Args:
+        from_path: Path to the markdown file
+        template_content: The HTML template, or a compiled templates.Template
+        dest_path: Path of the HTML file to write
+        basepath: The base URL path for the site (e.g., "/" or "/repo-name/")
+        asset_manifest: Optional AssetManifest for fingerprinted assets
+        links: Optional wikilinks.PageLinks resolving [[wiki links]]
+        includes: Optional includes.PageIncludes inlining include blocks
+        search_terms: Optional search_index.PageTerms collecting the page's
+            search terms block by block
+    """
+    # The title goes into <head>, before any content, so find it with a
+    # separate pass that stops at the first h1
+    title = scan_title(from_path)
+    with open(from_path, 'r', encoding='utf-8') as f:
+        metadata, _ = read_front_matter(f)
+    
+    page = fill_template(template_content, title, _CONTENT_MARKER, metadata, _TOC_MARKER)
+    head, _, tail = page.partition(_CONTENT_MARKER)
+    if _TOC_MARKER in head:
+        # Needed before the content: another pass, over the headings only
+        head = head.replace(_TOC_MARKER, scan_toc(from_path, links).to_html())
+    
+    toc = TableOfContents()
+    with open(from_path, 'r', encoding='utf-8') as src, \
+            open(dest_path, 'w', encoding='utf-8') as out:
+        out.write(_rewrite_urls(head, basepath, asset_manifest))
+        out.write("<div>")
+        _, lines = read_front_matter(src)
+        for block in iter_markdown_blocks(lines):
+            block_html = block_to_html_node(block, toc, links, includes).to_html()
+            out.write(_rewrite_urls(block_html, basepath, asset_manifest))
+            if search_terms is not None:
+                search_terms.add_block(block)
+        out.write("</div>")
+        tail = tail.replace(_TOC_MARKER, toc.to_html())
+        out.write(_rewrite_urls(tail, basepath, asset_manifest))
+
+
+def scan_title(path):
+    """
+    Return the h1 title of a markdown file, reading only up to it.
+    
+    Raises:
+        Exception: If no h1 header is found
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        _, lines = read_front_matter(f)
+        for line in lines:
+            if line.strip().startswith("# "):
+                return extract_title(line)
+    raise Exception("No h1 header found in markdown")
+
+
+def scan_toc(path, links=None):
+    """
+    Return the TableOfContents of a markdown file, rendering only its
+    headings (with links resolving their wiki links, if given).
     """
-    Helper function to recursively copy directory contents.
+    toc = TableOfContents()
+    with open(path, 'r', encoding='utf-8') as f:
+        _, lines = read_front_matter(f)
+        for block in iter_markdown_blocks(lines):
+            if block_to_block_type(block) == BlockType.HEADING:
+                heading_to_html_node(block, toc, links)
+    return toc
+
+
+def copy_directory_contents(src, dst):
+    """
+    Replace the dst directory with a copy of the contents of src.
     
     Args:
         src: Source directory path
         dst: Destination directory path
     """
-    # List all items in the source directory
-    items = os.listdir(src)
+    # If destination exists, remove it completely
+    if os.path.exists(dst):
+        print(f"Removing existing directory: {dst}")
+        shutil.rmtree(dst)
     
-    for item in items:
-        src_path = os.path.join(src, item)
-        dst_path = os.path.join(dst, item)
-        
-        if os.path.isfile(src_path):
-            # Copy file
-            print(f"Copying file: {src_path} -> {dst_path}")
-            shutil.copy(src_path, dst_path)
-        else:
-            # Create directory and recursively copy its contents
-            print(f"Creating directory: {dst_path}")
-            os.mkdir(dst_path)
-            _copy_recursive(src_path, dst_path)
+    print(f"Creating directory: {dst}")
+    os.mkdir(dst)
+    print(copy_tree(src, dst, log=print).summary())
 
 
 def generate_page(from_path, template_path, dest_path, basepath="/"):
@@ -64,28 +205,12 @@ def generate_page(from_path, template_path, dest_path, basepath="/"):
     """
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
     
-    # Read the markdown file
     with open(from_path, 'r', encoding='utf-8') as f:
         markdown_content = f.read()
-    
-    # Read the template file
     with open(template_path, 'r', encoding='utf-8') as f:
         template_content = f.read()
     
-    # Convert markdown to HTML
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
-    
-    # Extract the title
-    title = extract_title(markdown_content)
-    
-    # Replace placeholders in template
-    final_html = template_content.replace("{{ Title }}", title)
-    final_html = final_html.replace("{{ Content }}", html_content)
-    
-    # Replace paths with basepath
-    final_html = final_html.replace('href="/', f'href="{basepath}')
-    final_html = final_html.replace('src="/', f'src="{basepath}')
+    final_html = render_page(markdown_content, template_content, basepath)
     
     # Ensure the destination directory exists
     dest_dir = os.path.dirname(dest_path)
@@ -93,7 +218,6 @@ def generate_page(from_path, template_path, dest_path, basepath="/"):
         print(f"Creating directory: {dest_dir}")
         os.makedirs(dest_dir)
     
-    # Write the final HTML to the destination file
     with open(dest_path, 'w', encoding='utf-8') as f:
         f.write(final_html)
     
@@ -110,57 +234,311 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
         dest_dir_path: Path to the destination directory
         basepath: The base URL path for the site (e.g., "/" or "/repo-name/")
     """
-    items = os.listdir(dir_path_content)
-
-    for item in items:
+    for item in os.listdir(dir_path_content):
         src_path = os.path.join(dir_path_content, item)
         dest_path = os.path.join(dest_dir_path, item)
-
+        
         if os.path.isfile(src_path):
             if src_path.endswith('.md'):
-                dest_path = dest_path.replace('.md', '.html')
-                generate_page(src_path, template_path, dest_path, basepath)
+                generate_page(src_path, template_path, dest_path[:-len('.md')] + '.html', basepath)
         else:
             generate_pages_recursive(src_path, template_path, dest_path, basepath)
 
 
-def main():
+def parse_args(argv):
     """
-    Main function to generate the static site.
+    Parse command line arguments.
+    
+    Args:
+        argv: Argument list without the program name
+        
+    Returns:
+        An argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Generate the static site.")
+    parser.add_argument(
+        "basepath", nargs="?", default="/",
+        help='base URL path for the site (e.g. "/" or "/repo-name/")',
+    )
+    parser.add_argument(
+        "--search-index", action="store_true",
+        help="emit a sharded client-side search index into <docs>/search",
+    )
+    parser.add_argument(
+        "--copy-mode", choices=COPY_MODES, default="copy",
+        help="how static files are copied; dedupe hardlinks identical files, "
+             "fingerprint adds content hashes to file names and rewrites references",
+    )
+    parser.add_argument(
+        "--minify", action="store_true",
+        help="minify generated HTML and copied CSS",
+    )
+    parser.add_argument(
+        "--stream-threshold", type=int, default=None, metavar="BYTES",
+        help="stream markdown files of at least BYTES bytes to bound memory use",
+    )
+    parser.add_argument(
+        "--only", action="append", default=[], metavar="PATTERN",
+        help="only render pages whose path under content/ matches PATTERN "
+             "(repeatable); existing output is kept instead of being rebuilt",
+    )
+    parser.add_argument(
+        "--only-static", action="append", default=[], metavar="PATTERN",
+        help="only copy static files whose path under static/ matches PATTERN "
+             "(repeatable); with --only but no --only-static, no assets are copied",
+    )
+    parser.add_argument(
+        "--listing", action="append", default=[], metavar="DIR",
+        help="generate paginated listing pages of the pages under content/DIR "
+             "(repeatable)",
+    )
+    parser.add_argument(
+        "--listing-page-size", type=int, default=DEFAULT_PAGE_SIZE, metavar="N",
+        help=f"entries per listing page (default: {DEFAULT_PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "--listing-sort", choices=SORT_KEYS, default="date",
+        help="order listing entries by front matter date (newest first) or by title",
+    )
+    parser.add_argument(
+        "--project-dir", default=None,
+        help="directory holding content/, static/ and template.html "
+             "(default: the parent of src/)",
+    )
+    parser.add_argument(
+        "--cache-dir", default=None,
+        help="directory for incremental build state (default: <project>/.cache)",
+    )
+    parser.add_argument(
+        "--memprofile", default=None, metavar="FILE",
+        help="record peak memory and node counts per page and stage with "
+             "tracemalloc and write a report of the worst offenders to FILE",
+    )
+    parser.add_argument(
+        "--mirror", action="append", default=[], metavar="BASEPATH=DIR",
+        help="also build the site for BASEPATH into DIR, rendering each page "
+             "only once for all of them (repeatable)",
+    )
+    parser.add_argument(
+        "--atomic", action="store_true",
+        help="build into docs.staging and swap it with docs only if the build "
+             "succeeds, keeping the previous build in docs.previous",
+    )
+    parser.add_argument(
+        "--archive", default=None, metavar="FILE",
+        help="write the site into FILE (.tar.gz, .tgz, .tar or .zip) with fixed "
+             "timestamps and ordering, instead of into docs",
+    )
+    parser.add_argument(
+        "--changes", default=None, metavar="FILE",
+        help="prune orphaned pages and write the output files added, changed "
+             "and removed since the previous build, with the URLs to purge, "
+             "to FILE as JSON",
+    )
+    parser.add_argument(
+        "--rollback", action="store_true",
+        help="swap docs with docs.previous instead of building",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-q", "--quiet", dest="verbosity", action="store_const", const=QUIET, default=NORMAL,
+        help="only print errors",
+    )
+    verbosity.add_argument(
+        "-v", "--verbose", dest="verbosity", action="store_const", const=VERBOSE,
+        help="print a line for every file copied and page written",
+    )
+    parser.add_argument(
+        "--log-events", default=None, metavar="FILE",
+        help="write build events (pages started and finished, with sizes and "
+             "durations) to FILE as JSON lines",
+    )
+    args = parser.parse_args(argv)
+    if args.only_static and args.copy_mode != "copy":
+        parser.error("--only-static only supports --copy-mode copy")
+    if args.listing_page_size < 1:
+        parser.error("--listing-page-size must be at least 1")
+    mirrors = []
+    for mirror in args.mirror:
+        mirror_basepath, sep, mirror_dir = mirror.partition("=")
+        if not sep or not mirror_basepath or not mirror_dir:
+            parser.error(f"--mirror must be BASEPATH=DIR: {mirror}")
+        mirrors.append((mirror_basepath, mirror_dir))
+    args.mirror = mirrors
+    if args.mirror and args.atomic:
+        parser.error("--mirror cannot be combined with --atomic")
+    if args.archive:
+        try:
+            archive_suffix(args.archive)
+            archive_mtime()
+        except ValueError as e:
+            parser.error(str(e))
+        if (args.only or args.only_static or args.atomic or args.rollback or args.mirror
+                or args.changes):
+            parser.error("--archive cannot be combined with --only, --only-static, "
+                         "--atomic, --rollback, --mirror or --changes")
+        if args.copy_mode != "copy":
+            parser.error("--archive only supports --copy-mode copy")
+    return args
+
+
+def create_site(args, project_root, log=print):
+    """
+    Create the builder.Site described by parsed command line arguments.
+    
+    Args:
+        args: Namespace returned by parse_args
+        project_root: Directory holding content/, static/ and template.html
+        log: Callable receiving progress messages
+        
+    Returns:
+        A builder.Site
     """
-    print("Starting static site generation...")
+    # Imported here because builder builds on the functions in this module
+    from builder import Site
     
-    # Get basepath from command line argument, default to "/"
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    return Site.from_project(
+        project_root,
+        basepath=args.basepath,
+        cache_dir=args.cache_dir or os.path.join(project_root, ".cache"),
+        copy_mode=args.copy_mode,
+        minify=args.minify,
+        search_index=args.search_index,
+        stream_threshold=args.stream_threshold,
+        listings=args.listing,
+        listing_page_size=args.listing_page_size,
+        listing_sort=args.listing_sort,
+        atomic=args.atomic,
+        mirrors=[(basepath, os.path.abspath(mirror_dir)) for basepath, mirror_dir in args.mirror],
+        archive=os.path.abspath(args.archive) if args.archive else None,
+        track_changes=bool(args.changes),
+        log=log,
+    )
+
+
+def create_log(args, write=None):
+    """
+    Create the buildlog.BuildLog described by parsed command line arguments.
+    
+    Args:
+        args: Namespace returned by parse_args
+        write: Callable receiving blocks of output lines (default: stdout)
+        
+    Returns:
+        A BuildLog, writing events to args.log_events if set
+    """
+    events = None
+    if args.log_events:
+        events_dir = os.path.dirname(args.log_events)
+        if events_dir:
+            os.makedirs(events_dir, exist_ok=True)
+        events = open(args.log_events, "w", encoding="utf-8")
+    return BuildLog(args.verbosity, write=write, events=events)
+
+
+def run_build(site, args, log=print):
+    """
+    Build a site as selected by the command line arguments and log a
+    summary of the result.
     
-    print(f"Using basepath: {basepath}")
+    Args:
+        site: The builder.Site to build
+        args: Namespace returned by parse_args
+        log: A buildlog.BuildLog, or a callable receiving every message
+        
+    Returns:
+        The process exit status: 0 on success, 1 if any page failed
+    """
+    log = as_build_log(log)
+    if args.rollback:
+        try:
+            rollback(site.live_dir)
+        except FileNotFoundError as e:
+            log.error(f"Error: {e}")
+            return 1
+        log.info(f"Rolled back {site.live_dir} to the previous build")
+        return 0
     
-    # Get the project root directory (parent of src directory)
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
+    profiler = None
+    if args.memprofile:
+        profiler = MemoryProfiler()
+        profiler.install(site)
+    try:
+        result = site.build(only=args.only, only_static=args.only_static)
+    finally:
+        if profiler is not None:
+            profiler.uninstall()
     
-    # Define directories relative to project root
-    static_dir = os.path.join(project_root, "static")
-    docs_dir = os.path.join(project_root, "docs")
-    content_dir = os.path.join(project_root, "content")
-    template_path = os.path.join(project_root, "template.html")
+    if profiler is not None:
+        profiler.write_report(args.memprofile)
+        log.info(f"Memory profile of {len(profiler.pages)} pages written to {args.memprofile}")
+    
+    if site.minifier is not None:
+        for path, before, after in site.minifier.report:
+            log(f"Minified {path}: {before} -> {after} bytes")
+        before, after = site.minifier.totals()
+        log.info(f"Minified {len(site.minifier.report)} files: {before} -> {after} bytes "
+                 f"({before - after} saved)")
+    
+    for path, message in result.warnings:
+        log.info(f"Warning: {path}: {message}")
+    
+    if args.changes and result.changes is not None:
+        changes = result.changes
+        changes.write(args.changes, site.basepath)
+        log.info(f"Outputs: {len(changes.added)} added, {len(changes.changed)} changed, "
+                 f"{len(changes.removed)} removed; written to {args.changes}")
+    
+    log.info(
+        f"Pages: {len(result.pages_written)} written, {len(result.pages_skipped)} unchanged, "
+        f"{len(result.pages_removed)} removed; {len(result.assets_copied)} static files copied "
+        f"in {result.timings['total']:.3f}s"
+    )
+    
+    if not result.ok:
+        for path, message in result.errors:
+            log.error(f"Error: {path}: {message}")
+        if result.published is False:
+            log.error(f"{site.archive or site.live_dir} was left unchanged")
+        return 1
+    log.flush()
+    return 0
+
+
+def default_project_root():
+    """Return the project root: the parent of the src directory."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.dirname(script_dir)
+
+
+def main():
+    """
+    Main function to generate the static site.
+    """
+    args = parse_args(sys.argv[1:])
+    log = create_log(args)
+    log("Starting static site generation...")
+    log(f"Using basepath: {args.basepath}")
     
-    print(f"Project root: {project_root}")
-    print(f"Static dir: {static_dir}")
-    print(f"Docs dir: {docs_dir}")
-    print(f"Content dir: {content_dir}")
-    print(f"Template: {template_path}")
+    project_root = os.path.abspath(args.project_dir or default_project_root())
     
-    # Copy static files to docs directory
-    copy_directory_contents(static_dir, docs_dir)
+    log(f"Project root: {project_root}")
+    log(f"Static dir: {os.path.join(project_root, 'static')}")
+    log(f"Docs dir: {os.path.join(project_root, 'docs')}")
+    log(f"Content dir: {os.path.join(project_root, 'content')}")
+    log(f"Template: {os.path.join(project_root, 'template.html')}")
     
-    # Generate all pages recursively
-    generate_pages_recursive(content_dir, template_path, docs_dir, basepath)
+    site = create_site(args, project_root, log)
+    try:
+        status = run_build(site, args, log)
+    finally:
+        log.close()
+    if status != 0:
+        sys.exit(1)
     
-    print("Static site generation complete!")
+    if args.verbosity >= NORMAL:
+        print("Static site generation complete!")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
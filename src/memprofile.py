@@ -0,0 +1,225 @@
+import time
+import tracemalloc
+
+import inline_markdown
+from htmlnode import HTMLNode
+from parentnode import ParentNode
+from textnode import TextNode
+
+# Rendering stages that are measured, in pipeline order
+STAGES = ("markdown_to_blocks", "text_to_textnodes", "to_html", "template")
+
+
+class PageProfile:
+    """
+    Memory use while rendering one page.
+    - peak: peak bytes allocated above what was in use when the page started
+    - text_nodes, html_nodes: TextNode and HTMLNode instances created
+    - stages: stage name -> largest peak of a single call of that stage
+    """
+
+    def __init__(self, rel_path):
+        self.rel_path = rel_path
+        self.peak = 0
+        self.text_nodes = 0
+        self.html_nodes = 0
+        self.stages = {}
+
+
+class StageProfile:
+    """Totals for one stage across all pages."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak = 0
+        self.worst_page = None
+
+
+class MemoryProfiler:
+    """
+    Records peak memory per page and per rendering stage with tracemalloc,
+    and counts TextNode/HTMLNode instances created per page.
+
+    Nothing in the generator knows about the profiler: install() wraps the
+    stage functions, the node constructors and the Site's page builder in
+    place, and uninstall() puts the originals back, so a build without
+    --memprofile runs exactly the code it always did.
+
+    Only pages rendered while installed are profiled; pages a Site serves
+    from its render cache do not show up. Streamed pages are split into
+    blocks one at a time, so each block read counts as a markdown_to_blocks
+    call and each block as a to_html call.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self.stages = {name: StageProfile(name) for name in STAGES}
+        self._page = None
+        self._page_peak = 0
+        self._to_html_depth = 0
+        self._patches = []
+        self._started_tracing = False
+
+    # Installation
+
+    def install(self, site):
+        """Start tracing and instrument the generator and site."""
+        # Imported here because main imports this module
+        import main
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._patch(inline_markdown, "markdown_to_blocks",
+                    self._stage("markdown_to_blocks", inline_markdown.markdown_to_blocks))
+        self._patch(inline_markdown, "text_to_textnodes",
+                    self._stage("text_to_textnodes", inline_markdown.text_to_textnodes))
+        self._patch(main, "iter_markdown_blocks",
+                    self._stage_steps("markdown_to_blocks", main.iter_markdown_blocks))
+        self._patch(main, "fill_template", self._stage("template", main.fill_template))
+        self._patch(ParentNode, "to_html", self._outermost_to_html(ParentNode.to_html))
+        self._patch(TextNode, "__init__", self._counting(TextNode.__init__, "text_nodes"))
+        self._patch(HTMLNode, "__init__", self._counting(HTMLNode.__init__, "html_nodes"))
+        self._patch(site, "_build_page", self._page_builder(site._build_page))
+
+    def uninstall(self):
+        """Restore everything install() replaced and stop tracing."""
+        for owner, name, original, had_own in reversed(self._patches):
+            if had_own:
+                setattr(owner, name, original)
+            else:
+                delattr(owner, name)
+        self._patches = []
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _patch(self, owner, name, replacement):
+        had_own = name in vars(owner)
+        self._patches.append((owner, name, getattr(owner, name), had_own))
+        setattr(owner, name, replacement)
+
+    # Measurement
+
+    def _observe_peak(self):
+        """Fold the current tracemalloc peak into the page peak."""
+        current, peak = tracemalloc.get_traced_memory()
+        if peak > self._page_peak:
+            self._page_peak = peak
+        return current
+
+    def _measure(self, name, fn, args, kwargs):
+        stage = self.stages[name]
+        start_bytes = self._observe_peak()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stage.seconds += time.perf_counter() - start
+            stage.calls += 1
+            peak = tracemalloc.get_traced_memory()[1]
+            if peak > self._page_peak:
+                self._page_peak = peak
+            used = peak - start_bytes
+            page = self._page
+            if used > stage.peak:
+                stage.peak = used
+                stage.worst_page = page.rel_path if page is not None else None
+            if page is not None and used > page.stages.get(name, 0):
+                page.stages[name] = used
+
+    def _stage(self, name, fn):
+        def measured(*args, **kwargs):
+            return self._measure(name, fn, args, kwargs)
+        return measured
+
+    def _stage_steps(self, name, fn):
+        # A generator does its work as it is iterated: measure every step
+        def measured(*args, **kwargs):
+            iterator = fn(*args, **kwargs)
+            while True:
+                try:
+                    item = self._measure(name, next, (iterator,), {})
+                except StopIteration:
+                    return
+                yield item
+        return measured
+
+    def _outermost_to_html(self, to_html):
+        # to_html recurses through the tree; only the outermost call is a
+        # stage, nested ones run unmeasured
+        profiler = self
+
+        def measured(node):
+            if profiler._to_html_depth:
+                return to_html(node)
+            profiler._to_html_depth += 1
+            try:
+                return profiler._measure("to_html", to_html, (node,), {})
+            finally:
+                profiler._to_html_depth -= 1
+        return measured
+
+    def _counting(self, init, counter):
+        profiler = self
+
+        def counted(node, *args, **kwargs):
+            page = profiler._page
+            if page is not None:
+                setattr(page, counter, getattr(page, counter) + 1)
+            init(node, *args, **kwargs)
+        return counted
+
+    def _page_builder(self, build_page):
+        def profiled(result, src_path, rel_path, *args, **kwargs):
+            page = PageProfile(rel_path)
+            self._page = page
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+            self._page_peak = start_bytes
+            try:
+                return build_page(result, src_path, rel_path, *args, **kwargs)
+            finally:
+                self._observe_peak()
+                page.peak = self._page_peak - start_bytes
+                self._page = None
+                # Pages served from the render cache allocate no nodes
+                if page.text_nodes or page.html_nodes or page.stages:
+                    self.pages.append(page)
+        return profiled
+
+    # Reporting
+
+    def worst_pages(self, limit=10):
+        """Return the `limit` pages with the highest peak, highest first."""
+        return sorted(self.pages, key=lambda page: page.peak, reverse=True)[:limit]
+
+    def report(self, limit=10):
+        """
+        Format the profile as text: per-stage totals followed by the pages
+        with the highest peak memory.
+        """
+        lines = [f"Memory profile: {len(self.pages)} pages rendered", ""]
+        lines.append(f"{'stage':20} {'calls':>8} {'seconds':>9} {'peak KiB':>10}  worst page")
+        for name in STAGES:
+            stage = self.stages[name]
+            lines.append(
+                f"{name:20} {stage.calls:8} {stage.seconds:9.3f} "
+                f"{stage.peak / 1024:10.1f}  {stage.worst_page or '-'}"
+            )
+        lines.append("")
+        lines.append(f"{'peak KiB':>10} {'TextNodes':>10} {'HTMLNodes':>10}  page (largest stage)")
+        for page in self.worst_pages(limit):
+            largest = max(page.stages, key=page.stages.get) if page.stages else "-"
+            lines.append(
+                f"{page.peak / 1024:10.1f} {page.text_nodes:10} {page.html_nodes:10}  "
+                f"{page.rel_path} ({largest})"
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path, limit=10):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report(limit))
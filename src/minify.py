@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import re
+
+# Elements whose content is whitespace-sensitive (or not HTML at all) and is
+# passed through untouched
+_HTML_PROTECTED_RE = re.compile(
+    r"(<(pre|code|textarea|script|style)\b.*?</\2\s*>)",
+    re.IGNORECASE | re.DOTALL,
+)
+_HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+# Whitespace between two tags that spans a line break is template
+# indentation; whitespace on a single line may be significant between
+# inline elements and is only collapsed
+_HTML_INDENT_RE = re.compile(r">\s*\n\s*<")
+_LEADING_INDENT_RE = re.compile(r"^\s*\n\s*")
+_TRAILING_INDENT_RE = re.compile(r"\s*\n\s*$")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)""", re.DOTALL)
+_CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON_RE = re.compile(r":\s+")
+
+
+def minify_html(html):
+    """
+    Strip template indentation, comments and redundant whitespace from an
+    HTML document. The content of <pre>, <code>, <textarea>, <script> and
+    <style> elements is left exactly as it is.
+    """
+    parts = _HTML_PROTECTED_RE.split(html)
+    out = []
+    # split() with two groups yields [text, element, tag name, text, ...]
+    for i in range(0, len(parts), 3):
+        text = _HTML_COMMENT_RE.sub("", parts[i])
+        text = _HTML_INDENT_RE.sub("><", text)
+        # Protected elements start with "<" and end with ">", so indentation
+        # next to them is stripped too
+        if i > 0:
+            text = _LEADING_INDENT_RE.sub("", text)
+        if i + 1 < len(parts):
+            text = _TRAILING_INDENT_RE.sub("", text)
+        out.append(_WHITESPACE_RE.sub(" ", text))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out).strip()
+
+
+def minify_css(css):
+    """
+    Remove comments and all whitespace that is not needed to parse a
+    stylesheet. String literals are kept verbatim.
+    """
+    out = []
+    for i, part in enumerate(_CSS_TOKEN_RE.split(css)):
+        if i % 2:
+            if not part.startswith("/*"):
+                out.append(part)
+            continue
+        part = _WHITESPACE_RE.sub(" ", part)
+        part = _CSS_PUNCTUATION_RE.sub(r"\1", part)
+        part = _CSS_COLON_RE.sub(":", part)
+        out.append(part)
+    return "".join(out).replace(";}", "}").strip()
+
+
+MINIFIERS = {
+    "html": minify_html,
+    "css": minify_css,
+}
+
+
+class Minifier:
+    """
+    Applies minify_html/minify_css and keeps a cache of results keyed by a
+    hash of the input, so unchanged pages and stylesheets are not minified
+    again on the next build. Every call is recorded in `report` as a
+    (path, bytes_before, bytes_after) tuple.
+
+    A long-lived process calls begin_build() before each build, so the
+    cache and report only hold what that build used. An output the build
+    reuses without minifying it again keeps its entry through keep().
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.cache = {}
+        self.report = []
+        if cache_path:
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError):
+                pass
+        self._used = {}
+        # Output path -> key of the text last minified for it
+        self._paths = {}
+
+    def minify(self, kind, text, path=None):
+        """
+        Minify text as `kind` ("html" or "css") using the cache.
+
+        Args:
+            kind: Key into MINIFIERS
+            text: The document to minify
+            path: Name recorded in the report
+
+        Returns:
+            The minified text
+        """
+        key = kind + ":" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+        cached = self.cache.get(key)
+        if cached is None:
+            result = MINIFIERS[kind](text)
+            # Text that is already minified is not stored twice
+            cached = result if len(result) < len(text) else True
+            self.cache[key] = cached
+        else:
+            result = text if cached is True else cached
+        self._used[key] = cached
+        if path is not None:
+            self._paths[path] = key
+        self.report.append((path, len(text.encode("utf-8")), len(result.encode("utf-8"))))
+        return result
+
+    def minify_file(self, kind, path):
+        """
+        Minify a file in place. The file is replaced rather than rewritten,
+        so hardlinked copies elsewhere are unaffected.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        result = self.minify(kind, text, path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(result)
+        os.replace(tmp_path, path)
+
+    def minify_tree(self, kind, directory, extension):
+        """Minify every file ending in extension under directory."""
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(extension):
+                    self.minify_file(kind, os.path.join(root, name))
+
+    def begin_build(self):
+        """Start recording the results used and the report of a new build."""
+        self._used = {}
+        self.report = []
+
+    def keep(self, paths):
+        """Count the results last written to paths as used by this build."""
+        for path in paths:
+            key = self._paths.get(path)
+            if key in self.cache:
+                self._used[key] = self.cache[key]
+
+    def totals(self):
+        """Return (bytes_before, bytes_after) over every minified file."""
+        before = sum(entry[1] for entry in self.report)
+        after = sum(entry[2] for entry in self.report)
+        return before, after
+
+    def save(self):
+        """
+        Persist the cache, keeping only entries used in this build and
+        dropping the others from memory too.
+        """
+        self.cache = dict(self._used)
+        if not self.cache_path:
+            return
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(self._used, f)
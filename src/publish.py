@@ -0,0 +1,127 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+
+from fastcopy import copy_file
+
+STAGING_SUFFIX = ".staging"
+PREVIOUS_SUFFIX = ".previous"
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+_renameat2 = None
+
+
+def staging_dir(live_dir):
+    return live_dir.rstrip(os.sep) + STAGING_SUFFIX
+
+
+def previous_dir(live_dir):
+    return live_dir.rstrip(os.sep) + PREVIOUS_SUFFIX
+
+
+def _load_renameat2():
+    global _renameat2
+    if _renameat2 is None:
+        _renameat2 = False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            function = libc.renameat2
+        except (OSError, AttributeError, TypeError):
+            return None
+        function.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p,
+                             ctypes.c_uint]
+        function.restype = ctypes.c_int
+        _renameat2 = function
+    return _renameat2 or None
+
+
+def exchange(a, b):
+    """
+    Atomically swap two paths with renameat2(RENAME_EXCHANGE): at every
+    instant each path names either the old or the new directory, never
+    nothing.
+
+    Returns:
+        True if swapped, False if the platform or filesystem does not
+        support atomic exchange
+    """
+    function = _load_renameat2()
+    if function is None:
+        return False
+    if function(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+        return False
+    raise OSError(err, os.strerror(err), a, None, b)
+
+
+def _swap(a, b):
+    """Swap two existing directories, atomically when possible."""
+    if exchange(a, b):
+        return
+    # Fallback: two renames, with a moment where b does not exist
+    tmp = b + ".swap"
+    os.rename(b, tmp)
+    os.rename(a, b)
+    os.rename(tmp, a)
+
+
+def link_tree(src, dst):
+    """
+    Recreate the tree src at dst with every file hardlinked to the one in
+    src, so dst costs no file data. Files that cannot be linked are copied.
+
+    Anything writing into dst must replace files instead of rewriting them
+    in place, or the change would show up in src too.
+    """
+    for root, dir_names, file_names in os.walk(src):
+        rel_root = os.path.relpath(root, src)
+        dst_root = dst if rel_root == "." else os.path.join(dst, rel_root)
+        os.makedirs(dst_root, exist_ok=True)
+        for name in file_names:
+            src_path = os.path.join(root, name)
+            dst_path = os.path.join(dst_root, name)
+            try:
+                os.link(src_path, dst_path)
+            except OSError:
+                copy_file(src_path, dst_path)
+
+
+def publish(staging, live):
+    """
+    Make the staging directory the live one. The old live directory is
+    kept as <live>.previous for rollback, replacing the one before it.
+
+    Where renameat2 is available the swap is atomic, so a web server
+    pointed at live never sees a missing or half-built site.
+    """
+    previous = previous_dir(live)
+    if not os.path.exists(live):
+        os.rename(staging, live)
+        return
+    _swap(staging, live)
+    # staging now holds the old live build
+    if os.path.exists(previous):
+        shutil.rmtree(previous)
+    os.rename(staging, previous)
+
+
+def rollback(live):
+    """
+    Swap the live directory with <live>.previous. Rolling back twice
+    restores the build that was rolled back.
+
+    Raises:
+        FileNotFoundError: If there is no previous build
+    """
+    previous = previous_dir(live)
+    if not os.path.isdir(previous):
+        raise FileNotFoundError(f"No previous build to roll back to: {previous}")
+    if not os.path.exists(live):
+        os.rename(previous, live)
+        return
+    _swap(previous, live)
@@ -0,0 +1,383 @@
+import hashlib
+import json
+import os
+import re
+
+from frontmatter import split_front_matter
+from inline_markdown import (BlockType, block_to_block_type, markdown_to_blocks,
+                             text_to_textnodes)
+
+# Common English words that carry no meaning for search and would otherwise
+# dominate every shard.
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same
+she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours yourself
+yourselves
+""".split())
+
+MIN_TOKEN_LENGTH = 2
+DEFAULT_SHARD_BYTES = 32 * 1024
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """
+    Split plain text into lowercase search terms.
+
+    Punctuation separates tokens, stop words and very short tokens are dropped.
+
+    Args:
+        text: Plain text
+
+    Returns:
+        A list of terms in document order
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group(0)
+        if len(token) >= MIN_TOKEN_LENGTH and token not in STOP_WORDS:
+            tokens.append(token)
+    return tokens
+
+
+def _strip_block_markers(block, block_type):
+    """
+    Remove the block-level markdown syntax (heading hashes, quote markers,
+    list prefixes) so only the inline text is left.
+    """
+    lines = block.split("\n")
+    if block_type == BlockType.HEADING:
+        return block.lstrip("#").strip()
+    if block_type == BlockType.QUOTE:
+        return " ".join(line.lstrip(">").strip() for line in lines)
+    if block_type == BlockType.UNORDERED_LIST:
+        return " ".join(line[2:] for line in lines)
+    if block_type == BlockType.ORDERED_LIST:
+        return " ".join(line[line.index(". ") + 2:] for line in lines)
+    return " ".join(lines)
+
+
+def block_to_plain_text(block):
+    """
+    Extract the plain text of one markdown block from its TextNode stream.
+
+    Link text and image alt text are kept, URLs and markup are dropped. Code
+    blocks are included verbatim.
+    """
+    block_type = block_to_block_type(block)
+    if block_type == BlockType.CODE:
+        return block.strip("`")
+    text = _strip_block_markers(block, block_type)
+    try:
+        text_nodes = text_to_textnodes(text)
+    except ValueError:
+        # Unbalanced inline markup: index the raw text rather than failing
+        # the build over a search feature
+        return text
+    return "".join(node.text for node in text_nodes)
+
+
+def markdown_to_plain_text(markdown):
+    """
+    Extract the plain text of a markdown document, block by block with
+    block_to_plain_text.
+
+    Args:
+        markdown: A string containing the full markdown document
+
+    Returns:
+        The plain text, one block per line
+    """
+    try:
+        _, markdown = split_front_matter(markdown)
+    except ValueError:
+        pass
+    return "\n".join(block_to_plain_text(block) for block in markdown_to_blocks(markdown))
+
+
+def page_url(rel_path, basepath="/"):
+    """
+    Map a content-relative markdown path to the URL of its generated page.
+
+    Example: "blog/tom/index.md" -> "/blog/tom/"
+    """
+    rel_path = rel_path.replace(os.sep, "/")
+    if rel_path == "index.md":
+        return basepath
+    if rel_path.endswith("/index.md"):
+        return basepath + rel_path[:-len("index.md")]
+    return basepath + rel_path[:-len(".md")] + ".html"
+
+
+class PageTerms:
+    """
+    Collects the search terms and title of one page block by block as it
+    is rendered, like toc.TableOfContents collects its headings, so a
+    streamed page is indexed without holding its text.
+    """
+
+    def __init__(self):
+        self.terms = {}
+        self.title = ""
+
+    def add_block(self, block):
+        """Count the terms of a markdown block (front matter excluded)."""
+        if not self.title:
+            for line in block.split("\n"):
+                if line.strip().startswith("# "):
+                    self.title = line.strip()[2:].strip()
+                    break
+        for token in tokenize(block_to_plain_text(block)):
+            self.terms[token] = self.terms.get(token, 0) + 1
+
+
+class SearchIndex:
+    """
+    Inverted index over the plain text of every page of the site.
+
+    Per-page term counts are kept keyed by the content-relative markdown
+    path together with a hash of the markdown, so an index loaded from a
+    previous build only re-tokenizes pages whose source changed.
+
+    Document ids are assigned in the order pages are first indexed and are
+    never reused, so adding or removing a page only rewrites pages.json and
+    the shards holding its terms.
+
+    The index is written as a directory of JSON files:
+    - pages.json: list of [url, title] pairs, indexed by document id, with
+      null for the ids of removed pages
+    - index.json: {"shards": [[first_term, file_name], ...]} sorted by term,
+      so a client can binary search for the one shard holding a term
+    - shard-N.json: {term: [[doc_id, term_count], ...]}
+    """
+
+    def __init__(self):
+        self.pages = {}
+        # Rel path -> document id
+        self.doc_ids = {}
+        self.next_id = 0
+
+    def update_page(self, rel_path, markdown):
+        """
+        Add or refresh a page in the index.
+
+        Args:
+            rel_path: Content-relative path of the markdown file
+            markdown: The markdown source of the page
+
+        Returns:
+            True if the page was (re)tokenized, False if it was unchanged
+        """
+        digest = hashlib.sha1(markdown.encode("utf-8")).hexdigest()
+        entry = self.pages.get(rel_path)
+        if entry is not None and entry["hash"] == digest:
+            return False
+
+        try:
+            _, markdown = split_front_matter(markdown)
+        except ValueError:
+            pass
+        page_terms = PageTerms()
+        for block in markdown_to_blocks(markdown):
+            page_terms.add_block(block)
+        self.add_page(rel_path, page_terms, digest)
+        return True
+
+    def add_page(self, rel_path, page_terms, digest=None):
+        """
+        Add or replace a page with terms already collected.
+
+        Args:
+            rel_path: Content-relative path of the markdown file
+            page_terms: The PageTerms of the page
+            digest: Hash of its markdown, or None (e.g. for a streamed page)
+                to have update_page() re-tokenize it regardless
+        """
+        if rel_path not in self.doc_ids:
+            self.doc_ids[rel_path] = self.next_id
+            self.next_id += 1
+        self.pages[rel_path] = {"hash": digest, "title": page_terms.title,
+                                "terms": page_terms.terms}
+
+    def retain(self, rel_paths):
+        """
+        Drop every page that is not in rel_paths.
+
+        Returns:
+            The number of pages removed
+        """
+        keep = set(rel_paths)
+        removed = [path for path in self.pages if path not in keep]
+        for path in removed:
+            del self.pages[path]
+            del self.doc_ids[path]
+        return len(removed)
+
+    def postings(self):
+        """
+        Build the inverted index.
+
+        Returns:
+            A tuple (doc_paths, postings) where doc_paths lists the page
+            paths by document id (None for removed pages) and postings maps
+            each term to a list of [doc_id, term_count] pairs
+        """
+        doc_paths = [None] * self.next_id
+        for path, doc_id in self.doc_ids.items():
+            doc_paths[doc_id] = path
+        postings = {}
+        for doc_id, path in enumerate(doc_paths):
+            if path is None:
+                continue
+            for term, count in self.pages[path]["terms"].items():
+                postings.setdefault(term, []).append([doc_id, count])
+        return doc_paths, postings
+
+    def shards(self, max_shard_bytes=DEFAULT_SHARD_BYTES):
+        """
+        Split the postings into term-ordered shards of roughly
+        max_shard_bytes of JSON each. A single term larger than the limit
+        gets a shard of its own.
+
+        Returns:
+            A tuple (doc_paths, shards) where shards is a list of
+            {term: postings} dicts
+        """
+        doc_paths, postings = self.postings()
+        shards = []
+        current = {}
+        current_size = 0
+        for term in sorted(postings):
+            # Approximate the serialized size of '"term":[[1,2],...],'
+            entry_size = len(term) + 4 + len(json.dumps(postings[term], separators=(",", ":")))
+            if current and current_size + entry_size > max_shard_bytes:
+                shards.append(current)
+                current = {}
+                current_size = 0
+            current[term] = postings[term]
+            current_size += entry_size
+        if current:
+            shards.append(current)
+        return doc_paths, shards
+
+    def files(self, basepath="/", max_shard_bytes=DEFAULT_SHARD_BYTES):
+        """
+        Return the index files: a dict of file name -> JSON text, for
+        "pages.json", "index.json" and each "shard-N.json".
+        """
+        doc_paths, shards = self.shards(max_shard_bytes)
+
+        files = {}
+        pages = [None if path is None else [page_url(path, basepath), self.pages[path]["title"]]
+                 for path in doc_paths]
+        files["pages.json"] = pages
+        manifest = []
+        for i, shard in enumerate(shards):
+            name = f"shard-{i}.json"
+            files[name] = shard
+            manifest.append([next(iter(shard)), name])
+        files["index.json"] = {"shards": manifest}
+        return {name: json.dumps(data, separators=(",", ":")) for name, data in files.items()}
+
+    def write(self, out_dir, basepath="/", max_shard_bytes=DEFAULT_SHARD_BYTES):
+        """
+        Write the index files into out_dir. Files whose content is already
+        up to date are left untouched and stale shards are removed.
+
+        Returns:
+            The number of files written
+        """
+        files = self.files(basepath, max_shard_bytes)
+        os.makedirs(out_dir, exist_ok=True)
+        written = 0
+        for name, content in files.items():
+            if _write_if_changed(os.path.join(out_dir, name), content):
+                written += 1
+
+        for name in os.listdir(out_dir):
+            if name.startswith("shard-") and name not in files:
+                os.remove(os.path.join(out_dir, name))
+        return written
+
+    def save(self, path):
+        """Persist the per-page state so the next build can be incremental."""
+        state_dir = os.path.dirname(path)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        state = {"next_id": self.next_id, "doc_ids": self.doc_ids, "pages": self.pages}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        """Load state saved by save(), or return an empty index."""
+        index = cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            index.pages = state["pages"]
+            index.doc_ids = state["doc_ids"]
+            index.next_id = state["next_id"]
+        except (OSError, ValueError, KeyError, TypeError):
+            index = cls()
+        return index
+
+
+def _write_if_changed(path, content):
+    """
+    Write content to path unless the file already holds exactly that. The
+    file is replaced, never rewritten in place, so hardlinks to it (as in a
+    staged build) keep their content.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def build_search_index(content_dir, out_dir, state_path=None, basepath="/",
+                       max_shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    Index every markdown page under content_dir and write the shards to
+    out_dir. When state_path is given, the previous build's state is loaded
+    from it and only changed pages are re-tokenized.
+
+    Returns:
+        A tuple (pages_indexed, pages_total)
+    """
+    index = SearchIndex.load(state_path) if state_path else SearchIndex()
+
+    seen = []
+    indexed = 0
+    for root, dirs, files in os.walk(content_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".md"):
+                continue
+            src_path = os.path.join(root, name)
+            rel_path = os.path.relpath(src_path, content_dir).replace(os.sep, "/")
+            with open(src_path, "r", encoding="utf-8") as f:
+                markdown = f.read()
+            if index.update_page(rel_path, markdown):
+                indexed += 1
+            seen.append(rel_path)
+    index.retain(seen)
+
+    index.write(out_dir, basepath, max_shard_bytes)
+    if state_path:
+        index.save(state_path)
+    return indexed, len(seen)
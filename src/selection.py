@@ -0,0 +1,74 @@
+import os
+from fnmatch import fnmatchcase
+
+from fastcopy import copy_files
+
+_WILDCARDS = "*?["
+
+
+def matches(rel_path, patterns):
+    """
+    Return True if a "/"-separated relative path matches any of the glob
+    patterns. "*" also matches "/", so "blog/*" and "blog/**" both select
+    everything under blog/.
+    """
+    return any(fnmatchcase(rel_path, pattern) for pattern in patterns)
+
+
+def _literal_prefix(pattern):
+    """Return the part of a pattern before its first wildcard."""
+    for i, char in enumerate(pattern):
+        if char in _WILDCARDS:
+            return pattern[:i]
+    return pattern
+
+
+def may_contain_matches(rel_dir, patterns):
+    """
+    Return True if files under the relative directory rel_dir could match
+    any of the patterns, so directories that cannot match are not walked.
+    """
+    if not rel_dir:
+        return True
+    rel_dir += "/"
+    for pattern in patterns:
+        prefix = _literal_prefix(pattern)
+        if prefix.startswith(rel_dir) or rel_dir.startswith(prefix):
+            return True
+    return False
+
+
+def iter_selected_files(root, patterns):
+    """
+    Yield (path, rel_path) for every file under root whose "/"-separated
+    path relative to root matches one of the patterns, in a stable order.
+    """
+    for dir_path, dir_names, file_names in os.walk(root):
+        rel_dir = os.path.relpath(dir_path, root).replace(os.sep, "/")
+        if rel_dir == ".":
+            rel_dir = ""
+        dir_names[:] = sorted(
+            name for name in dir_names
+            if may_contain_matches(f"{rel_dir}/{name}" if rel_dir else name, patterns)
+        )
+        for name in sorted(file_names):
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if matches(rel_path, patterns):
+                yield os.path.join(dir_path, name), rel_path
+
+
+def copy_selected(src, dst, patterns):
+    """
+    Copy the files under src that match patterns into dst, creating
+    directories as needed and leaving every other file in dst untouched.
+
+    Returns:
+        The list of destination paths written
+    """
+    copies = []
+    for src_path, rel_path in iter_selected_files(src, patterns):
+        dst_path = os.path.join(dst, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        copies.append((src_path, dst_path))
+    copy_files(copies)
+    return [dst_path for _, dst_path in copies]
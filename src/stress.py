@@ -0,0 +1,126 @@
+import gc
+import sys
+import time
+import tracemalloc
+
+from inline_markdown import markdown_to_blocks, markdown_to_html_node
+
+# Pathological markdown by name: each takes a size n and returns a document
+# that grows linearly with n
+PATHOLOGICAL_INPUTS = {
+    "asterisks": lambda n: "*" * (2 * n),
+    "italic_runs": lambda n: "*a* " * n,
+    "code_spans": lambda n: "`a` " * n,
+    "nested_brackets": lambda n: "[" * n + "]" * n,
+    "bracket_soup": lambda n: "[a](" * n,
+    "many_links": lambda n: "[a](b) " * n,
+    "many_images": lambda n: "![a](b) " * n,
+    "long_line": lambda n: "word " * n,
+    "hashes": lambda n: "#" * n,
+    "tiny_blocks": lambda n: "a\n\n" * n,
+    "duplicate_headings": lambda n: "## a\n\n" * n,
+    "long_list": lambda n: "- x\n" * n,
+    "long_ordered_list": lambda n: "".join(f"{i}. x\n" for i in range(1, n + 1)),
+    "quote_lines": lambda n: "> a\n" * n,
+}
+
+STAGES = ("markdown_to_blocks", "markdown_to_html_node", "to_html")
+
+
+def _render(markdown):
+    try:
+        return markdown_to_html_node(markdown)
+    except ValueError:
+        # Rejected as invalid markdown: fine, as long as it is rejected fast
+        return None
+
+
+def _to_html(node):
+    return node.to_html() if node is not None else ""
+
+
+def _best_time(fn, arg, repeat):
+    best = None
+    # Collections of everything allocated so far would blur the timings
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(arg)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    return best
+
+
+def measure(markdown, repeat=3):
+    """
+    Time each stage of rendering a document, best of `repeat` runs.
+
+    Returns:
+        dict of stage name -> seconds
+    """
+    node = _render(markdown)
+    return {
+        "markdown_to_blocks": _best_time(markdown_to_blocks, markdown, repeat),
+        "markdown_to_html_node": _best_time(_render, markdown, repeat),
+        "to_html": _best_time(_to_html, node, repeat),
+    }
+
+
+def _count(fn, arg):
+    count = 0
+
+    def trace(frame, event, arg):
+        nonlocal count
+        if event == "line":
+            count += 1
+        return trace
+
+    def profile(frame, event, arg):
+        nonlocal count
+        if event == "c_call":
+            count += 1
+            # A str method scans or copies (up to) the whole string, which
+            # is where quadratic splitting hides
+            receiver = getattr(arg, "__self__", None)
+            if isinstance(receiver, (str, bytes)):
+                count += len(receiver)
+
+    sys.settrace(trace)
+    sys.setprofile(profile)
+    try:
+        fn(arg)
+    finally:
+        sys.setprofile(None)
+        sys.settrace(None)
+    return count
+
+
+def count_operations(markdown):
+    """
+    Count the work of each stage of rendering a document: Python lines
+    executed, builtin functions called, and the length of every string a
+    str method was called on. Unlike timings this is the same on every
+    run, so tests can compare it across input sizes.
+
+    Returns:
+        dict of stage name -> operations
+    """
+    node = _render(markdown)
+    return {
+        "markdown_to_blocks": _count(markdown_to_blocks, markdown),
+        "markdown_to_html_node": _count(_render, markdown),
+        "to_html": _count(_to_html, node),
+    }
+
+
+def peak_memory(markdown):
+    """Return the peak bytes allocated while rendering a document to HTML."""
+    tracemalloc.start()
+    try:
+        _to_html(_render(markdown))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
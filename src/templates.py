@@ -0,0 +1,239 @@
+import os
+import posixpath
+import re
+
+# Directory, relative to the template root, holding the layouts pages can
+# pick with "layout: name" in their front matter
+LAYOUT_DIR = "layouts"
+
+_TOKEN_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{%\s*(.*?)\s*%\}", re.DOTALL)
+_NAME_ARG_RE = re.compile(r"""^(extends|include)\s+(?:"([^"]+)"|'([^']+)')$""")
+_BLOCK_RE = re.compile(r"^block\s+(\w+)$")
+_ENDBLOCK_RE = re.compile(r"^endblock(?:\s+(\w+))?$")
+
+
+class TemplateError(Exception):
+    pass
+
+
+class Template:
+    """
+    A compiled template: the literal text between variable substitutions,
+    with inheritance and includes already resolved, so rendering is a
+    single join.
+
+    - name: the template name it was loaded as
+    - literals: len(names) + 1 strings surrounding the substitutions
+    - names: the variable names substituted, in order
+    - dependencies: path -> mtime_ns of every file it was compiled from
+    """
+
+    def __init__(self, name, literals, names, dependencies):
+        self.name = name
+        self.literals = literals
+        self.names = names
+        self.dependencies = dependencies
+        self._pairs = tuple(zip(names, literals[1:]))
+
+    def render(self, variables):
+        """
+        Render the template. Missing variables render as the empty string.
+
+        Args:
+            variables: dict of variable name -> str value
+
+        Returns:
+            The rendered string
+        """
+        parts = [self.literals[0]]
+        get = variables.get
+        for name, literal in self._pairs:
+            parts.append(get(name, ""))
+            parts.append(literal)
+        return "".join(parts)
+
+    def is_current(self):
+        """Return True if none of the files it was compiled from changed."""
+        for path, mtime in self.dependencies.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def __repr__(self):
+        return f"Template({self.name}, {len(self.names)} substitutions)"
+
+
+def _parse(source, name):
+    """
+    Parse template source into (extends name or None, nodes). Nodes are
+    ("text", str), ("var", name), ("include", name) and
+    ("block", name, child nodes).
+    """
+    extends = None
+    root = []
+    # Stack of (block name, nodes of the enclosing level)
+    stack = []
+    nodes = root
+    pos = 0
+    for match in _TOKEN_RE.finditer(source):
+        if match.start() > pos:
+            nodes.append(("text", source[pos:match.start()]))
+        pos = match.end()
+        variable, tag = match.groups()
+        if variable is not None:
+            nodes.append(("var", variable))
+            continue
+
+        name_arg = _NAME_ARG_RE.match(tag)
+        block = _BLOCK_RE.match(tag)
+        endblock = _ENDBLOCK_RE.match(tag)
+        if name_arg:
+            keyword = name_arg.group(1)
+            target = name_arg.group(2) or name_arg.group(3)
+            if keyword == "include":
+                nodes.append(("include", target))
+            elif extends is not None:
+                raise TemplateError(f"{name}: more than one extends")
+            else:
+                extends = target
+        elif block:
+            children = []
+            nodes.append(("block", block.group(1), children))
+            stack.append((block.group(1), nodes))
+            nodes = children
+        elif endblock:
+            if not stack:
+                raise TemplateError(f"{name}: endblock without block")
+            block_name, nodes = stack.pop()
+            if endblock.group(1) not in (None, block_name):
+                raise TemplateError(f"{name}: endblock {endblock.group(1)} closes block {block_name}")
+        else:
+            raise TemplateError(f"{name}: unknown tag {{% {tag} %}}")
+    if stack:
+        raise TemplateError(f"{name}: block {stack[-1][0]} is not closed")
+    if pos < len(source):
+        nodes.append(("text", source[pos:]))
+    return extends, root
+
+
+def _collect_blocks(nodes, blocks):
+    for node in nodes:
+        if node[0] == "block":
+            blocks.setdefault(node[1], node[2])
+            _collect_blocks(node[2], blocks)
+    return blocks
+
+
+class TemplateLoader:
+    """
+    Loads templates by name (a "/"-separated path relative to root) and
+    keeps them compiled. A cached template is reused until one of the files
+    it was compiled from changes.
+
+    Supported syntax:
+    - {{ Name }}: substitute a variable
+    - {% extends "base.html" %}: render base.html with this template's
+      blocks replacing the blocks of the same name; text outside blocks is
+      ignored
+    - {% block name %}...{% endblock %}: a replaceable section
+    - {% include "partials/nav.html" %}: insert another template
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.compiles = 0
+        self._cache = {}
+
+    def path_for(self, name):
+        rel_path = posixpath.normpath(name)
+        if rel_path.startswith("../") or rel_path == ".." or posixpath.isabs(rel_path):
+            raise TemplateError(f"Template name outside the template directory: {name}")
+        return os.path.join(self.root, *rel_path.split("/"))
+
+    def get(self, name):
+        """
+        Return the compiled Template for name, compiling it if it is not
+        cached or changed on disk.
+
+        Raises:
+            TemplateError: If the template or a template it uses is
+                missing, invalid, or includes or extends itself
+        """
+        template = self._cache.get(name)
+        if template is not None and template.is_current():
+            return template
+        template = self.compile(name)
+        self._cache[name] = template
+        return template
+
+    def is_cached(self, template):
+        """Return True if template is what get() last returned for its name."""
+        return self._cache.get(template.name) is template
+
+    def refresh(self):
+        """
+        Drop cached templates whose files changed.
+
+        Returns:
+            The names of the templates dropped
+        """
+        stale = [name for name, template in self._cache.items() if not template.is_current()]
+        for name in stale:
+            del self._cache[name]
+        return stale
+
+    def compile(self, name):
+        """Compile a template without consulting or filling the cache."""
+        self.compiles += 1
+        dependencies = {}
+        tokens = []
+        self._expand(name, {}, [], dependencies, tokens)
+
+        literals = [""]
+        names = []
+        for kind, value in tokens:
+            if kind == "text":
+                literals[-1] += value
+            else:
+                names.append(value)
+                literals.append("")
+        return Template(name, literals, names, dependencies)
+
+    def _expand(self, name, overrides, stack, dependencies, tokens):
+        if name in stack:
+            raise TemplateError("Template cycle: " + " -> ".join(stack + [name]))
+        path = self.path_for(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8") as f:
+                source = f.read()
+        except FileNotFoundError:
+            raise TemplateError(f"Template not found: {name}") from None
+        dependencies[path] = mtime
+        extends, nodes = _parse(source, name)
+        stack = stack + [name]
+        if extends is not None:
+            blocks = _collect_blocks(nodes, {})
+            blocks.update(overrides)
+            self._expand(extends, blocks, stack, dependencies, tokens)
+        else:
+            self._emit(nodes, overrides, stack, dependencies, tokens)
+
+    def _emit(self, nodes, overrides, stack, dependencies, tokens):
+        for node in nodes:
+            kind = node[0]
+            if kind == "block":
+                children = overrides.get(node[1], node[2])
+                self._emit(children, overrides, stack, dependencies, tokens)
+            elif kind == "include":
+                self._expand(node[1], {}, stack, dependencies, tokens)
+            else:
+                tokens.append(node)
+
+
+def layout_template_name(layout):
+    """Return the template name for a front matter layout, e.g. "layouts/post.html"."""
+    return f"{LAYOUT_DIR}/{layout}.html"
@@ -0,0 +1,160 @@
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from archive import DEFAULT_MTIME, archive_mtime, archive_suffix, open_archive
+from builder import Site
+from main import parse_args
+from testutil import SiteTestCase, write_file
+
+
+def _tar_members(path):
+    with tarfile.open(path) as tar:
+        return {info.name: tar.extractfile(info).read() for info in tar.getmembers()}
+
+
+def _zip_members(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+class TestArchive(SiteTestCase):
+    def build_archive(self, name, **kwargs):
+        path = self.path("out", name)
+        result = Site.from_project(self.root, archive=path, **kwargs).build()
+        return path, result
+
+    def built_files(self, **kwargs):
+        Site.from_project(self.root, **kwargs).build()
+        files = {}
+        docs = self.path("docs")
+        for root, _, names in os.walk(docs):
+            for name in names:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, docs).replace(os.sep, "/")] = f.read()
+        return files
+
+    def test_tar_matches_directory_build(self):
+        path, result = self.build_archive("site.tar.gz", basepath="/repo/", search_index=True)
+        self.assertTrue(result.ok)
+        self.assertTrue(result.published)
+        self.assertFalse(os.path.exists(self.path("docs")))
+        members = _tar_members(path)
+        self.assertEqual(members, self.built_files(basepath="/repo/", search_index=True))
+        self.assertIn(b'<a href="/repo/blog/tom">Tom</a>', members["index.html"])
+
+    def test_zip_matches_directory_build(self):
+        path, result = self.build_archive("site.zip", minify=True, stream_threshold=1)
+        self.assertTrue(result.ok)
+        self.assertEqual(_zip_members(path), self.built_files(minify=True, stream_threshold=1))
+
+    def test_entries_are_ordered_with_fixed_metadata(self):
+        path, _ = self.build_archive("site.tar")
+        with tarfile.open(path) as tar:
+            infos = tar.getmembers()
+        self.assertEqual([info.name for info in infos], [
+            "images/tom.png", "index.css", "index.html", "blog/tom/index.html",
+        ])
+        self.assertTrue(all(info.mtime == DEFAULT_MTIME for info in infos))
+        self.assertTrue(all(info.uid == 0 and info.uname == "" for info in infos))
+
+    def test_archives_are_reproducible(self):
+        for name in ("site.tar.gz", "site.zip"):
+            path, _ = self.build_archive(name)
+            with open(path, "rb") as f:
+                first = f.read()
+            # A fresh process: nothing cached, new source mtimes
+            os.utime(self.path("content", "index.md"), (0, 0))
+            path, _ = self.build_archive(name)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), first, name)
+
+    def test_rebuild_writes_the_whole_archive(self):
+        path = self.path("site.tar.gz")
+        site = Site.from_project(self.root, archive=path, listings=["blog"])
+        site.build()
+        write_file(self.path("content", "blog", "tom", "index.md"), "# Tom Bombadil")
+        result = site.build()
+        members = _tar_members(path)
+        self.assertEqual(len(result.pages_written), 3)
+        self.assertIn(b"Tom Bombadil", members["blog/tom/index.html"])
+        self.assertIn("blog/index.html", members)
+        self.assertIn("index.css", members)
+
+    def test_failed_build_keeps_previous_archive(self):
+        path, _ = self.build_archive("site.tar.gz")
+        with open(path, "rb") as f:
+            previous = f.read()
+        write_file(self.path("content", "broken.md"), "No title")
+        path, result = self.build_archive("site.tar.gz")
+        self.assertFalse(result.ok)
+        self.assertIs(result.published, False)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), previous)
+        self.assertEqual(os.listdir(self.path("out")), ["site.tar.gz"])
+
+    def test_unsupported_options(self):
+        with self.assertRaises(ValueError):
+            Site.from_project(self.root, archive=self.path("site.rar"))
+        with self.assertRaises(ValueError):
+            Site.from_project(self.root, archive=self.path("site.zip"), copy_mode="dedupe")
+        with self.assertRaises(ValueError):
+            Site.from_project(self.root, archive=self.path("site.zip"), atomic=True)
+        site = Site.from_project(self.root, archive=self.path("site.zip"))
+        with self.assertRaises(ValueError):
+            site.build(only=["index.md"])
+
+
+class TestArchiveHelpers(unittest.TestCase):
+    def test_archive_suffix(self):
+        self.assertEqual(archive_suffix("out.tar.gz"), ".tar.gz")
+        self.assertEqual(archive_suffix("out.tgz"), ".tgz")
+        with self.assertRaises(ValueError):
+            archive_suffix("out.gz")
+
+    def test_source_date_epoch(self):
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"}):
+            self.assertEqual(archive_mtime(), 1700000000)
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": ""}):
+            self.assertEqual(archive_mtime(), DEFAULT_MTIME)
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000.5"}):
+            with self.assertRaises(ValueError):
+                archive_mtime()
+
+    def test_zip_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.zip")
+            archive = open_archive(path, mtime=DEFAULT_MTIME)
+            archive.add_bytes("a.txt", b"a")
+            archive.close()
+            with zipfile.ZipFile(path) as zf:
+                info = zf.getinfo("a.txt")
+                self.assertEqual(zf.read(info), b"a")
+        self.assertEqual(info.date_time, (1980, 1, 1, 0, 0, 0))
+        self.assertEqual(info.external_attr >> 16 & 0o777, 0o644)
+
+
+class TestArchiveArgs(unittest.TestCase):
+    def test_conflicting_options(self):
+        for argv in (["--archive", "a.tar.gz", "--only", "x"],
+                     ["--archive", "a.tar.gz", "--atomic"],
+                     ["--archive", "a.tar.gz", "--copy-mode", "fingerprint"],
+                     ["--archive", "a.7z"]):
+            with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+                parse_args(argv)
+        self.assertEqual(parse_args(["--archive", "a.zip"]).archive, "a.zip")
+
+    def test_invalid_source_date_epoch(self):
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000.5"}):
+            with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+                parse_args(["--archive", "a.zip"])
+            with self.assertRaises(ValueError):
+                Site("content", "static", "template.html", "docs", archive="a.zip")
+
+
+if __name__ == "__main__":
+    unittest.main()
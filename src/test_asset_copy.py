@@ -0,0 +1,107 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import asset_copy
+from asset_copy import copy_tree, dedupe_copy, hash_file, hash_files, list_files
+from testutil import write_file
+
+
+class TestHashFile(unittest.TestCase):
+    def test_hash_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.bin")
+            write_file(path, b"hello")
+            self.assertEqual(hash_file(path), hashlib.sha256(b"hello").hexdigest())
+
+    def test_hash_file_mmap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.bin")
+            write_file(path, b"x" * 100)
+            with mock.patch.object(asset_copy, "MMAP_THRESHOLD", 10):
+                self.assertEqual(hash_file(path), hashlib.sha256(b"x" * 100).hexdigest())
+
+    def test_hash_files_keeps_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(5):
+                paths.append(os.path.join(tmp, f"{i}.bin"))
+                write_file(paths[-1], bytes([i]))
+            self.assertEqual(
+                hash_files(paths),
+                [hashlib.sha256(bytes([i])).hexdigest() for i in range(5)],
+            )
+
+
+class TestDedupeCopy(unittest.TestCase):
+    def test_list_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src")
+            write_file(os.path.join(src, "b.txt"), b"b")
+            write_file(os.path.join(src, "img", "a.png"), b"a")
+            dirs, files = list_files(src, "out")
+            self.assertEqual(dirs, [os.path.join("out", "img")])
+            self.assertEqual(files, [
+                (os.path.join(src, "b.txt"), os.path.join("out", "b.txt")),
+                (os.path.join(src, "img", "a.png"), os.path.join("out", "img", "a.png")),
+            ])
+
+    def test_dedupe_copy_links_duplicates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src")
+            dst = os.path.join(tmp, "dst")
+            write_file(os.path.join(src, "a.png"), b"same" * 10)
+            write_file(os.path.join(src, "copies", "b.png"), b"same" * 10)
+            write_file(os.path.join(src, "c.css"), b"body{}")
+            os.mkdir(dst)
+
+            stats = dedupe_copy(src, dst)
+
+            self.assertEqual(stats.files, 3)
+            self.assertEqual(stats.unique, 2)
+            self.assertEqual(stats.bytes_total, 86)
+            self.assertEqual(stats.bytes_saved, 40)
+            a = os.stat(os.path.join(dst, "a.png"))
+            b = os.stat(os.path.join(dst, "copies", "b.png"))
+            self.assertEqual(a.st_ino, b.st_ino)
+            # The source tree is never linked into the output
+            self.assertNotEqual(a.st_ino, os.stat(os.path.join(src, "a.png")).st_ino)
+            with open(os.path.join(dst, "c.css"), "rb") as f:
+                self.assertEqual(f.read(), b"body{}")
+
+    def test_dedupe_copy_falls_back_to_copy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src")
+            dst = os.path.join(tmp, "dst")
+            write_file(os.path.join(src, "a.png"), b"same")
+            write_file(os.path.join(src, "b.png"), b"same")
+            os.mkdir(dst)
+
+            with mock.patch("os.link", side_effect=OSError("cross-device link")):
+                stats = dedupe_copy(src, dst)
+
+            self.assertEqual(stats.bytes_saved, 0)
+            with open(os.path.join(dst, "b.png"), "rb") as f:
+                self.assertEqual(f.read(), b"same")
+
+
+
+class TestCopyTree(unittest.TestCase):
+    def test_copy_tree(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "static")
+            dst = os.path.join(tmp, "docs")
+            write_file(os.path.join(src, "index.css"), b"body {}")
+            write_file(os.path.join(src, "images", "deep", "tom.png"), b"png" * 1000)
+            os.mkdir(dst)
+            report = copy_tree(src, dst, workers=2)
+            self.assertEqual(report.files, 2)
+            self.assertEqual(report.bytes, 3007)
+            with open(os.path.join(dst, "images", "deep", "tom.png"), "rb") as f:
+                self.assertEqual(f.read(), b"png" * 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
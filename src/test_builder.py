@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import builder
+from builder import Site
+from testutil import SiteTestCase, touch_file, write_file
+
+
+class TestSiteBuild(SiteTestCase):
+    def test_first_build(self):
+        write_file(self.path("docs", "stale.html"), "old")
+        site = Site.from_project(self.root, basepath="/repo/")
+        result = site.build()
+
+        self.assertTrue(result.ok)
+        self.assertEqual(sorted(result.pages_written), [
+            self.path("docs", "blog", "tom", "index.html"),
+            self.path("docs", "index.html"),
+        ])
+        self.assertEqual(len(result.assets_copied), 2)
+        self.assertEqual(set(result.timings), {"static", "pages", "total"})
+        self.assertFalse(os.path.exists(self.path("docs", "stale.html")))
+        self.assertIn('<a href="/repo/blog/tom">Tom</a>', self.read("docs", "index.html"))
+        self.assertEqual(self.read("docs", "images", "tom.png"), "png")
+
+    def test_rebuild_only_renders_changed_pages(self):
+        site = Site.from_project(self.root)
+        site.build()
+
+        with mock.patch.object(builder, "render_page", wraps=builder.render_page) as render:
+            result = site.build()
+            self.assertEqual(render.call_count, 0)
+            self.assertEqual(result.pages_written, [])
+            self.assertEqual(len(result.pages_skipped), 2)
+            self.assertEqual(result.assets_copied, [])
+
+            touch_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nChanged")
+            result = site.build()
+            self.assertEqual(render.call_count, 1)
+            self.assertEqual(result.pages_written, [self.path("docs", "blog", "tom", "index.html")])
+        self.assertIn("Changed", self.read("docs", "blog", "tom", "index.html"))
+
+    def test_reused_pages_keep_their_highlighted_snippets(self):
+        write_file(self.path("content", "index.md"), "# Home\n\n```python\nx = 1\n```")
+        write_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\n```python\ny = 2\n```")
+        site = Site.from_project(self.root)
+        site.build()
+        touch_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\n```python\ny = 3\n```")
+        site.build()
+        with open(self.path(".cache", "highlight.json"), encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_minify_cache_keeps_reused_outputs(self):
+        site = Site.from_project(self.root, minify=True)
+        site.build()
+        with open(self.path(".cache", "minify.json"), encoding="utf-8") as f:
+            entries = json.load(f)
+        touch_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nChanged")
+        site.build()
+        site.build()
+        with open(self.path(".cache", "minify.json"), encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), len(entries))
+
+    def test_template_change_rerenders_everything(self):
+        site = Site.from_project(self.root)
+        site.build()
+        touch_file(self.path("template.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+        result = site.build()
+        self.assertEqual(len(result.pages_written), 2)
+        self.assertTrue(self.read("docs", "index.html").startswith("<h2>Home</h2>"))
+
+    def test_layouts(self):
+        write_file(self.path("layouts", "post.html"),
+               '<h2>{{ Title }}</h2>{% include "partials/by.html" %}{{ Content }}')
+        write_file(self.path("partials", "by.html"), "by {{ author }}")
+        write_file(self.path("content", "blog", "tom", "index.md"),
+               "---\nlayout: post\nauthor: Tom\n---\n# Tom\n\nBombadil")
+        site = Site.from_project(self.root)
+        self.assertTrue(site.build().ok)
+        self.assertTrue(self.read("docs", "blog", "tom", "index.html").startswith("<h2>Tom</h2>by Tom<div>"))
+        self.assertTrue(self.read("docs", "index.html").startswith("<title>Home</title>"))
+
+        # Editing a partial only re-renders the pages whose layout uses it
+        touch_file(self.path("partials", "by.html"), "written by {{ author }}")
+        result = site.build()
+        self.assertEqual(result.pages_written, [self.path("docs", "blog", "tom", "index.html")])
+        self.assertIn("written by Tom", self.read("docs", "blog", "tom", "index.html"))
+
+    def test_missing_layout(self):
+        write_file(self.path("content", "contact.md"), "---\nlayout: nope\n---\n# Contact")
+        result = Site.from_project(self.root).build()
+        self.assertEqual(result.errors, [(self.path("content", "contact.md"),
+                                          "Template not found: layouts/nope.html")])
+
+    def test_removed_page_and_asset(self):
+        site = Site.from_project(self.root)
+        site.build()
+        os.remove(self.path("content", "blog", "tom", "index.md"))
+        os.remove(self.path("static", "images", "tom.png"))
+        result = site.build()
+        self.assertEqual(result.pages_removed, [self.path("docs", "blog", "tom", "index.html")])
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "tom", "index.html")))
+        self.assertFalse(os.path.exists(self.path("docs", "images", "tom.png")))
+
+    def test_changed_asset_is_copied(self):
+        site = Site.from_project(self.root)
+        site.build()
+        touch_file(self.path("static", "index.css"), "body { color: red }")
+        result = site.build()
+        self.assertEqual(result.assets_copied, [self.path("docs", "index.css")])
+        self.assertEqual(result.pages_written, [])
+        self.assertEqual(self.read("docs", "index.css"), "body { color: red }")
+
+    def test_removed_output_dir_is_rebuilt(self):
+        site = Site.from_project(self.root)
+        site.build()
+        shutil.rmtree(self.path("docs"))
+        result = site.build()
+        self.assertEqual(len(result.assets_copied), 2)
+        self.assertEqual(len(result.pages_written), 2)
+        self.assertEqual(self.read("docs", "index.css"), "body {}")
+        self.assertEqual(self.read("docs", "images", "tom.png"), "png")
+        self.assertEqual(site.build().assets_copied, [])
+
+    def test_errors_are_collected(self):
+        write_file(self.path("content", "broken.md"), "no title here")
+        result = Site.from_project(self.root).build()
+        self.assertFalse(result.ok)
+        self.assertEqual(result.errors, [(self.path("content", "broken.md"), "No h1 header found in markdown")])
+        self.assertEqual(len(result.pages_written), 2)
+
+    def test_selective_build(self):
+        site = Site.from_project(self.root)
+        site.build()
+        touch_file(self.path("content", "index.md"), "# Changed home")
+        touch_file(self.path("content", "blog", "tom", "index.md"), "# Changed Tom")
+        result = site.build(only=["blog/**"])
+        self.assertEqual(result.pages_written, [self.path("docs", "blog", "tom", "index.html")])
+        self.assertNotIn("Changed home", self.read("docs", "index.html"))
+
+    def test_fingerprint_mode(self):
+        site = Site.from_project(self.root, copy_mode="fingerprint")
+        site.build()
+        css = site.asset_manifest.mapping["/index.css"]
+        self.assertIn(f'href="{css}"', self.read("docs", "index.html"))
+
+        touch_file(self.path("static", "index.css"), "body { color: red }")
+        site.build()
+        self.assertNotEqual(site.asset_manifest.mapping["/index.css"], css)
+        self.assertIn(site.asset_manifest.mapping["/index.css"], self.read("docs", "index.html"))
+
+    def test_invalid_copy_mode(self):
+        with self.assertRaises(ValueError):
+            Site.from_project(self.root, copy_mode="rsync")
+
+
+class TestMirrors(SiteTestCase):
+    def make_site(self, **kwargs):
+        return Site.from_project(
+            self.root, basepath="/repo/",
+            mirrors=[("/", self.path("preview")), ("/staging/", self.path("staging"))], **kwargs
+        )
+
+    def test_pages_are_rendered_once_for_every_basepath(self):
+        site = self.make_site(search_index=True)
+        with mock.patch.object(builder, "render_page", wraps=builder.render_page) as render:
+            result = site.build()
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(len(result.pages_written), 2)
+
+        for output, basepath in (("docs", "/repo/"), ("preview", "/"), ("staging", "/staging/")):
+            html = self.read(output, "index.html")
+            self.assertIn(f'<a href="{basepath}blog/tom">Tom</a>', html)
+            self.assertIn(f'<link href="{basepath}index.css">', html)
+            self.assertEqual(self.read(output, "images", "tom.png"), "png")
+            self.assertIn(f'"{basepath}blog/tom/"', self.read(output, "search", "pages.json"))
+
+    def test_changes_reach_every_mirror(self):
+        site = self.make_site()
+        site.build()
+        touch_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nChanged")
+        touch_file(self.path("static", "index.css"), "main {}")
+        os.remove(self.path("static", "images", "tom.png"))
+        os.remove(self.path("content", "index.md"))
+        result = site.build()
+
+        self.assertEqual(result.pages_written, [self.path("docs", "blog", "tom", "index.html")])
+        self.assertEqual(result.pages_removed, [self.path("docs", "index.html")])
+        for output in ("docs", "preview", "staging"):
+            self.assertIn("Changed", self.read(output, "blog", "tom", "index.html"))
+            self.assertEqual(self.read(output, "index.css"), "main {}")
+            self.assertFalse(os.path.exists(self.path(output, "images", "tom.png")))
+            self.assertFalse(os.path.exists(self.path(output, "index.html")))
+
+    def test_atomic_mirrors_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.make_site(atomic=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
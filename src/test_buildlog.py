@@ -0,0 +1,95 @@
+import io
+import json
+import unittest
+
+from buildlog import NORMAL, QUIET, VERBOSE, BuildLog, as_build_log
+from builder import Site
+from testutil import SiteTestCase
+
+
+class TestBuildLog(unittest.TestCase):
+    def make_log(self, level, **kwargs):
+        self.blocks = []
+        return BuildLog(level, write=self.blocks.append, interactive=False, **kwargs)
+
+    def log_all(self, log):
+        log("detail")
+        log.info("summary")
+        log.error("failure")
+        log.flush()
+        return "\n".join(self.blocks).split("\n")
+
+    def test_levels(self):
+        self.assertEqual(self.log_all(self.make_log(QUIET)), ["failure"])
+        self.assertEqual(self.log_all(self.make_log(NORMAL)), ["summary", "failure"])
+        self.assertEqual(self.log_all(self.make_log(VERBOSE)), ["detail", "summary", "failure"])
+
+    def test_output_is_buffered(self):
+        log = self.make_log(VERBOSE)
+        for i in range(100):
+            log(f"page {i}")
+        self.assertEqual(self.blocks, [])
+        log.flush()
+        self.assertEqual(len(self.blocks), 1)
+        self.assertEqual(self.blocks[0].split("\n")[-1], "page 99")
+
+    def test_buffer_is_written_when_full(self):
+        log = self.make_log(VERBOSE, buffer_size=20)
+        for i in range(10):
+            log(f"page {i}")
+        # Six characters per message: written out every fourth
+        self.assertEqual(len(self.blocks), 2)
+
+    def test_error_flushes(self):
+        log = self.make_log(VERBOSE)
+        log("detail")
+        log.error("failure")
+        self.assertEqual(self.blocks, ["detail\nfailure"])
+
+    def test_events(self):
+        events = io.StringIO()
+        log = self.make_log(QUIET, events=events)
+        log.event("page_finished", path="index.md", bytes=12)
+        record = json.loads(events.getvalue())
+        self.assertEqual(record["event"], "page_finished")
+        self.assertEqual(record["bytes"], 12)
+        self.assertIn("time", record)
+        self.assertEqual(self.blocks, [])
+
+    def test_as_build_log_passes_every_message(self):
+        messages = []
+        log = as_build_log(messages.append)
+        log("detail")
+        log.info("summary")
+        self.assertEqual(messages, ["detail", "summary"])
+        self.assertIs(as_build_log(log), log)
+
+
+class TestSiteEvents(SiteTestCase):
+    def test_page_events(self):
+        events = io.StringIO()
+        events.close = lambda: None
+        log = BuildLog(QUIET, write=lambda text: None, events=events, interactive=False)
+        site = Site.from_project(self.root, log=log)
+        site.build()
+        site.build()
+        records = [json.loads(line) for line in events.getvalue().splitlines()]
+
+        kinds = [record["event"] for record in records]
+        self.assertEqual(kinds.count("build_started"), 2)
+        self.assertEqual(kinds.count("build_finished"), 2)
+        finished = [record for record in records if record["event"] == "page_finished"]
+        self.assertEqual([record["status"] for record in finished],
+                         ["written", "written", "unchanged", "unchanged"])
+        self.assertEqual({record["path"] for record in finished}, {"index.md", "blog/tom/index.md"})
+        self.assertTrue(all(record["bytes"] > 0 for record in finished))
+
+    def test_quiet_build_prints_nothing(self):
+        blocks = []
+        log = BuildLog(QUIET, write=blocks.append, interactive=False)
+        Site.from_project(self.root, log=log).build()
+        self.assertEqual(blocks, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import changes
+from builder import Site
+from changes import ChangeSet, OutputManifest
+from main import create_site, parse_args, run_build
+from testutil import SiteTestCase, write_file
+
+
+class TestOutputManifest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_diff(self):
+        write_file(os.path.join(self.root, "a.html"), "a")
+        write_file(os.path.join(self.root, "b", "index.html"), "b")
+        before = OutputManifest.scan(self.root)
+        write_file(os.path.join(self.root, "a.html"), "a2")
+        os.remove(os.path.join(self.root, "b", "index.html"))
+        write_file(os.path.join(self.root, "c.css"), "c")
+        after = OutputManifest.scan(self.root, before)
+
+        diff = after.diff(before)
+        self.assertEqual(diff.added, ["c.css"])
+        self.assertEqual(diff.changed, ["a.html"])
+        self.assertEqual(diff.removed, ["b/index.html"])
+
+    def test_unchanged_files_are_not_hashed_again(self):
+        write_file(os.path.join(self.root, "a.html"), "a")
+        write_file(os.path.join(self.root, "b.html"), "b")
+        before = OutputManifest.scan(self.root)
+        write_file(os.path.join(self.root, "b.html"), "bb")
+        with mock.patch.object(changes, "hash_files", wraps=changes.hash_files) as hash_files:
+            after = OutputManifest.scan(self.root, before)
+        hash_files.assert_called_once_with([os.path.join(self.root, "b.html")])
+        self.assertEqual(after.files["a.html"], before.files["a.html"])
+
+    def test_rewritten_with_same_content_is_unchanged(self):
+        path = os.path.join(self.root, "a.html")
+        write_file(path, "a")
+        before = OutputManifest.scan(self.root)
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(OutputManifest.scan(self.root, before).diff(before))
+
+    def test_save_and_load(self):
+        write_file(os.path.join(self.root, "a.html"), "a")
+        manifest = OutputManifest.scan(self.root)
+        path = os.path.join(self.root, "state", "outputs.json")
+        manifest.save(path)
+        self.assertEqual(OutputManifest.load(path).files, manifest.files)
+        self.assertEqual(OutputManifest.load(path + ".missing").files, {})
+
+
+class TestChangeSet(unittest.TestCase):
+    def test_urls(self):
+        change_set = ChangeSet(added=["blog/index.html"], changed=["index.css"],
+                               removed=["index.html"])
+        self.assertEqual(change_set.urls("/repo/"), [
+            "/repo/", "/repo/blog/", "/repo/blog/index.html", "/repo/index.css",
+            "/repo/index.html",
+        ])
+
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "deploy", "changes.json")
+            ChangeSet(changed=["a.html"]).write(path, "/repo/")
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(data["changed"], ["a.html"])
+        self.assertEqual(data["removed"], [])
+        self.assertEqual(data["urls"], ["/repo/a.html"])
+
+
+class TestSiteChanges(SiteTestCase):
+    def test_first_build_adds_everything(self):
+        result = Site.from_project(self.root, track_changes=True).build()
+        self.assertEqual(result.changes.added, [
+            "blog/tom/index.html", "images/tom.png", "index.css", "index.html",
+        ])
+        self.assertIn("changes", result.timings)
+
+    def test_new_process_compares_with_previous_build(self):
+        Site.from_project(self.root, track_changes=True).build()
+        # Rewrites every file, but only one has new content
+        write_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nGoldberry")
+        result = Site.from_project(self.root, track_changes=True).build()
+        self.assertEqual(result.changes.changed, ["blog/tom/index.html"])
+        self.assertEqual(result.changes.added, [])
+        self.assertEqual(result.changes.removed, [])
+
+    def test_renamed_page_is_pruned(self):
+        site = Site.from_project(self.root, track_changes=True)
+        site.build()
+        os.rename(self.path("content", "blog", "tom"), self.path("content", "blog", "bombadil"))
+        result = site.build()
+        self.assertEqual(result.changes.added, ["blog/bombadil/index.html"])
+        self.assertEqual(result.changes.removed, ["blog/tom/index.html"])
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "tom")))
+
+    def test_orphaned_html_is_pruned(self):
+        site = Site.from_project(self.root, track_changes=True, mirrors=[("/", self.path("preview"))])
+        site.build()
+        write_file(self.path("docs", "old", "page.html"), "stale")
+        write_file(self.path("preview", "old", "page.html"), "stale")
+        write_file(self.path("docs", "notes.txt"), "kept")
+        result = site.build()
+        self.assertEqual(result.pages_removed, [self.path("docs", "old", "page.html")])
+        self.assertFalse(os.path.exists(self.path("docs", "old")))
+        self.assertFalse(os.path.exists(self.path("preview", "old")))
+        self.assertTrue(os.path.exists(self.path("docs", "notes.txt")))
+        self.assertEqual(result.changes.added, ["notes.txt"])
+
+    def test_static_html_is_not_an_orphan(self):
+        write_file(self.path("static", "about.html"), "<p>About</p>")
+        for copy_mode in ("copy", "fingerprint"):
+            site = Site.from_project(self.root, track_changes=True, copy_mode=copy_mode)
+            site.build()
+            result = site.build()
+            self.assertEqual(result.pages_removed, [], copy_mode)
+
+    def test_failed_atomic_build_reports_nothing(self):
+        site = Site.from_project(self.root, track_changes=True, atomic=True)
+        site.build()
+        write_file(self.path("content", "broken.md"), "No title")
+        result = site.build()
+        self.assertIsNone(result.changes)
+        os.remove(self.path("content", "broken.md"))
+        write_file(self.path("content", "index.md"), "# Home again")
+        result = site.build()
+        self.assertEqual(result.changes.changed, ["index.html"])
+
+    def test_command_line_writes_changes_file(self):
+        changes_path = self.path("deploy", "changes.json")
+        args = parse_args(["/repo/", "--changes", changes_path])
+        messages = []
+        self.assertEqual(run_build(create_site(args, self.root), args, messages.append), 0)
+        with open(changes_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertIn("/repo/blog/tom/", data["urls"])
+        self.assertIn("Outputs: 4 added, 0 changed, 0 removed; written to " + changes_path,
+                      messages)
+
+    def test_untracked_by_default(self):
+        self.assertIsNone(Site.from_project(self.root).build().changes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+import build_client
+from daemon import BuildDaemon
+from testutil import write_file
+
+
+class TestBuildDaemon(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        write_file(os.path.join(self.root, "content", "index.md"), "# Home\n\nHello")
+        write_file(os.path.join(self.root, "content", "blog", "index.md"), "# Blog\n\nPosts")
+        write_file(os.path.join(self.root, "static", "index.css"), "body {}")
+        write_file(os.path.join(self.root, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        self.watched = os.path.join(self.root, "watched.py")
+        write_file(self.watched, "")
+
+        self.socket_path = os.path.join(self.root, "run", "daemon.sock")
+        self.server = BuildDaemon(self.socket_path, watch_paths=[self.watched])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self._tmp.cleanup()
+
+    def build(self, *argv):
+        out = io.StringIO()
+        status = build_client.build(["--project-dir", self.root, *argv], self.socket_path, out)
+        return status, out.getvalue()
+
+    def test_builds_stay_warm(self):
+        status, output = self.build()
+        self.assertEqual(status, 0)
+        self.assertIn("Pages: 2 written, 0 unchanged", output)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, "docs", "blog", "index.html")))
+
+        status, output = self.build()
+        self.assertEqual(status, 0)
+        self.assertIn("Pages: 0 written, 2 unchanged", output)
+        self.assertEqual(len(self.server.sites), 1)
+
+        # Different options get their own site
+        self.build("/repo/")
+        self.assertEqual(len(self.server.sites), 2)
+        ping = build_client.send_request(self.socket_path, {"command": "ping"})
+        self.assertEqual(ping["builds"], 3)
+
+    def test_build_errors(self):
+        write_file(os.path.join(self.root, "content", "broken.md"), "no title")
+        status, output = self.build()
+        self.assertEqual(status, 1)
+        self.assertIn("No h1 header found", output)
+
+    def test_invalid_arguments(self):
+        status, output = self.build("--copy-mode", "rsync")
+        self.assertEqual(status, 2)
+        self.assertIn("invalid choice", output)
+
+    def test_stale_daemon_asks_for_fallback(self):
+        st = os.stat(self.watched)
+        os.utime(self.watched, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertIsNone(self.build()[0])
+        self.thread.join(timeout=5)
+        self.assertFalse(self.thread.is_alive())
+
+    def test_stop(self):
+        self.assertEqual(build_client.send_request(self.socket_path, {"command": "stop"}), {"status": 0})
+        self.thread.join(timeout=5)
+        self.assertFalse(self.thread.is_alive())
+
+    def test_second_daemon_refused(self):
+        with self.assertRaises(RuntimeError):
+            BuildDaemon(self.socket_path)
+
+    def test_no_daemon(self):
+        missing = os.path.join(self.root, "missing.sock")
+        self.assertIsNone(build_client.build([], missing, io.StringIO()))
+
+
+if __name__ == "__main__":
+    unittest.main()
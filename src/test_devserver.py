@@ -0,0 +1,181 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from devserver import DevServer, PageCache
+from testutil import TEMPLATE, write_file
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class DevServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        self.content_dir = os.path.join(root, "content")
+        self.static_dir = os.path.join(root, "static")
+        self.template_path = os.path.join(root, "template.html")
+        self.include_dir = os.path.join(root, "includes")
+        write_file(os.path.join(self.content_dir, "index.md"), "# Home\n\nWelcome")
+        write_file(os.path.join(self.content_dir, "blog", "tom", "index.md"), "# Tom\n\nBombadil")
+        write_file(os.path.join(self.content_dir, "about.md"), "# About\n\nUs")
+        write_file(os.path.join(self.static_dir, "index.css"), "body{}")
+        write_file(self.template_path, TEMPLATE)
+        write_file(os.path.join(self.include_dir, "bio.md"), "Tom is a *bio*.")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+
+class TestPageCache(DevServerTestCase):
+    def test_source_for(self):
+        cache = PageCache(self.content_dir, self.template_path)
+        tom = os.path.join(self.content_dir, "blog", "tom", "index.md")
+        self.assertEqual(cache.source_for("/"), os.path.join(self.content_dir, "index.md"))
+        self.assertEqual(cache.source_for("/blog/tom"), tom)
+        self.assertEqual(cache.source_for("/blog/tom/"), tom)
+        self.assertEqual(cache.source_for("/blog/tom/index.html"), tom)
+        self.assertEqual(cache.source_for("/about.html"), os.path.join(self.content_dir, "about.md"))
+        self.assertIsNone(cache.source_for("/index.css"))
+        self.assertIsNone(cache.source_for("/../template.html"))
+
+    def test_get_renders_once_until_changed(self):
+        cache = PageCache(self.content_dir, self.template_path)
+        md_path = os.path.join(self.content_dir, "index.md")
+        page = cache.get(md_path)
+        self.assertIn(b'<h1 id="home">Home</h1>', page.body)
+        self.assertIs(cache.get(md_path), page)
+        self.assertEqual(cache.renders, 1)
+
+        write_file(md_path, "# Home\n\nChanged")
+        _bump_mtime(md_path)
+        self.assertIn(b"Changed", cache.get(md_path).body)
+        self.assertEqual(cache.renders, 2)
+
+        _bump_mtime(self.template_path)
+        cache.get(md_path)
+        self.assertEqual(cache.renders, 3)
+
+    def test_get_evicts_least_recently_used(self):
+        cache = PageCache(self.content_dir, self.template_path, max_size=1)
+        home = os.path.join(self.content_dir, "index.md")
+        about = os.path.join(self.content_dir, "about.md")
+        cache.get(home)
+        cache.get(about)
+        cache.get(home)
+        self.assertEqual(cache.renders, 3)
+
+    def test_wiki_links_follow_their_targets(self):
+        cache = PageCache(self.content_dir, self.template_path)
+        about = os.path.join(self.content_dir, "about.md")
+        write_file(about, "# About\n\nSee [[Tom]].")
+        self.assertIn(b'See <a href="/blog/tom/">Tom</a>.', cache.get(about).body)
+        cache.get(about)
+        self.assertEqual(cache.renders, 1)
+
+        write_file(os.path.join(self.content_dir, "blog", "tom", "index.md"), "# Tom Bombadil")
+        self.assertIn(b"See Tom.", cache.get(about).body)
+        self.assertEqual(cache.renders, 2)
+
+    def test_includes_are_sources(self):
+        cache = PageCache(self.content_dir, self.template_path, include_dir=self.include_dir)
+        about = os.path.join(self.content_dir, "about.md")
+        bio = os.path.join(self.include_dir, "bio.md")
+        write_file(about, '# About\n\n{% include "bio.md" %}')
+        page = cache.get(about)
+        self.assertIn(b"<p>Tom is a <i>bio</i>.</p>", page.body)
+        self.assertEqual(page.sources[bio], os.stat(bio).st_mtime_ns)
+        self.assertIs(cache.get(about), page)
+
+
+class TestDevServer(DevServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = DevServer(
+            ("127.0.0.1", 0), self.content_dir, self.static_dir, self.template_path,
+            include_dir=self.include_dir,
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def _get(self, path, headers=None):
+        request = urllib.request.Request(self.base + path, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_lazy_rendering(self):
+        self.assertEqual(self.server.pages.renders, 0)
+        status, headers, body = self._get("/blog/tom")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "text/html; charset=utf-8")
+        self.assertIn(b'<h1 id="tom">Tom</h1>', body)
+        self.assertEqual(self.server.pages.renders, 1)
+
+    def test_wiki_links(self):
+        write_file(os.path.join(self.content_dir, "about.md"), "# About\n\n[[Tom]] and [[Home|home]]")
+        status, _, body = self._get("/about.html")
+        self.assertEqual(status, 200)
+        self.assertIn(b'<a href="/blog/tom/">Tom</a> and <a href="/">home</a>', body)
+
+    def test_editing_include_shows_on_next_request(self):
+        bio = os.path.join(self.include_dir, "bio.md")
+        write_file(os.path.join(self.content_dir, "about.md"), '# About\n\n{% include "bio.md" %}')
+        status, headers, body = self._get("/about.html")
+        self.assertEqual(status, 200)
+        self.assertIn(b"<p>Tom is a <i>bio</i>.</p>", body)
+
+        write_file(bio, "Tom is merry.")
+        _bump_mtime(bio)
+        status, _, body = self._get("/about.html", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 200)
+        self.assertIn(b"<p>Tom is merry.</p>", body)
+        self.assertEqual(self.server.pages.renders, 2)
+
+    def test_page_etag_not_modified(self):
+        status, headers, _ = self._get("/")
+        self.assertEqual(status, 200)
+        status, _, body = self._get("/", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+        status, _, _ = self._get("/", {"If-Modified-Since": headers["Last-Modified"]})
+        self.assertEqual(status, 304)
+
+    def test_static_file(self):
+        status, headers, body = self._get("/index.css")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "text/css")
+        self.assertEqual(body, b"body{}")
+        status, _, _ = self._get("/index.css", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+
+    def test_not_found(self):
+        status, _, _ = self._get("/missing.png")
+        self.assertEqual(status, 404)
+
+    def test_head_error_has_no_body(self):
+        with socket.create_connection(self.server.server_address) as sock:
+            sock.sendall(b"HEAD /missing.png HTTP/1.0\r\n\r\n")
+            response = sock.makefile("rb").read()
+        self.assertTrue(response.startswith(b"HTTP/1.0 404 "))
+        self.assertTrue(response.endswith(b"\r\n\r\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import errno
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import fastcopy
+from fastcopy import copy_file, copy_files
+from testutil import write_file
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _unsupported(*args):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+class TestCopyFile(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, "src.bin")
+        self.dst = os.path.join(self._tmp.name, "dst.bin")
+        self.data = os.urandom(300_000)
+        write_file(self.src, self.data)
+        # Deterministic regardless of the filesystem the tests run on
+        patcher = mock.patch.object(fastcopy, "_reflink", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_copy(self):
+        os.chmod(self.src, 0o755)
+        write_file(self.dst, b"old content that is longer than nothing" * 10000)
+        method = copy_file(self.src, self.dst)
+        self.assertIn(method, ("copy_file_range", "sendfile", "userspace"))
+        self.assertEqual(_read(self.dst), self.data)
+        # Permission bits are not copied
+        self.assertFalse(os.stat(self.dst).st_mode & 0o100)
+
+    def test_empty_file(self):
+        write_file(self.src, b"")
+        copy_file(self.src, self.dst)
+        self.assertEqual(_read(self.dst), b"")
+
+    @unittest.skipUnless(hasattr(os, "sendfile"), "needs os.sendfile")
+    def test_falls_back_to_sendfile(self):
+        with mock.patch.object(os, "copy_file_range", _unsupported, create=True):
+            self.assertEqual(copy_file(self.src, self.dst), "sendfile")
+        self.assertEqual(_read(self.dst), self.data)
+
+    def test_falls_back_to_userspace(self):
+        with mock.patch.object(os, "copy_file_range", _unsupported, create=True), \
+                mock.patch.object(os, "sendfile", _unsupported, create=True):
+            self.assertEqual(copy_file(self.src, self.dst), "userspace")
+        self.assertEqual(_read(self.dst), self.data)
+
+    def test_kernel_copy_copying_nothing_falls_back(self):
+        with mock.patch.object(os, "copy_file_range", return_value=0, create=True), \
+                mock.patch.object(os, "sendfile", return_value=0, create=True):
+            self.assertEqual(copy_file(self.src, self.dst), "userspace")
+        self.assertEqual(_read(self.dst), self.data)
+
+    def test_io_errors_are_raised(self):
+        def failing(*args):
+            raise OSError(errno.EIO, "Input/output error")
+
+        with mock.patch.object(os, "copy_file_range", failing, create=True):
+            with self.assertRaises(OSError):
+                copy_file(self.src, self.dst)
+
+    def test_reflink(self):
+        with mock.patch.object(fastcopy, "_reflink", return_value=True):
+            self.assertEqual(copy_file(self.src, self.dst), "reflink")
+
+    def test_drops_large_files_from_page_cache(self):
+        with mock.patch.object(fastcopy, "FADVISE_THRESHOLD", 1000), \
+                mock.patch.object(fastcopy, "_drop_from_page_cache") as drop:
+            copy_file(self.src, self.dst)
+        self.assertEqual(drop.call_count, 2)
+
+
+class TestCopyFiles(unittest.TestCase):
+    def test_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pairs = []
+            for i in range(6):
+                src = os.path.join(tmp, "src", f"{i}.bin")
+                write_file(src, bytes(i * 100))
+                pairs.append((src, os.path.join(tmp, f"{i}.bin")))
+            messages = []
+            report = copy_files(pairs, workers=3, log=messages.append)
+            self.assertEqual(report.files, 6)
+            self.assertEqual(report.bytes, sum(i * 100 for i in range(6)))
+            self.assertEqual(sum(report.methods.values()), 6)
+            self.assertEqual(len(messages), 6)
+            self.assertIn("Copied 6 files", report.summary())
+            for src, dst in pairs:
+                self.assertEqual(_read(src), _read(dst))
+
+    def test_bounded_concurrency(self):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_copy(src, dst):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return "userspace"
+
+        with mock.patch.object(fastcopy, "copy_file", slow_copy), \
+                mock.patch.object(os.path, "getsize", return_value=1):
+            report = copy_files([(f"s{i}", f"d{i}") for i in range(12)], workers=2)
+        self.assertEqual(report.files, 12)
+        self.assertEqual(peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+from fingerprint import AssetManifest, copy_fingerprinted, fingerprint_name
+from testutil import write_file
+
+
+class TestFingerprintName(unittest.TestCase):
+    def test_fingerprint_name(self):
+        self.assertEqual(fingerprint_name("index.css", "3fa2c1d4abcdef"), "index.3fa2c1d4.css")
+
+    def test_fingerprint_name_nested(self):
+        self.assertEqual(
+            fingerprint_name("images/tom.png", "0123456789", length=6),
+            "images/tom.012345.png",
+        )
+
+    def test_fingerprint_name_no_extension(self):
+        self.assertEqual(fingerprint_name("LICENSE", "abcdef0123"), "LICENSE.abcdef01")
+
+
+class TestAssetManifest(unittest.TestCase):
+    def test_rewrite_known_references(self):
+        manifest = AssetManifest({
+            "/index.css": "/index.abc.css",
+            "/images/tom.png": "/images/tom.def.png",
+        })
+        html = (
+            '<link href="/index.css" rel="stylesheet" />'
+            '<img src="/images/tom.png" alt="Tom">'
+            '<a href="/blog/tom">Tom</a>'
+        )
+        self.assertEqual(
+            manifest.rewrite(html),
+            '<link href="/index.abc.css" rel="stylesheet" />'
+            '<img src="/images/tom.def.png" alt="Tom">'
+            '<a href="/blog/tom">Tom</a>',
+        )
+
+    def test_rewrite_keeps_query_and_fragment(self):
+        manifest = AssetManifest({"/index.css": "/index.abc.css"})
+        self.assertEqual(
+            manifest.rewrite('<link href="/index.css?v=2">'),
+            '<link href="/index.abc.css?v=2">',
+        )
+
+    def test_rewrite_ignores_external_urls(self):
+        manifest = AssetManifest({"/index.css": "/index.abc.css"})
+        html = '<a href="https://example.com/index.css">x</a>'
+        self.assertEqual(manifest.rewrite(html), html)
+
+
+class TestCopyFingerprinted(unittest.TestCase):
+    def test_copy_fingerprinted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "static")
+            write_file(os.path.join(src, "index.css"), b"body{}")
+            write_file(os.path.join(src, "images", "tom.png"), b"png")
+            cache_path = os.path.join(tmp, "cache", "assets.json")
+
+            dst = os.path.join(tmp, "docs")
+            os.mkdir(dst)
+            manifest, hashed = copy_fingerprinted(src, dst, cache_path)
+            self.assertEqual(hashed, 2)
+
+            css = manifest.mapping["/index.css"]
+            self.assertRegex(css, r"^/index\.[0-9a-f]{8}\.css$")
+            self.assertTrue(os.path.isfile(os.path.join(dst, css[1:])))
+            with open(os.path.join(dst, "asset-manifest.json")) as f:
+                self.assertEqual(json.load(f), manifest.mapping)
+
+            # Only the touched file is hashed again on the next build
+            write_file(os.path.join(src, "index.css"), b"body{color:red}")
+            dst = os.path.join(tmp, "docs2")
+            os.mkdir(dst)
+            manifest2, hashed = copy_fingerprinted(src, dst, cache_path)
+            self.assertEqual(hashed, 1)
+            self.assertNotEqual(manifest2.mapping["/index.css"], css)
+            self.assertEqual(
+                manifest2.mapping["/images/tom.png"],
+                manifest.mapping["/images/tom.png"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import io
+import unittest
+
+from frontmatter import read_front_matter, split_front_matter
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_front_matter(self):
+        markdown = "---\ndate: 2024-05-01\nLayout: post\n---\n# Title\n\nText"
+        self.assertEqual(
+            split_front_matter(markdown),
+            ({"date": "2024-05-01", "layout": "post"}, "# Title\n\nText"),
+        )
+
+    def test_value_with_colon(self):
+        metadata, _ = split_front_matter("---\ntime: 10:30\n---\n")
+        self.assertEqual(metadata, {"time": "10:30"})
+
+    def test_no_front_matter(self):
+        for markdown in ("# Title\n\n---\nnot: front matter\n---", "----\n# Title", ""):
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_unclosed(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ndate: 2024-05-01\n")
+
+    def test_thematic_break_is_not_front_matter(self):
+        for markdown in ("---\n\nSome text\n\n---\n", "---\njust text\n---\n# Title",
+                         "---\ndate: 2024-05-01\n# Title"):
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+
+class TestReadFrontMatter(unittest.TestCase):
+    def test_matches_split(self):
+        for markdown in ("---\ndate: 2024-05-01\n---\n# Title\n\nText\n", "# Title\n\nText\n", "",
+                         "---\ndate: 2024-05-01\n\nSome text\n---\n"):
+            metadata, lines = read_front_matter(io.StringIO(markdown))
+            self.assertEqual((metadata, "".join(lines)), split_front_matter(markdown))
+
+    def test_unclosed(self):
+        with self.assertRaises(ValueError):
+            read_front_matter(io.StringIO("---\ndate: 2024-05-01\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
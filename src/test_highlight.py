@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from highlight import HighlightCache, highlight, normalize_language
+
+
+class TestNormalizeLanguage(unittest.TestCase):
+    def test_aliases(self):
+        self.assertEqual(normalize_language("py"), "python")
+        self.assertEqual(normalize_language("Bash"), "shell")
+        self.assertEqual(normalize_language("css"), "css")
+
+    def test_unknown(self):
+        self.assertIsNone(normalize_language("cobol"))
+        self.assertIsNone(normalize_language(None))
+
+
+class TestHighlight(unittest.TestCase):
+    def test_python(self):
+        self.assertEqual(
+            highlight('def f(x):  # hi\n    return "a<b"', "python"),
+            '<span class="tok-kw">def</span> <span class="tok-fn">f</span>(x):  '
+            '<span class="tok-com"># hi</span>\n    <span class="tok-kw">return</span> '
+            '<span class="tok-str">"a&lt;b"</span>',
+        )
+
+    def test_python_keywords_inside_strings_and_names(self):
+        self.assertEqual(
+            highlight("define = 'if'", "python"),
+            'define = <span class="tok-str">\'if\'</span>',
+        )
+
+    def test_shell(self):
+        self.assertEqual(
+            highlight('echo "$HOME" $USER # note', "shell"),
+            'echo <span class="tok-str">"$HOME"</span> <span class="tok-var">$USER</span> '
+            '<span class="tok-com"># note</span>',
+        )
+
+    def test_json(self):
+        self.assertEqual(
+            highlight('{"a": [1, true, "x"]}', "json"),
+            '{<span class="tok-key">"a"</span>: [<span class="tok-num">1</span>, '
+            '<span class="tok-lit">true</span>, <span class="tok-str">"x"</span>]}',
+        )
+
+    def test_html(self):
+        self.assertEqual(
+            highlight('<a href="/x">hi</a>', "html"),
+            '<span class="tok-tag">&lt;a</span> <span class="tok-attr">href</span>='
+            '<span class="tok-str">"/x"</span><span class="tok-tag">&gt;</span>hi'
+            '<span class="tok-tag">&lt;/a</span><span class="tok-tag">&gt;</span>',
+        )
+
+    def test_css(self):
+        self.assertEqual(
+            highlight("a:hover { color: #fff; }", "css"),
+            'a:hover { <span class="tok-prop">color</span>: <span class="tok-num">#fff</span>; }',
+        )
+
+
+class TestHighlightCache(unittest.TestCase):
+    def test_cache_hits(self):
+        cache = HighlightCache()
+        first = cache.highlight("x = 1", "python")
+        self.assertEqual(cache.highlight("x = 1", "python"), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.highlight("x = 1", "shell")
+        self.assertEqual(cache.misses, 2)
+
+    def test_save_keeps_what_the_build_used(self):
+        cache = HighlightCache()
+        cache.highlight("x = 1", "python")
+        cache.begin_build()
+        cache.highlight("y = 2", "python")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "highlight.json")
+            cache.save(path)
+            loaded = HighlightCache()
+            loaded.load(path)
+        self.assertEqual(len(cache.entries), 1)
+        self.assertEqual(loaded.entries, cache.entries)
+        loaded.highlight("y = 2", "python")
+        self.assertEqual(loaded.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import includes
+from builder import Site
+from includes import IncludeError, IncludeLoader, PageIncludes
+from inline_markdown import markdown_to_html_node
+from testutil import SiteTestCase, write_file
+
+
+class TestIncludeLoader(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.loader = IncludeLoader(self.root)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, text):
+        write_file(os.path.join(self.root, *name.split("/")), text)
+
+    def render(self, markdown):
+        includes = PageIncludes(self.loader)
+        return markdown_to_html_node(markdown, includes=includes).to_html(), includes
+
+    def test_include_block(self):
+        self.write("bio.md", "## Author\n\nWritten by **Tolkien**.")
+        html, includes = self.render('# Page\n\n{% include "bio.md" %}\n\nThe end.')
+        self.assertEqual(html, '<div><h1 id="page">Page</h1><h2 id="author">Author</h2>'
+                               '<p>Written by <b>Tolkien</b>.</p><p>The end.</p></div>')
+        self.assertEqual([fragment.name for fragment in includes.used], ["bio.md"])
+
+    def test_include_only_as_own_block(self):
+        self.write("bio.md", "Bio")
+        html, includes = self.render("Text {% include 'bio.md' %}")
+        self.assertEqual(html, "<div><p>Text {% include 'bio.md' %}</p></div>")
+        self.assertEqual(includes.used, [])
+
+    def test_fragment_is_rendered_once(self):
+        self.write("bio.md", "Bio")
+        self.render('{% include "bio.md" %}')
+        self.render("{% include 'bio.md' %}")
+        self.assertEqual(self.loader.renders, 1)
+
+    def test_fragment_is_rendered_once_across_threads(self):
+        self.write("bio.md", "Bio")
+        split = includes.split_front_matter
+
+        def slow_split(source):
+            time.sleep(0.05)
+            return split(source)
+
+        with mock.patch.object(includes, "split_front_matter", slow_split):
+            threads = [
+                threading.Thread(target=self.render, args=('{% include "bio.md" %}',))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(self.loader.renders, 1)
+
+    def test_nested_include_dependencies(self):
+        self.write("partials/license.md", "MIT")
+        self.write("footer.md", '{% include "partials/license.md" %}')
+        html, includes = self.render('{% include "footer.md" %}')
+        self.assertEqual(html, "<div><p>MIT</p></div>")
+        fragment = includes.used[0]
+        self.assertEqual(sorted(fragment.dependencies), [
+            os.path.join(self.root, "footer.md"),
+            os.path.join(self.root, "partials", "license.md"),
+        ])
+
+        os.utime(os.path.join(self.root, "partials", "license.md"), ns=(0, 0))
+        self.assertEqual(sorted(self.loader.refresh()), ["footer.md", "partials/license.md"])
+        self.assertFalse(self.loader.is_cached(fragment))
+
+    def test_cycle(self):
+        self.write("a.md", '{% include "b.md" %}')
+        self.write("b.md", '{% include "a.md" %}')
+        with self.assertRaisesRegex(IncludeError, r"^Include cycle: a.md -> b.md -> a.md$"):
+            self.render('{% include "a.md" %}')
+
+    def test_missing_and_outside(self):
+        with self.assertRaisesRegex(IncludeError, "Include not found: nope.md"):
+            self.render('{% include "nope.md" %}')
+        with self.assertRaises(IncludeError):
+            self.render('{% include "../secret.md" %}')
+
+
+class TestSiteIncludes(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.path("includes", "bio.md"), "Tom is a *bio*.")
+        write_file(self.path("content", "blog", "tom", "index.md"),
+               '# Tom\n\n{% include "bio.md" %}')
+        write_file(self.path("content", "about.md"), '# About\n\n{% include "bio.md" %}')
+
+    def test_includes_are_inlined(self):
+        result = Site.from_project(self.root, basepath="/repo/").build()
+        self.assertTrue(result.ok)
+        self.assertIn("<p>Tom is a <i>bio</i>.</p>", self.read("docs", "blog", "tom", "index.html"))
+        self.assertIn("<p>Tom is a <i>bio</i>.</p>", self.read("docs", "about.html"))
+
+    def test_editing_include_rebuilds_only_includers(self):
+        site = Site.from_project(self.root)
+        site.build()
+        write_file(self.path("includes", "bio.md"), "Tom is merry.")
+        os.utime(self.path("includes", "bio.md"), ns=(1, 1))
+        result = site.build()
+        self.assertEqual(sorted(result.pages_written), [
+            self.path("docs", "about.html"),
+            self.path("docs", "blog", "tom", "index.html"),
+        ])
+        self.assertEqual(site.includes.renders, 2)
+        self.assertIn("Tom is merry.", self.read("docs", "about.html"))
+        self.assertEqual(site.build().pages_written, [])
+
+    def test_cycle_fails_the_page(self):
+        write_file(self.path("includes", "bio.md"), '{% include "bio.md" %}')
+        result = Site.from_project(self.root).build()
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual(result.errors[0][1], "Include cycle: bio.md -> bio.md")
+
+    def test_streamed_pages(self):
+        result = Site.from_project(self.root, stream_threshold=1).build()
+        self.assertTrue(result.ok)
+        self.assertIn("<p>Tom is a <i>bio</i>.</p>", self.read("docs", "about.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,15 @@
 import unittest
 
-from inline_markdown import (BlockType, block_to_block_type,
+from inline_markdown import (BlockType, block_to_block_type, code_to_html_node,
                              extract_markdown_images, extract_markdown_links,
-                             extract_title, markdown_to_blocks,
+                             extract_title, iter_markdown_blocks,
+                             markdown_to_blocks, markdown_to_html_node,
+                             split_code_block,
                              split_nodes_delimiter, split_nodes_image,
                              split_nodes_link, text_node_to_html_node,
                              text_to_textnodes)
 from textnode import TextNode, TextType
+from toc import TableOfContents
 
 
 class TestSplitNodesDelimiter(unittest.TestCase):
@@ -530,6 +533,24 @@ Third block
         self.assertEqual(blocks, [])
 
 
+class TestIterMarkdownBlocks(unittest.TestCase):
+    def test_iter_markdown_blocks_matches_markdown_to_blocks(self):
+        documents = [
+            "# Heading\n\nParagraph\nline two\n\n- a\n- b\n",
+            "a\n\n\nb\n\n\n\nc",
+            "  leading\n\n   \n\ntrailing  \n",
+            "one\n \ntwo",
+            "",
+            "\n\n\n",
+        ]
+        for markdown in documents:
+            with self.subTest(markdown=markdown):
+                self.assertEqual(
+                    list(iter_markdown_blocks(markdown.splitlines(keepends=True))),
+                    markdown_to_blocks(markdown),
+                )
+
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_block_to_block_type_heading_h1(self):
         block = "# Heading 1"
@@ -748,6 +769,71 @@ class TestTextToTextNodes(unittest.TestCase):
         )
 
 
+class TestCodeBlocks(unittest.TestCase):
+    def test_split_code_block_with_language(self):
+        self.assertEqual(
+            split_code_block("```python\nx = 1\n```"),
+            ("python", "\nx = 1\n"),
+        )
+
+    def test_split_code_block_without_language(self):
+        self.assertEqual(split_code_block("```\nx = 1\n```"), (None, "\nx = 1\n"))
+
+    def test_split_code_block_single_line(self):
+        self.assertEqual(split_code_block("```code```"), (None, "code"))
+
+    def test_code_to_html_node_plain(self):
+        self.assertEqual(
+            code_to_html_node("```\na < b\n```").to_html(),
+            "<pre><code>\na < b\n</code></pre>",
+        )
+
+    def test_code_to_html_node_highlighted(self):
+        self.assertEqual(
+            code_to_html_node("```py\nreturn 1\n```").to_html(),
+            '<pre><code class="language-py">\n<span class="tok-kw">return</span> '
+            '<span class="tok-num">1</span>\n</code></pre>',
+        )
+
+    def test_code_to_html_node_unknown_language(self):
+        self.assertEqual(
+            code_to_html_node("```cobol\nDISPLAY 'HI'\n```").to_html(),
+            '<pre><code class="language-cobol">\nDISPLAY \'HI\'\n</code></pre>',
+        )
+
+    def test_code_to_html_node_unsafe_language(self):
+        for language in ('x"><script>', "c#", "a'b"):
+            self.assertEqual(
+                code_to_html_node(f"```{language}\nx\n```").to_html(),
+                "<pre><code>\nx\n</code></pre>",
+            )
+        self.assertIn('class="language-objective-c++"',
+                      code_to_html_node("```objective-c++\nx\n```").to_html())
+
+
+class TestHeadingIds(unittest.TestCase):
+    def test_heading_ids(self):
+        html = markdown_to_html_node("# Hello World\n\n## The *best* `part`").to_html()
+        self.assertEqual(
+            html,
+            '<div><h1 id="hello-world">Hello World</h1>'
+            '<h2 id="the-best-part">The <i>best</i> <code>part</code></h2></div>',
+        )
+
+    def test_duplicate_headings_get_unique_ids(self):
+        html = markdown_to_html_node("## Notes\n\ntext\n\n## Notes").to_html()
+        self.assertIn('<h2 id="notes">', html)
+        self.assertIn('<h2 id="notes-1">', html)
+
+    def test_headings_are_collected(self):
+        toc = TableOfContents()
+        markdown_to_html_node("# Title\n\n## [Link](/x) here\n\n### Deeper", toc)
+        self.assertEqual(
+            [(entry.level, entry.text, entry.slug) for entry in toc.entries],
+            [(1, "Title", "title"), (2, "Link here", "link-here"), (3, "Deeper", "deeper")],
+        )
+
+
 class TestExtractTitle(unittest.TestCase):
     def test_extract_title_simple(self):
         markdown = "# Hello"
@@ -0,0 +1,147 @@
+import os
+import shutil
+import unittest
+
+from builder import Site
+from listing import (ListingEntry, build_listing, is_member, listing_markdown, listing_rel_path,
+                     paginate, sort_entries)
+from main import render_page
+from testutil import SiteTestCase, touch_file, write_file
+
+
+class TestListing(unittest.TestCase):
+    def test_is_member(self):
+        self.assertTrue(is_member("blog/tom/index.md", "blog"))
+        self.assertTrue(is_member("blog/post.md", "blog/"))
+        self.assertFalse(is_member("blog/index.md", "blog"))
+        self.assertFalse(is_member("blogroll/index.md", "blog"))
+        self.assertFalse(is_member("index.md", "blog"))
+
+    def test_sort_by_date(self):
+        entries = [
+            ListingEntry("blog/a/index.md", "Beta", "2024-01-01"),
+            ListingEntry("blog/b/index.md", "alpha"),
+            ListingEntry("blog/c/index.md", "Gamma", "2024-03-01"),
+            ListingEntry("blog/d/index.md", "Alpha", "2024-01-01"),
+        ]
+        self.assertEqual(
+            [e.title for e in sort_entries(entries, "date")],
+            ["Gamma", "Alpha", "Beta", "alpha"],
+        )
+        self.assertEqual(
+            [e.title for e in sort_entries(entries, "title")],
+            ["alpha", "Alpha", "Beta", "Gamma"],
+        )
+        with self.assertRaises(ValueError):
+            sort_entries(entries, "size")
+
+    def test_paginate(self):
+        self.assertEqual(paginate([1, 2, 3, 4, 5], 2), [[1, 2], [3, 4], [5]])
+        self.assertEqual(paginate([], 10), [[]])
+        with self.assertRaises(ValueError):
+            paginate([1], 0)
+
+    def test_listing_rel_path(self):
+        self.assertEqual(listing_rel_path("blog", 1), "blog/index.md")
+        self.assertEqual(listing_rel_path("blog/", 3), "blog/page/3/index.md")
+
+    def test_listing_markdown(self):
+        entries = [ListingEntry("blog/tom/index.md", "Tom", "2024-01-01")]
+        self.assertEqual(
+            listing_markdown("blog", entries, 2, 3),
+            "# Blog (page 2 of 3)\n\n"
+            "- [Tom](/blog/tom/) 2024-01-01\n\n"
+            "[< Previous](/blog/) [Next >](/blog/page/3/)\n",
+        )
+        self.assertEqual(listing_markdown("notes", [], 1, 1), "# Notes\n")
+
+    def test_listing_markdown_titles_are_not_parsed(self):
+        entries = [ListingEntry("blog/a (1)/index.md", "Using *emphasis* [[here]]")]
+        html = render_page(listing_markdown("blog", entries, 1, 1), "{{ Content }}")
+        self.assertIn(
+            '<li><a href="/blog/a %281%29/">Using &#42;emphasis&#42; &#91;&#91;here&#93;&#93;</a></li>',
+            html,
+        )
+
+    def test_build_listing(self):
+        entries = [ListingEntry(f"blog/p{i}.md", f"Post {i}", f"2024-01-0{i}") for i in range(1, 6)]
+        pages = build_listing("blog", entries, page_size=2)
+        self.assertEqual(
+            [rel_path for rel_path, _ in pages],
+            ["blog/index.md", "blog/page/2/index.md", "blog/page/3/index.md"],
+        )
+        self.assertIn("[Post 5](/blog/p5.html)", pages[0][1])
+        self.assertIn("[Post 1](/blog/p1.html)", pages[2][1])
+
+
+class TestSiteListings(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Only dated posts in the blog
+        shutil.rmtree(self.path("content", "blog", "tom"))
+        for i, date in enumerate(["2024-01-01", "2024-02-01", "2024-03-01"]):
+            self.write_post(i, f"---\ndate: {date}\n---\n# Post {i}\n\nBody")
+        write_file(self.path("template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        self.site = Site.from_project(
+            self.root, basepath="/repo/", cache_dir=None, listings=["blog"], listing_page_size=2,
+        )
+
+    def write_post(self, i, text):
+        path = self.path("content", "blog", f"post{i}", "index.md")
+        if os.path.exists(path):
+            touch_file(path, text)
+        else:
+            write_file(path, text)
+
+    def output(self, *parts):
+        return self.path("docs", *parts)
+
+    def test_listing_pages(self):
+        result = self.site.build()
+        self.assertTrue(result.ok)
+        self.assertIn("listings", result.timings)
+        first = self.read("docs", "blog", "index.html")
+        self.assertIn("<title>Blog (page 1 of 2)</title>", first)
+        self.assertIn('<a href="/repo/blog/post2/">Post 2</a> 2024-03-01', first)
+        self.assertLess(first.index("Post 2"), first.index("Post 1"))
+        self.assertNotIn("Post 0", first)
+        self.assertIn('<a href="/repo/blog/page/2/">Next ></a>', first)
+        self.assertIn("Post 0", self.read("docs", "blog", "page", "2", "index.html"))
+        # Front matter is not rendered
+        self.assertNotIn("date:", self.read("docs", "blog", "post0", "index.html"))
+
+    def test_incremental(self):
+        self.site.build()
+        listing_pages = [self.output("blog", "index.html"), self.output("blog", "page", "2", "index.html")]
+
+        # A body edit does not touch the listing
+        self.write_post(0, "---\ndate: 2024-01-01\n---\n# Post 0\n\nNew body")
+        result = self.site.build()
+        self.assertEqual(result.pages_written, [self.output("blog", "post0", "index.html")])
+        self.assertTrue(set(listing_pages) <= set(result.pages_skipped))
+
+        # A title change re-renders the listing; only the page it is on changes
+        self.write_post(0, "---\ndate: 2024-01-01\n---\n# Renamed\n\nNew body")
+        result = self.site.build()
+        self.assertEqual(result.pages_written, [
+            self.output("blog", "post0", "index.html"), listing_pages[1],
+        ])
+        self.assertIn("Renamed", self.read("docs", "blog", "page", "2", "index.html"))
+
+        # Removing a page shrinks the listing to one page
+        os.remove(self.path("content", "blog", "post0", "index.md"))
+        result = self.site.build()
+        self.assertIn(listing_pages[1], result.pages_removed)
+        self.assertFalse(os.path.exists(listing_pages[1]))
+        self.assertIn("<title>Blog</title>", self.read("docs", "blog", "index.html"))
+
+    def test_conflicting_index_page(self):
+        write_file(self.path("content", "blog", "index.md"), "# My blog")
+        result = self.site.build()
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn("conflicts with the listing", result.errors[0][1])
+        self.assertIn("My blog", self.read("docs", "blog", "index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import os
+import tracemalloc
+import unittest
+
+from builder import Site
+from main import copy_directory_contents, generate_pages_recursive, render_page
+from testutil import SiteTestCase, write_file
+
+
+class TestStreamedPages(SiteTestCase):
+    def build(self, **kwargs):
+        Site.from_project(self.root, basepath="/repo/", **kwargs).build()
+        return self.read("docs", "page.html")
+
+    def test_matches_rendered_page(self):
+        write_file(self.path("content", "page.md"),
+               "Intro before the title\n\n# The Title\n\n![img](/a.png)\n\n"
+               "- [link](/blog)\n- two\n\n```\ncode\n```\n\n> quote\n")
+        self.assertEqual(self.build(stream_threshold=1), self.build())
+
+    def test_matches_rendered_page_with_toc(self):
+        write_file(self.path("content", "page.md"), "# Title\n\n## One\n\ntext\n\n### Sub\n\n## One")
+        for template in ("<nav>{{ Toc }}</nav>{{ Content }}", "{{ Content }}<nav>{{ Toc }}</nav>"):
+            write_file(self.path("template.html"), template)
+            streamed = self.build(stream_threshold=1)
+            self.assertEqual(streamed, self.build())
+            self.assertIn('<a href="#one-1">One</a>', streamed)
+
+    def test_search_index_matches_rendered_pages(self):
+        write_file(self.path("content", "page.md"), "---\ntags: x\n---\n# Title\n\nElves *sing*.")
+        self.build(stream_threshold=1, search_index=True)
+        streamed = [self.read("docs", "search", name) for name in ("pages.json", "shard-0.json")]
+        self.build(search_index=True)
+        rendered = [self.read("docs", "search", name) for name in ("pages.json", "shard-0.json")]
+        self.assertEqual(streamed, rendered)
+        self.assertIn('"elves":[[', rendered[1])
+
+    def test_missing_title_fails_the_page(self):
+        write_file(self.path("content", "page.md"), "## Not a title\n\ntext")
+        result = Site.from_project(self.root, stream_threshold=1).build()
+        self.assertEqual([path for path, _ in result.errors], [self.path("content", "page.md")])
+
+    def test_memory_is_bounded_by_block_size(self):
+        block = "Paragraph with **bold** and a [link](/x) " * 20
+        write_file(self.path("content", "page.md"), "# Big\n\n" + "\n\n".join([block] * 1000))
+        size = os.path.getsize(self.path("content", "page.md"))
+        site = Site.from_project(self.root, stream_threshold=size, search_index=True)
+
+        tracemalloc.start()
+        site.build()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertGreater(size, 800 * 1024)
+        self.assertLess(peak, size // 8)
+
+
+class TestGeneratePages(SiteTestCase):
+    def test_matches_site_build(self):
+        Site.from_project(self.root, basepath="/repo/").build()
+        expected = [self.read("docs", "index.html"), self.read("docs", "blog", "tom", "index.html")]
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_directory_contents(self.path("static"), self.path("out"))
+            generate_pages_recursive(self.path("content"), self.path("template.html"),
+                                     self.path("out"), "/repo/")
+        self.assertEqual(
+            [self.read("out", "index.html"), self.read("out", "blog", "tom", "index.html")],
+            expected,
+        )
+        self.assertEqual(self.read("out", "images", "tom.png"), "png")
+
+
+class TestRenderPage(unittest.TestCase):
+    def test_toc_slot(self):
+        html = render_page(
+            "# Guide\n\n## Install\n\n## Use", "<nav>{{ Toc }}</nav>{{ Content }}"
+        )
+        self.assertTrue(html.startswith(
+            '<nav><ul><li><a href="#install">Install</a></li>'
+            '<li><a href="#use">Use</a></li></ul></nav><div><h1 id="guide">'
+        ))
+        self.assertIn('<h2 id="install">Install</h2>', html)
+
+    def test_template_without_toc_slot(self):
+        self.assertEqual(render_page("# Guide", "{{ Title }}"), "Guide")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+import inline_markdown
+import main
+from builder import Site
+from htmlnode import HTMLNode
+from memprofile import STAGES, MemoryProfiler
+from parentnode import ParentNode
+from testutil import write_file
+from textnode import TextNode
+
+
+class TestMemoryProfiler(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        big = "\n".join(f"- item **{i}** with [a link](/page{i})" for i in range(500))
+        write_file(os.path.join(root, "content", "index.md"), "# Home\n\nJust *one* line")
+        write_file(os.path.join(root, "content", "big", "index.md"), "# Big\n\n" + big)
+        write_file(os.path.join(root, "static", "index.css"), "body {}")
+        write_file(os.path.join(root, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        self.site = Site.from_project(root, cache_dir=None)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def profile_build(self):
+        profiler = MemoryProfiler()
+        profiler.install(self.site)
+        try:
+            self.site.build()
+        finally:
+            profiler.uninstall()
+        return profiler
+
+    def test_pages_and_stages(self):
+        profiler = self.profile_build()
+        worst = profiler.worst_pages()
+        self.assertEqual([page.rel_path for page in worst], ["big/index.md", "index.md"])
+        big, small = worst
+        self.assertGreater(big.peak, small.peak)
+        self.assertEqual(set(big.stages), set(STAGES))
+        # At least one node each for "- item ", bold, " with " and the link
+        self.assertGreaterEqual(big.text_nodes, 2000)
+        self.assertGreaterEqual(big.html_nodes, 2000)
+        self.assertGreater(small.text_nodes, 0)
+        self.assertLess(small.text_nodes, 20)
+
+        for name in STAGES:
+            self.assertGreater(profiler.stages[name].calls, 0)
+        self.assertEqual(profiler.stages["to_html"].calls, 2)
+        self.assertEqual(profiler.stages["template"].worst_page, "big/index.md")
+
+        report = profiler.report()
+        self.assertIn("2 pages rendered", report)
+        self.assertLess(report.index("big/index.md ("), report.index(" index.md ("))
+
+    def test_streamed_pages(self):
+        self.site.stream_threshold = 1
+        profiler = self.profile_build()
+        big, small = profiler.worst_pages()
+        self.assertEqual(big.rel_path, "big/index.md")
+        self.assertEqual(set(big.stages), set(STAGES))
+        self.assertGreaterEqual(big.html_nodes, 2000)
+        # One to_html per block, and one step past the last block
+        self.assertEqual(profiler.stages["to_html"].calls, 4)
+        self.assertEqual(profiler.stages["markdown_to_blocks"].calls, 6)
+
+    def test_cached_pages_are_not_reported(self):
+        self.site.build()
+        profiler = self.profile_build()
+        self.assertEqual(profiler.pages, [])
+
+    def test_uninstall_restores_originals(self):
+        originals = (
+            inline_markdown.markdown_to_blocks, inline_markdown.text_to_textnodes,
+            main.iter_markdown_blocks, main.fill_template, ParentNode.to_html,
+            TextNode.__init__, HTMLNode.__init__,
+        )
+        self.profile_build()
+        self.assertEqual(originals, (
+            inline_markdown.markdown_to_blocks, inline_markdown.text_to_textnodes,
+            main.iter_markdown_blocks, main.fill_template, ParentNode.to_html,
+            TextNode.__init__, HTMLNode.__init__,
+        ))
+        self.assertNotIn("_build_page", vars(self.site))
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_parse_args(self):
+        self.assertIsNone(main.parse_args([]).memprofile)
+        self.assertEqual(main.parse_args(["--memprofile", "mem.txt"]).memprofile, "mem.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
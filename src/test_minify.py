@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import minify
+from minify import Minifier, minify_css, minify_html
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_strips_template_indentation(self):
+        html = "<html>\n    <head>\n        <title>T</title>\n    </head>\n</html>"
+        self.assertEqual(minify_html(html), "<html><head><title>T</title></head></html>")
+
+    def test_keeps_inline_spaces(self):
+        html = "<p><b>bold</b> <i>italic</i>   text</p>"
+        self.assertEqual(minify_html(html), "<p><b>bold</b> <i>italic</i> text</p>")
+
+    def test_preserves_pre_and_code(self):
+        html = "<div>\n  <pre><code>def f():\n    return 1\n</code></pre>\n  <code>a   b</code>\n</div>"
+        self.assertEqual(
+            minify_html(html),
+            "<div><pre><code>def f():\n    return 1\n</code></pre><code>a   b</code></div>",
+        )
+
+    def test_removes_comments(self):
+        self.assertEqual(minify_html("<p>a<!-- note --></p>"), "<p>a</p>")
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_minify_css(self):
+        css = "/* theme */\nbody {\n    color: #fff;\n    margin: 0;\n}\n\nh1,\nh2 > a {\n    color: red;\n}\n"
+        self.assertEqual(minify_css(css), "body{color:#fff;margin:0}h1,h2>a{color:red}")
+
+    def test_minify_css_keeps_strings_and_descendant_pseudo(self):
+        css = 'a :hover { content: "a  ;  b"; }'
+        self.assertEqual(minify_css(css), 'a :hover{content:"a  ;  b"}')
+
+
+class TestMinifier(unittest.TestCase):
+    def test_minifier_caches_by_content(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "minify.json")
+            minifier = Minifier(cache_path)
+            self.assertEqual(minifier.minify("css", "a { b: c; }", "a.css"), "a{b:c}")
+            minifier.save()
+
+            minifier = Minifier(cache_path)
+            with mock.patch.dict(minify.MINIFIERS, {"css": mock.Mock()}):
+                self.assertEqual(minifier.minify("css", "a { b: c; }", "a.css"), "a{b:c}")
+                minify.MINIFIERS["css"].assert_not_called()
+            self.assertEqual(minifier.report, [("a.css", 11, 6)])
+            self.assertEqual(minifier.totals(), (11, 6))
+
+    def test_cache_holds_what_the_build_used(self):
+        minifier = Minifier()
+        minifier.minify("css", "a { b: c; }", "a.css")
+        minifier.minify("css", "d { e: f; }", "d.css")
+        minifier.save()
+        minifier.begin_build()
+        minifier.minify("css", "a { b: c; }", "a.css")
+        minifier.save()
+        self.assertEqual(list(minifier.cache.values()), ["a{b:c}"])
+        self.assertEqual(minifier.report, [("a.css", 11, 6)])
+
+        # An output reused without minifying it keeps its entry
+        minifier.begin_build()
+        minifier.keep(["a.css"])
+        minifier.save()
+        self.assertEqual(list(minifier.cache.values()), ["a{b:c}"])
+
+    def test_minified_text_is_not_stored_twice(self):
+        minifier = Minifier()
+        self.assertEqual(minifier.minify("css", "a{b:c}"), "a{b:c}")
+        self.assertEqual(list(minifier.cache.values()), [True])
+        self.assertEqual(minifier.minify("css", "a{b:c}"), "a{b:c}")
+
+    def test_minify_file_breaks_hardlinks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.css")
+            link = os.path.join(tmp, "b.css")
+            with open(path, "w") as f:
+                f.write("a { b: c; }")
+            os.link(path, link)
+
+            Minifier().minify_file("css", path)
+
+            with open(path) as f:
+                self.assertEqual(f.read(), "a{b:c}")
+            with open(link) as f:
+                self.assertEqual(f.read(), "a { b: c; }")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import builder
+import publish
+from builder import Site
+from publish import link_tree, previous_dir, rollback, staging_dir
+from testutil import SiteTestCase, touch_file, write_file
+
+
+class TestPublish(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.live = os.path.join(self._tmp.name, "docs")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def stage(self, text):
+        staging = staging_dir(self.live)
+        write_file(os.path.join(staging, "index.html"), text)
+        return staging
+
+    def read_live(self, *parts):
+        with open(os.path.join(*parts, "index.html"), encoding="utf-8") as f:
+            return f.read()
+
+    def test_first_publish_renames(self):
+        publish.publish(self.stage("one"), self.live)
+        self.assertEqual(self.read_live(self.live), "one")
+        self.assertFalse(os.path.exists(staging_dir(self.live)))
+        self.assertFalse(os.path.exists(previous_dir(self.live)))
+
+    def test_publish_keeps_previous_build(self):
+        publish.publish(self.stage("one"), self.live)
+        publish.publish(self.stage("two"), self.live)
+        publish.publish(self.stage("three"), self.live)
+        self.assertEqual(self.read_live(self.live), "three")
+        self.assertEqual(self.read_live(previous_dir(self.live)), "two")
+        self.assertFalse(os.path.exists(staging_dir(self.live)))
+
+    def test_rollback_swaps_with_previous(self):
+        publish.publish(self.stage("one"), self.live)
+        publish.publish(self.stage("two"), self.live)
+        rollback(self.live)
+        self.assertEqual(self.read_live(self.live), "one")
+        rollback(self.live)
+        self.assertEqual(self.read_live(self.live), "two")
+
+    def test_rollback_without_previous_build(self):
+        publish.publish(self.stage("one"), self.live)
+        with self.assertRaises(FileNotFoundError):
+            rollback(self.live)
+
+    def test_fallback_without_atomic_exchange(self):
+        publish.publish(self.stage("one"), self.live)
+        with mock.patch.object(publish, "exchange", return_value=False):
+            publish.publish(self.stage("two"), self.live)
+            rollback(self.live)
+        self.assertEqual(self.read_live(self.live), "one")
+        self.assertEqual(self.read_live(previous_dir(self.live)), "two")
+        self.assertEqual(sorted(os.listdir(self._tmp.name)), ["docs", "docs.previous"])
+
+    def test_link_tree_hardlinks_files(self):
+        write_file(os.path.join(self.live, "a", "b.html"), "b")
+        copy = os.path.join(self._tmp.name, "copy")
+        link_tree(self.live, copy)
+        self.assertEqual(
+            os.stat(os.path.join(copy, "a", "b.html")).st_ino,
+            os.stat(os.path.join(self.live, "a", "b.html")).st_ino,
+        )
+
+
+class TestAtomicSite(SiteTestCase):
+    def inode(self, *parts):
+        return os.stat(self.path(*parts)).st_ino
+
+    def test_build_publishes_and_keeps_previous(self):
+        site = Site.from_project(self.root, atomic=True)
+        result = site.build()
+        self.assertTrue(result.published)
+        self.assertIn(self.path("docs", "index.html"), result.pages_written)
+        self.assertIn("Bombadil", self.read("docs", "blog", "tom", "index.html"))
+        self.assertFalse(os.path.exists(self.path("docs.staging")))
+
+        touch_file(self.path("content", "index.md"), "# Home\n\nBack")
+        site.build()
+        self.assertIn("Back", self.read("docs", "index.html"))
+        self.assertNotIn("Back", self.read("docs.previous", "index.html"))
+
+    def test_live_directory_is_never_removed_during_a_build(self):
+        site = Site.from_project(self.root, atomic=True)
+        site.build()
+        live_seen = []
+        render_page = builder.render_page
+
+        def watch_render(*args, **kwargs):
+            live_seen.append(os.path.exists(self.path("docs", "index.html")))
+            return render_page(*args, **kwargs)
+
+        touch_file(self.path("content", "index.md"), "# Home\n\nBack")
+        with mock.patch.object(builder, "render_page", side_effect=watch_render):
+            site.build()
+        self.assertEqual(live_seen, [True])
+
+    def test_unchanged_files_stay_linked_and_previous_build_is_intact(self):
+        site = Site.from_project(self.root, atomic=True)
+        site.build()
+        tom = self.inode("docs", "blog", "tom", "index.html")
+        css = self.inode("docs", "index.css")
+
+        touch_file(self.path("content", "index.md"), "# Home\n\nBack")
+        touch_file(self.path("static", "index.css"), "main {}")
+        result = site.build()
+
+        self.assertEqual(result.pages_written, [self.path("docs", "index.html")])
+        self.assertEqual(self.inode("docs", "blog", "tom", "index.html"), tom)
+        self.assertNotEqual(self.inode("docs", "index.css"), css)
+        self.assertEqual(self.read("docs", "index.css"), "main {}")
+        self.assertEqual(self.read("docs.previous", "index.css"), "body {}")
+        self.assertNotIn("Back", self.read("docs.previous", "index.html"))
+
+    def test_failed_build_leaves_live_directory_untouched(self):
+        site = Site.from_project(self.root, atomic=True)
+        site.build()
+        touch_file(self.path("content", "index.md"), "---\nlayout: missing\n---\n# Home\n\nBroken")
+        result = site.build()
+
+        self.assertFalse(result.ok)
+        self.assertFalse(result.published)
+        self.assertNotIn("Broken", self.read("docs", "index.html"))
+        self.assertFalse(os.path.exists(self.path("docs.previous")))
+
+        touch_file(self.path("content", "index.md"), "# Home\n\nFixed")
+        result = site.build()
+        self.assertTrue(result.published)
+        self.assertIn("Fixed", self.read("docs", "index.html"))
+
+    def test_new_process_stages_incrementally(self):
+        Site.from_project(self.root, atomic=True).build()
+        tom = self.inode("docs", "blog", "tom", "index.html")
+
+        result = Site.from_project(self.root, atomic=True).build()
+        self.assertTrue(result.published)
+        self.assertEqual(result.pages_written, [])
+        self.assertEqual(result.assets_copied, [])
+        self.assertEqual(self.inode("docs", "blog", "tom", "index.html"), tom)
+
+    def test_live_directory_changed_outside_the_site(self):
+        site = Site.from_project(self.root, atomic=True)
+        site.build()
+        touch_file(self.path("content", "index.md"), "# Home\n\nBack")
+        site.build()
+        rollback(self.path("docs"))
+        write_file(self.path("docs", "stray.html"), "stray")
+
+        result = site.build()
+        self.assertTrue(result.published)
+        self.assertEqual(len(result.pages_written), 2)
+        self.assertIn("Back", self.read("docs", "index.html"))
+        self.assertFalse(os.path.exists(self.path("docs", "stray.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
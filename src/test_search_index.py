@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import unittest
+
+from frontmatter import split_front_matter
+from inline_markdown import markdown_to_blocks
+from search_index import (PageTerms, SearchIndex, build_search_index,
+                          markdown_to_plain_text, page_url, tokenize)
+
+
+class TestTokenize(unittest.TestCase):
+    def test_tokenize_lowercases_and_drops_stop_words(self):
+        self.assertEqual(
+            tokenize("The Lord of the Rings, by Tolkien!"),
+            ["lord", "rings", "tolkien"],
+        )
+
+    def test_tokenize_drops_short_tokens(self):
+        self.assertEqual(tokenize("x y zz"), ["zz"])
+
+    def test_tokenize_splits_on_underscores(self):
+        self.assertEqual(tokenize("snake_case"), ["snake", "case"])
+
+
+class TestMarkdownToPlainText(unittest.TestCase):
+    def test_plain_text_strips_markup(self):
+        markdown = "# Title\n\nSome **bold** and a [link](https://x.com)\n\n- one\n- two"
+        self.assertEqual(
+            markdown_to_plain_text(markdown),
+            "Title\nSome bold and a link\none two",
+        )
+
+    def test_plain_text_keeps_image_alt(self):
+        self.assertEqual(
+            markdown_to_plain_text("![JRR Tolkien](/images/tolkien.png)"),
+            "JRR Tolkien",
+        )
+
+    def test_plain_text_unbalanced_markup_falls_back(self):
+        self.assertEqual(markdown_to_plain_text("a *b"), "a *b")
+
+
+class TestPageUrl(unittest.TestCase):
+    def test_page_url_root_index(self):
+        self.assertEqual(page_url("index.md"), "/")
+
+    def test_page_url_nested_index(self):
+        self.assertEqual(page_url("blog/tom/index.md", "/repo/"), "/repo/blog/tom/")
+
+    def test_page_url_plain_file(self):
+        self.assertEqual(page_url("about.md"), "/about.html")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def test_update_page_skips_unchanged(self):
+        index = SearchIndex()
+        self.assertTrue(index.update_page("a.md", "# A\n\nhobbits"))
+        self.assertFalse(index.update_page("a.md", "# A\n\nhobbits"))
+        self.assertTrue(index.update_page("a.md", "# A\n\nelves"))
+        self.assertEqual(index.pages["a.md"]["terms"], {"elves": 1})
+
+    def test_postings(self):
+        index = SearchIndex()
+        index.update_page("b.md", "# B\n\nhobbit hobbit")
+        index.update_page("a.md", "# A\n\nhobbit elf")
+        doc_paths, postings = index.postings()
+        self.assertEqual(doc_paths, ["b.md", "a.md"])
+        self.assertEqual(postings["hobbit"], [[0, 2], [1, 1]])
+        self.assertEqual(postings["elf"], [[1, 1]])
+
+    def test_doc_ids_are_stable(self):
+        index = SearchIndex()
+        index.update_page("b.md", "# B\n\nhobbit")
+        index.update_page("c.md", "# C\n\nhobbit elf")
+        _, before = index.shards()
+        index.update_page("a.md", "# A\n\nent")
+        index.retain(["a.md", "c.md"])
+        index.update_page("b.md", "# B\n\nhobbit")
+        doc_paths, after = index.shards()
+        self.assertEqual(doc_paths, [None, "c.md", "a.md", "b.md"])
+        self.assertEqual(after[0]["elf"], before[0]["elf"])
+        self.assertEqual(after[0]["hobbit"], [[1, 1], [3, 1]])
+        self.assertEqual(json.loads(index.files()["pages.json"])[0], None)
+
+    def test_page_terms_match_update_page(self):
+        markdown = "---\ntags: elves\n---\n# Rivendell\n\nElves **sing** in [Rivendell](/r)."
+        index = SearchIndex()
+        index.update_page("a.md", markdown)
+        terms = PageTerms()
+        for block in markdown_to_blocks(split_front_matter(markdown)[1]):
+            terms.add_block(block)
+        self.assertEqual(terms.title, "Rivendell")
+        self.assertEqual(terms.terms, index.pages["a.md"]["terms"])
+
+    def test_save_and_load(self):
+        index = SearchIndex()
+        index.update_page("b.md", "beta")
+        index.update_page("a.md", "alpha")
+        index.retain(["a.md"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "search.json")
+            index.save(path)
+            loaded = SearchIndex.load(path)
+            with open(path, "w") as f:
+                f.write("{}")
+            self.assertEqual(SearchIndex.load(path).pages, {})
+        self.assertEqual(loaded.doc_ids, {"a.md": 1})
+        loaded.update_page("c.md", "gamma")
+        self.assertEqual(loaded.doc_ids["c.md"], 2)
+
+    def test_shards_respect_size_limit(self):
+        index = SearchIndex()
+        index.update_page("a.md", " ".join(f"term{i}" for i in range(200)))
+        _, shards = index.shards(max_shard_bytes=200)
+        self.assertGreater(len(shards), 1)
+        terms = [term for shard in shards for term in shard]
+        self.assertEqual(terms, sorted(terms))
+        self.assertEqual(len(terms), 200)
+
+    def test_retain_removes_missing_pages(self):
+        index = SearchIndex()
+        index.update_page("a.md", "alpha")
+        index.update_page("b.md", "beta")
+        self.assertEqual(index.retain(["a.md"]), 1)
+        self.assertEqual(list(index.pages), ["a.md"])
+
+
+class TestBuildSearchIndex(unittest.TestCase):
+    def test_build_is_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(os.path.join(content, "blog"))
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\nWelcome hobbits")
+            with open(os.path.join(content, "blog", "index.md"), "w") as f:
+                f.write("# Blog\n\nElves and hobbits")
+            out = os.path.join(tmp, "search")
+            state = os.path.join(tmp, "cache", "search.json")
+
+            self.assertEqual(build_search_index(content, out, state), (2, 2))
+            self.assertEqual(build_search_index(content, out, state), (0, 2))
+
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\nWelcome dwarves")
+            self.assertEqual(build_search_index(content, out, state), (1, 2))
+
+            with open(os.path.join(out, "pages.json")) as f:
+                self.assertEqual(json.load(f), [["/", "Home"], ["/blog/", "Blog"]])
+            with open(os.path.join(out, "index.json")) as f:
+                manifest = json.load(f)
+            with open(os.path.join(out, manifest["shards"][0][1])) as f:
+                shard = json.load(f)
+            self.assertEqual(shard["dwarves"], [[0, 1]])
+            self.assertEqual(shard["hobbits"], [[1, 1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from selection import copy_selected, iter_selected_files, matches, may_contain_matches
+from testutil import write_file
+
+
+class TestMatches(unittest.TestCase):
+    def test_matches(self):
+        self.assertTrue(matches("blog/tom/index.md", ["blog/**"]))
+        self.assertTrue(matches("blog/tom/index.md", ["blog/*"]))
+        self.assertTrue(matches("index.md", ["contact/*", "index.md"]))
+        self.assertFalse(matches("contact/index.md", ["blog/**"]))
+
+    def test_may_contain_matches(self):
+        self.assertTrue(may_contain_matches("", ["blog/**"]))
+        self.assertTrue(may_contain_matches("blog", ["blog/**"]))
+        self.assertTrue(may_contain_matches("blog/tom", ["blog/**"]))
+        self.assertTrue(may_contain_matches("blog", ["blog/t*/index.md"]))
+        self.assertTrue(may_contain_matches("anything", ["*/index.md"]))
+        self.assertFalse(may_contain_matches("contact", ["blog/**"]))
+
+
+class TestSelectedFiles(unittest.TestCase):
+    def test_iter_selected_files_and_copy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "static")
+            write_file(os.path.join(src, "index.css"))
+            write_file(os.path.join(src, "images", "tom.png"))
+            write_file(os.path.join(src, "images", "tolkien.png"))
+            write_file(os.path.join(src, "fonts", "a.woff"))
+
+            self.assertEqual(
+                [rel for _, rel in iter_selected_files(src, ["images/to*", "*.css"])],
+                ["index.css", "images/tolkien.png", "images/tom.png"],
+            )
+
+            dst = os.path.join(tmp, "docs")
+            write_file(os.path.join(dst, "keep.html"), "old")
+            written = copy_selected(src, dst, ["images/tom.png"])
+            self.assertEqual(written, [os.path.join(dst, "images", "tom.png")])
+            self.assertTrue(os.path.isfile(os.path.join(dst, "keep.html")))
+            self.assertFalse(os.path.exists(os.path.join(dst, "index.css")))
+
+
+if __name__ == "__main__":
+    unittest.main()
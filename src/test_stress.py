@@ -0,0 +1,42 @@
+import unittest
+
+from stress import PATHOLOGICAL_INPUTS, STAGES, count_operations, peak_memory
+
+# Tracing is slow; operation counts are exact at any size. They include
+# the length of every string a str method scans or copies, so repeatedly
+# splitting the rest of a long line shows up as quadratic
+SIZE = 500
+# tracemalloc is slow; peak memory is stable at smaller sizes
+MEMORY_SIZE = 250
+FACTOR = 4
+# Linear work grows by about FACTOR, quadratic work by FACTOR ** 2
+MAX_RATIO = FACTOR * 1.5
+# Peak memory includes allocator noise, so it gets more slack
+MAX_MEMORY_RATIO = FACTOR * 2.5
+# Wall-clock scaling, which also covers work done inside the regex engine,
+# is reported by "./bench.sh stress"
+
+
+class TestWorstCaseScaling(unittest.TestCase):
+    def test_operations_scale_linearly(self):
+        for name, make in PATHOLOGICAL_INPUTS.items():
+            small = count_operations(make(SIZE))
+            large = count_operations(make(SIZE * FACTOR))
+            for stage in STAGES:
+                with self.subTest(input=name, stage=stage):
+                    self.assertLess(
+                        large[stage], small[stage] * MAX_RATIO,
+                        f"{stage}: {small[stage]} operations at size {SIZE} "
+                        f"and {large[stage]} at size {SIZE * FACTOR}",
+                    )
+
+    def test_memory_scales_linearly(self):
+        for name, make in PATHOLOGICAL_INPUTS.items():
+            with self.subTest(input=name):
+                small = peak_memory(make(MEMORY_SIZE))
+                large = peak_memory(make(MEMORY_SIZE * FACTOR))
+                self.assertLess(large, max(small, 64 * 1024) * MAX_MEMORY_RATIO)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from main import fill_template
+from templates import TemplateError, TemplateLoader, layout_template_name
+
+
+class TestTemplates(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.loader = TemplateLoader(self.root)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        before = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        st = os.stat(path)
+        if before is not None and st.st_mtime_ns <= before:
+            os.utime(path, ns=(st.st_atime_ns, before + 1_000_000))
+
+    def render(self, name, **variables):
+        return self.loader.get(name).render(variables)
+
+    def test_variables(self):
+        self.write("t.html", "<title>{{ Title }}</title>{{Content}}{{ missing }}!")
+        self.assertEqual(self.render("t.html", Title="T", Content="<p>c</p>"), "<title>T</title><p>c</p>!")
+        template = self.loader.get("t.html")
+        self.assertEqual(template.names, ["Title", "Content", "missing"])
+
+    def test_same_as_string_replacement(self):
+        source = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+        self.write("t.html", source)
+        self.assertEqual(
+            fill_template(self.loader.get("t.html"), "Tom", "<p>hi</p>"),
+            fill_template(source, "Tom", "<p>hi</p>"),
+        )
+
+    def test_front_matter_variables(self):
+        self.write("t.html", "{{ Title }} ({{ date }})")
+        self.assertEqual(
+            fill_template(self.loader.get("t.html"), "Tom", "", {"date": "2024-01-01"}),
+            "Tom (2024-01-01)",
+        )
+
+    def test_extends(self):
+        self.write("base.html", "<h>{% block header %}Site{% endblock %}</h>"
+                                "<m>{% block main %}{% endblock main %}</m>")
+        self.write("post.html", '{% extends "base.html" %}ignored'
+                                "{% block main %}<article>{{ Content }}</article>{% endblock %}")
+        self.write("special.html", "{% extends 'post.html' %}{% block header %}Special{% endblock %}")
+        self.assertEqual(self.render("post.html", Content="c"), "<h>Site</h><m><article>c</article></m>")
+        self.assertEqual(self.render("special.html", Content="c"), "<h>Special</h><m><article>c</article></m>")
+
+    def test_nested_blocks(self):
+        self.write("base.html", "{% block outer %}[{% block inner %}i{% endblock %}]{% endblock %}")
+        self.write("a.html", '{% extends "base.html" %}{% block inner %}I{% endblock %}')
+        self.write("b.html", '{% extends "a.html" %}{% block outer %}<{% block inner %}x{% endblock %}>{% endblock %}')
+        self.assertEqual(self.render("a.html"), "[I]")
+        # The most derived definition of each block wins
+        self.assertEqual(self.render("b.html"), "<x>")
+
+    def test_include(self):
+        self.write("partials/nav.html", "<nav>{{ Title }}</nav>")
+        self.write("t.html", '{% include "partials/nav.html" %}{{ Content }}')
+        self.assertEqual(self.render("t.html", Title="T", Content="c"), "<nav>T</nav>c")
+
+    def test_errors(self):
+        self.write("cycle-a.html", '{% include "cycle-b.html" %}')
+        self.write("cycle-b.html", '{% extends "cycle-a.html" %}')
+        self.write("unknown.html", "{% for x in y %}")
+        self.write("unclosed.html", "{% block a %}")
+        self.write("stray.html", "{% endblock %}")
+        self.write("mismatch.html", "{% block a %}{% endblock b %}")
+        for name in ("cycle-a.html", "unknown.html", "unclosed.html", "stray.html",
+                     "mismatch.html", "missing.html", "../outside.html"):
+            with self.subTest(name=name), self.assertRaises(TemplateError):
+                self.loader.get(name)
+
+    def test_compiled_once_until_a_dependency_changes(self):
+        self.write("partials/footer.html", "v1")
+        self.write("t.html", '{{ Content }}{% include "partials/footer.html" %}')
+        first = self.loader.get("t.html")
+        self.assertIs(self.loader.get("t.html"), first)
+        self.assertEqual(self.loader.compiles, 1)
+        self.assertEqual(self.loader.refresh(), [])
+
+        self.write("partials/footer.html", "v2")
+        self.assertEqual(self.loader.refresh(), ["t.html"])
+        self.assertFalse(self.loader.is_cached(first))
+        second = self.loader.get("t.html")
+        self.assertEqual(second.render({"Content": "c"}), "cv2")
+        self.assertTrue(self.loader.is_cached(second))
+        self.assertEqual(self.loader.compiles, 2)
+
+    def test_layout_template_name(self):
+        self.assertEqual(layout_template_name("post"), "layouts/post.html")
+
+
+if __name__ == "__main__":
+    unittest.main()
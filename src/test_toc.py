@@ -0,0 +1,54 @@
+import unittest
+
+from toc import TableOfContents, TocEntry, slugify
+
+
+class TestSlugify(unittest.TestCase):
+    def test_slugify(self):
+        self.assertEqual(slugify("Hello, World!"), "hello-world")
+        self.assertEqual(slugify("  The `code` part  "), "the-code-part")
+        self.assertEqual(slugify("Ünïcode héading"), "ünïcode-héading")
+        self.assertEqual(slugify("?!"), "section")
+
+
+class TestTableOfContents(unittest.TestCase):
+    def test_ids_are_unique(self):
+        toc = TableOfContents()
+        self.assertEqual(
+            [toc.add(2, text) for text in ("Intro", "Intro", "Intro 1", "Intro")],
+            ["intro", "intro-1", "intro-1-1", "intro-2"],
+        )
+        self.assertEqual(toc.entries[1], TocEntry(2, "Intro", "intro-1"))
+
+    def test_to_html_nests_by_level(self):
+        toc = TableOfContents()
+        for level, text in ((1, "Title"), (2, "One"), (3, "One A"), (3, "One B"), (2, "Two")):
+            toc.add(level, text)
+        self.assertEqual(
+            toc.to_html(),
+            '<ul><li><a href="#one">One</a>'
+            '<ul><li><a href="#one-a">One A</a></li><li><a href="#one-b">One B</a></li></ul>'
+            '</li><li><a href="#two">Two</a></li></ul>',
+        )
+
+    def test_to_html_skipped_levels_and_escaping(self):
+        toc = TableOfContents()
+        toc.add(2, "A < B")
+        toc.add(4, "Deep")
+        toc.add(3, "Less deep")
+        self.assertEqual(
+            toc.to_html(),
+            '<ul><li><a href="#a--b">A &lt; B</a>'
+            '<ul><li><a href="#deep">Deep</a></li></ul>'
+            '<ul><li><a href="#less-deep">Less deep</a></li></ul>'
+            '</li></ul>',
+        )
+
+    def test_empty(self):
+        toc = TableOfContents()
+        toc.add(1, "Only the title")
+        self.assertEqual(toc.to_html(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+
+from builder import Site
+from inline_markdown import markdown_to_html_node, text_to_textnodes
+from textnode import TextNode, TextType
+from wikilinks import PageLinks, WikiIndex
+from testutil import SiteTestCase, write_file
+
+
+def _index():
+    index = WikiIndex()
+    index.add("index.md", "Home")
+    index.add("blog/tom/index.md", "Tom Bombadil")
+    index.add("blog/glorfindel/index.md", "Glorfindel")
+    index.add("notes.md", "Notes")
+    return index
+
+
+class TestWikiIndex(unittest.TestCase):
+    def test_resolve_by_path(self):
+        index = _index()
+        for target in ("blog/tom", "/blog/tom/", "blog/tom/index", "blog/tom/index.md"):
+            self.assertEqual(index.resolve(target), ("blog/tom/index.md", "Tom Bombadil", ()))
+        self.assertEqual(index.resolve("notes")[0], "notes.md")
+
+    def test_resolve_by_title(self):
+        index = _index()
+        self.assertEqual(index.resolve("glorfindel"), ("blog/glorfindel/index.md", "Glorfindel", ()))
+        self.assertEqual(index.resolve("Tom  bombadil")[0], "blog/tom/index.md")
+        self.assertIsNone(index.resolve("Goldberry"))
+
+    def test_ambiguous_title(self):
+        index = _index()
+        index.add("archive/glorfindel.md", "Glorfindel")
+        self.assertEqual(index.resolve("Glorfindel"), (
+            "archive/glorfindel.md", "Glorfindel",
+            ("archive/glorfindel.md", "blog/glorfindel/index.md"),
+        ))
+
+
+class TestPageLinks(unittest.TestCase):
+    def test_text_nodes(self):
+        links = PageLinks(_index())
+        nodes = text_to_textnodes(
+            "See [[Glorfindel]], [[blog/tom|Tom]], [[notes#todo]] and [[#intro]].", links
+        )
+        self.assertEqual(nodes, [
+            TextNode("See ", TextType.TEXT),
+            TextNode("Glorfindel", TextType.LINK, "/blog/glorfindel/"),
+            TextNode(", ", TextType.TEXT),
+            TextNode("Tom", TextType.LINK, "/blog/tom/"),
+            TextNode(", ", TextType.TEXT),
+            TextNode("Notes", TextType.LINK, "/notes.html#todo"),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("intro", TextType.LINK, "#intro"),
+            TextNode(".", TextType.TEXT),
+        ])
+        self.assertEqual(links.warnings, [])
+
+    def test_unresolved_link_is_text(self):
+        links = PageLinks(_index())
+        html = markdown_to_html_node("- [[Goldberry]]\n- [[Goldberry|her]]", links=links).to_html()
+        self.assertEqual(html, "<div><ul><li>Goldberry</li><li>her</li></ul></div>")
+        self.assertEqual(links.warnings, ["Unresolved wiki link [[Goldberry]]"])
+
+    def test_without_links_syntax_is_text(self):
+        self.assertEqual(text_to_textnodes("[[Glorfindel]]"),
+                         [TextNode("[[Glorfindel]]", TextType.TEXT)])
+
+    def test_unchanged(self):
+        links = PageLinks(_index())
+        text_to_textnodes("[[Glorfindel]] [[Goldberry]]", links)
+        self.assertTrue(links.unchanged(_index()))
+        retitled = _index()
+        retitled.add("blog/glorfindel/index.md", "Glorfindel of Rivendell")
+        self.assertFalse(links.unchanged(retitled))
+        found = _index()
+        found.add("goldberry.md", "Goldberry")
+        self.assertFalse(links.unchanged(found))
+
+
+class TestSiteWikiLinks(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.path("content", "index.md"), "# Home\n\nRead [[Tom]] and [[blog/tom]].")
+
+    def test_links_resolve_with_basepath(self):
+        result = Site.from_project(self.root, basepath="/repo/").build()
+        self.assertTrue(result.ok)
+        self.assertEqual(result.warnings, [])
+        self.assertIn('Read <a href="/repo/blog/tom/">Tom</a> and <a href="/repo/blog/tom/">Tom</a>.',
+                      self.read("docs", "index.html"))
+
+    def test_retitled_target_rerenders_linking_pages(self):
+        site = Site.from_project(self.root)
+        site.build()
+        write_file(self.path("content", "blog", "tom", "index.md"), "# Tom Bombadil\n\nBombadil")
+        result = site.build()
+        self.assertEqual(sorted(result.pages_written), [
+            self.path("docs", "blog", "tom", "index.html"),
+            self.path("docs", "index.html"),
+        ])
+        self.assertIn("Read Tom and", self.read("docs", "index.html"))
+        self.assertIn('<a href="/blog/tom/">Tom Bombadil</a>', self.read("docs", "index.html"))
+        self.assertEqual(result.warnings,
+                         [(self.path("content", "index.md"), "Unresolved wiki link [[Tom]]")])
+
+        # Pages without wiki links are not affected by title changes
+        write_file(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nBombadil")
+        write_file(self.path("content", "blog", "tom", "more.md"), "# More")
+        result = site.build()
+        self.assertEqual(len(result.pages_written), 3)
+        result = site.build()
+        self.assertEqual(result.pages_written, [])
+
+    def test_new_page_with_same_title_is_ambiguous(self):
+        site = Site.from_project(self.root)
+        site.build()
+        write_file(self.path("content", "archive", "tom.md"), "# Tom")
+        result = site.build()
+        self.assertIn(self.path("docs", "index.html"), result.pages_written)
+        self.assertEqual(len(result.warnings), 1)
+        self.assertIn("Ambiguous wiki link [[Tom]]", result.warnings[0][1])
+        self.assertIn('<a href="/archive/tom.html">Tom</a>', self.read("docs", "index.html"))
+
+    def test_streamed_pages(self):
+        result = Site.from_project(self.root, stream_threshold=1).build()
+        self.assertTrue(result.ok)
+        self.assertIn('Read <a href="/blog/tom/">Tom</a>', self.read("docs", "index.html"))
+
+    def test_index_is_only_built_for_wiki_links(self):
+        write_file(self.path("content", "index.md"), "# Home")
+        site = Site.from_project(self.root)
+        site.build()
+        self.assertEqual(site._titles, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import pickle
+import struct
+import unittest
+
+from inline_markdown import markdown_to_html_node
+from leafnode import LeafNode
+from parentnode import ParentNode
+from wireformat import decode_tree, encode_tree
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content")
+
+
+def _structure(node):
+    """Nested tuples describing a node tree, for exact comparisons."""
+    children = None
+    if node.children is not None:
+        children = [_structure(child) for child in node.children]
+    return (type(node).__name__, node.tag, node.value, node.props, children)
+
+
+class TestWireFormat(unittest.TestCase):
+    def test_round_trip(self):
+        tree = ParentNode("div", [
+            ParentNode("p", [
+                LeafNode(None, "Ünïcödé text "),
+                LeafNode("a", "link", {"href": "/x", "target": "_blank"}),
+            ], {"class": "lead"}),
+            LeafNode("img", "", {"src": "/a.png", "alt": ""}),
+            ParentNode("ul", []),
+            ParentNode("ol", [LeafNode("li", "x", {})], {}),
+        ])
+        decoded = decode_tree(encode_tree(tree))
+        self.assertEqual(_structure(decoded), _structure(tree))
+        self.assertEqual(decoded.to_html(), tree.to_html())
+
+    def test_round_trip_site_content(self):
+        for root, _, files in os.walk(CONTENT_DIR):
+            for name in files:
+                with open(os.path.join(root, name), encoding="utf-8") as f:
+                    tree = markdown_to_html_node(f.read())
+                with self.subTest(path=os.path.join(root, name)):
+                    self.assertEqual(_structure(decode_tree(encode_tree(tree))), _structure(tree))
+
+    def test_strings_are_shared(self):
+        tree = ParentNode("ul", [
+            ParentNode("li", [LeafNode("a", f"item {i}", {"href": f"/{i}"})])
+            for i in range(100)
+        ])
+        self.assertLess(len(encode_tree(tree)), len(pickle.dumps(tree)))
+        self.assertEqual(encode_tree(tree).count(b"href"), 1)
+
+    def test_deep_tree(self):
+        tree = LeafNode("b", "leaf")
+        for _ in range(5000):
+            tree = ParentNode("span", [tree])
+        node = decode_tree(encode_tree(tree))
+        depth = 0
+        while node.children is not None:
+            node = node.children[0]
+            depth += 1
+        self.assertEqual((depth, node.value), (5000, "leaf"))
+
+    def test_non_string_props_raise(self):
+        with self.assertRaises(TypeError):
+            encode_tree(LeafNode("td", "x", {"colspan": 2}))
+
+    def test_invalid_data_raises(self):
+        data = encode_tree(LeafNode("b", "x"))
+        with self.assertRaises(ValueError):
+            decode_tree(b"XXXX" + data[4:])
+        with self.assertRaises(ValueError):
+            decode_tree(data[:-4])
+
+    def test_corrupted_records_raise(self):
+        data = encode_tree(ParentNode("p", [LeafNode("a", "x", {"href": "/"})]))
+        record_count = struct.unpack_from("<4sIII", data)[3]
+        records_start = len(data) - 4 * record_count
+
+        def corrupt(word, value):
+            offset = records_start + 4 * word
+            return data[:offset] + value.to_bytes(4, "little") + data[offset + 4:]
+
+        # A string id past the table, a node kind, a prop count past the end
+        for word, value in ((1, 200), (4, 9), (7, 0xFFFFFFFF)):
+            with self.assertRaises(ValueError):
+                decode_tree(corrupt(word, value))
+        # No other exception for any corrupted word
+        for word in range(record_count):
+            for value in (0, 1, 7, 200, 0xFFFFFFFF):
+                with self.subTest(word=word, value=value):
+                    try:
+                        decode_tree(corrupt(word, value))
+                    except ValueError:
+                        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
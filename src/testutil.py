@@ -0,0 +1,49 @@
+"""Helpers shared by the test modules."""
+import os
+import tempfile
+import unittest
+
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css"><main>{{ Content }}</main>'
+
+
+def write_file(path, data=""):
+    """Write text or bytes to path, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if isinstance(data, bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+def touch_file(path, text):
+    """Rewrite a file and make sure its mtime moves forward."""
+    before = os.stat(path).st_mtime_ns
+    write_file(path, text)
+    st = os.stat(path)
+    if st.st_mtime_ns <= before:
+        os.utime(path, ns=(st.st_atime_ns, before + 1_000_000))
+
+
+class SiteTestCase(unittest.TestCase):
+    """A project with two pages, two static files and a template."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        write_file(os.path.join(self.root, "content", "index.md"), "# Home\n\n[Tom](/blog/tom)")
+        write_file(os.path.join(self.root, "content", "blog", "tom", "index.md"), "# Tom\n\nBombadil")
+        write_file(os.path.join(self.root, "static", "index.css"), "body {}")
+        write_file(os.path.join(self.root, "static", "images", "tom.png"), "png")
+        write_file(os.path.join(self.root, "template.html"), TEMPLATE)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def read(self, *parts):
+        with open(self.path(*parts), encoding="utf-8") as f:
+            return f.read()
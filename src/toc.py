@@ -0,0 +1,100 @@
+import html
+import re
+
+_SLUG_STRIP_RE = re.compile(r"[^\w\- ]")
+
+
+def slugify(text):
+    """
+    Turn heading text into an id: lowercased, punctuation dropped and
+    spaces turned into hyphens, e.g. "Hello, World!" -> "hello-world".
+    Text with nothing left gets "section".
+    """
+    slug = _SLUG_STRIP_RE.sub("", text.strip().lower()).replace(" ", "-")
+    return slug or "section"
+
+
+class TocEntry:
+    """One heading of a page: its level (1-6), plain text and id."""
+
+    def __init__(self, level, text, slug):
+        self.level = level
+        self.text = text
+        self.slug = slug
+
+    def __eq__(self, other):
+        return (
+            self.level == other.level
+            and self.text == other.text
+            and self.slug == other.slug
+        )
+
+    def __repr__(self):
+        return f"TocEntry({self.level}, {self.text}, {self.slug})"
+
+
+class TableOfContents:
+    """
+    The outline of a page, collected while its headings are rendered, so
+    building it takes no extra pass over the document. Hands out the
+    heading ids: the slug of the heading text, with "-1", "-2"... added to
+    repeats, so ids are unique within the page and stable as long as the
+    headings before them do not change.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._used = set()
+        # Slug -> next suffix to try for it, so repeats are not rescanned
+        self._next_suffix = {}
+
+    def add(self, level, text):
+        """
+        Record a heading.
+
+        Args:
+            level: The heading level, 1 for h1
+            text: The heading's plain text
+
+        Returns:
+            The id for the heading
+        """
+        base = slugify(text)
+        slug = base
+        n = self._next_suffix.get(base, 0)
+        if n:
+            slug = f"{base}-{n}"
+        while slug in self._used:
+            n += 1
+            slug = f"{base}-{n}"
+        self._next_suffix[base] = n + 1
+        self._used.add(slug)
+        self.entries.append(TocEntry(level, text, slug))
+        return slug
+
+    def to_html(self, min_level=2, max_level=6):
+        """
+        Render the outline as nested lists of links to the headings. The
+        page title (h1) is left out by default.
+
+        Returns:
+            The HTML, or "" if no heading is in range
+        """
+        parts = []
+        # Levels of the lists currently open
+        open_levels = []
+        for entry in self.entries:
+            if not min_level <= entry.level <= max_level:
+                continue
+            while open_levels and entry.level < open_levels[-1]:
+                parts.append("</li></ul>")
+                open_levels.pop()
+            if open_levels and entry.level == open_levels[-1]:
+                parts.append("</li>")
+            else:
+                # Deeper than the enclosing list, or the first entry
+                parts.append("<ul>")
+                open_levels.append(entry.level)
+            parts.append(f'<li><a href="#{entry.slug}">{html.escape(entry.text)}</a>')
+        parts.append("</li></ul>" * len(open_levels))
+        return "".join(parts)
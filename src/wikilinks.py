@@ -0,0 +1,113 @@
+from search_index import page_url
+from textnode import TextNode, TextType
+
+
+def normalize_title(title):
+    """Titles match case-insensitively, with runs of whitespace as one space."""
+    return " ".join(title.split()).casefold()
+
+
+def _normalize_path(target):
+    path = target.strip().strip("/")
+    return path[:-len(".md")] if path.endswith(".md") else path
+
+
+class WikiIndex:
+    """
+    Every page of a site by path and by title, for resolving wiki links in
+    constant time. A target names a page by its content-relative path
+    without ".md" ("blog/tom", "blog/tom/index", "notes"), or else by its
+    title. Paths are unique; a title shared by several pages resolves to
+    the first of them by path, and is reported as ambiguous.
+    """
+
+    def __init__(self):
+        # Path key -> rel path
+        self._paths = {}
+        # Normalized title -> sorted rel paths with that title
+        self._titles = {}
+        # Rel path -> title
+        self.titles = {}
+
+    def add(self, rel_path, title):
+        """
+        Add a page.
+
+        Args:
+            rel_path: Content-relative path of its markdown, e.g. "blog/tom/index.md"
+            title: Its h1 title, or None if it has none
+        """
+        stem = rel_path[:-len(".md")]
+        self._paths[stem] = rel_path
+        if stem == "index":
+            self._paths[""] = rel_path
+        elif stem.endswith("/index"):
+            self._paths[stem[:-len("/index")]] = rel_path
+        self.titles[rel_path] = title
+        if title is not None:
+            pages = self._titles.setdefault(normalize_title(title), [])
+            pages.append(rel_path)
+            pages.sort()
+
+    def resolve(self, target):
+        """
+        Look up a link target.
+
+        Returns:
+            A tuple (rel_path, title, matches), where matches lists every
+            page with a matching title if there are several, or None if
+            nothing matches
+        """
+        rel_path = self._paths.get(_normalize_path(target))
+        if rel_path is not None:
+            return (rel_path, self.titles[rel_path], ())
+        pages = self._titles.get(normalize_title(target))
+        if not pages:
+            return None
+        return (pages[0], self.titles[pages[0]], tuple(pages) if len(pages) > 1 else ())
+
+
+class PageLinks:
+    """
+    Resolves the wiki links of one page as it is rendered, like
+    toc.TableOfContents collects its headings. Records what each target
+    resolved to, so the page can be re-rendered when that changes, and a
+    warning for each target that is missing or ambiguous.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        # Target as written -> WikiIndex.resolve() result
+        self.targets = {}
+        self.warnings = []
+
+    def to_text_node(self, target, label=None):
+        """
+        Return the TextNode for [[target]] or [[target|label]]: a link to
+        the page, labelled with its title by default, or the plain label if
+        the target is not found.
+        """
+        page, _, fragment = target.partition("#")
+        if target.startswith("#"):
+            # A heading of this page
+            return TextNode(label or fragment, TextType.LINK, target)
+        first_use = page not in self.targets
+        resolved = self.targets[page] = self.index.resolve(page)
+        if resolved is None:
+            if first_use:
+                self.warnings.append(f"Unresolved wiki link [[{target}]]")
+            return TextNode(label or target, TextType.TEXT)
+        rel_path, title, matches = resolved
+        if matches and first_use:
+            self.warnings.append(
+                f"Ambiguous wiki link [[{target}]] matches {', '.join(matches)}; "
+                f"linking to {rel_path}"
+            )
+        # Root-relative, like every other link: the basepath is applied to
+        # the rendered page
+        url = page_url(rel_path) + ("#" + fragment if fragment else "")
+        return TextNode(label or title or page, TextType.LINK, url)
+
+    def unchanged(self, index):
+        """Whether every target still resolves the same way in index."""
+        return all(index.resolve(page) == resolved for page, resolved in self.targets.items())
@@ -0,0 +1,182 @@
+import struct
+import sys
+from array import array
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+MAGIC = b"HND2"
+# magic, number of strings, string blob bytes, number of record words
+_HEADER = struct.Struct("<4sIII")
+
+LEAF = 0
+PARENT = 1
+
+# String id 0 stands for None
+NONE_ID = 0
+# Props word of a node whose props are None
+NO_PROPS = 0
+
+
+def _to_little_endian(words):
+    if sys.byteorder == "big":
+        words = array("I", words)
+        words.byteswap()
+    return words.tobytes()
+
+
+def _from_little_endian(data):
+    words = array("I")
+    words.frombytes(data)
+    if sys.byteorder == "big":
+        words.byteswap()
+    return words
+
+
+def encode_tree(node):
+    """
+    Serialize a ParentNode/LeafNode tree into a compact byte string.
+
+    Layout (all integers little-endian uint32):
+    - header: magic, string count, string blob size, record word count
+    - string lengths, one per string
+    - string blob: every distinct string once, UTF-8 encoded
+    - records, in pre-order, one per node:
+        LEAF, tag id, value id, props, (key id, value id) * prop count
+        PARENT, tag id, child count, props, (key id, value id) * prop count
+      where props is 0 for None and prop count + 1 for a dict, so an empty
+      dict decodes as an empty dict
+
+    Tags, values and props share one string table, so repeated tags and
+    attribute names are stored once per tree.
+
+    Args:
+        node: The root node
+
+    Returns:
+        The encoded bytes
+    """
+    strings = {}
+    blob = []
+
+    def string_id(value):
+        if value is None:
+            return NONE_ID
+        if not isinstance(value, str):
+            raise TypeError(f"Only str values can be encoded, got {type(value).__name__}")
+        sid = strings.get(value)
+        if sid is None:
+            sid = len(strings) + 1
+            strings[value] = sid
+            blob.append(value.encode("utf-8"))
+        return sid
+
+    records = array("I")
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        if current.children is None:
+            records.append(LEAF)
+            records.append(string_id(current.tag))
+            records.append(string_id(current.value))
+        else:
+            records.append(PARENT)
+            records.append(string_id(current.tag))
+            records.append(len(current.children))
+            pending.extend(reversed(current.children))
+        props = current.props
+        if props is None:
+            records.append(NO_PROPS)
+            continue
+        records.append(len(props) + 1)
+        for key, value in props.items():
+            records.append(string_id(key))
+            records.append(string_id(value))
+
+    lengths = array("I", [len(data) for data in blob])
+    blob_bytes = b"".join(blob)
+    return b"".join([
+        _HEADER.pack(MAGIC, len(lengths), len(blob_bytes), len(records)),
+        _to_little_endian(lengths),
+        blob_bytes,
+        _to_little_endian(records),
+    ])
+
+
+def decode_tree(data):
+    """
+    Rebuild the node tree from bytes produced by encode_tree.
+
+    Raises:
+        ValueError: If data is not a valid encoded tree
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated node tree data")
+    magic, string_count, blob_size, record_count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded node tree")
+
+    offset = _HEADER.size
+    lengths_end = offset + 4 * string_count
+    blob_end = lengths_end + blob_size
+    if len(data) != blob_end + 4 * record_count:
+        raise ValueError("Truncated node tree data")
+
+    strings = [None]
+    position = lengths_end
+    for length in _from_little_endian(data[offset:lengths_end]):
+        if position + length > blob_end:
+            raise ValueError("String table overruns its blob")
+        strings.append(data[position:position + length].decode("utf-8"))
+        position += length
+    records = _from_little_endian(data[blob_end:])
+
+    def string(sid):
+        if sid >= len(strings):
+            raise ValueError(f"String id {sid} out of range")
+        return strings[sid]
+
+    root = None
+    # Stack of [parent node, children still to read]
+    stack = []
+    i = 0
+    while i < record_count:
+        if i + 4 > record_count:
+            raise ValueError("Truncated node record")
+        kind, tag, third, props_word = records[i:i + 4]
+        i += 4
+        if kind not in (LEAF, PARENT):
+            raise ValueError(f"Unknown node kind {kind}")
+        props = None
+        if props_word != NO_PROPS:
+            prop_count = props_word - 1
+            if i + 2 * prop_count > record_count:
+                raise ValueError("Truncated node record")
+            props = {}
+            for _ in range(prop_count):
+                props[string(records[i])] = string(records[i + 1])
+                i += 2
+
+        if kind == LEAF:
+            node = LeafNode(string(tag), string(third), props)
+        else:
+            node = ParentNode(string(tag), [], props)
+
+        if stack:
+            parent = stack[-1]
+            parent[0].children.append(node)
+            parent[1] -= 1
+            # Close parents that are complete now that a child was added
+            while stack and stack[-1][1] == 0:
+                stack.pop()
+        elif root is None:
+            root = node
+        else:
+            raise ValueError("Node tree data has more than one root")
+
+        if kind == PARENT and third:
+            stack.append([node, third])
+
+    if root is None or stack:
+        raise ValueError("Truncated node tree data")
+    return root